@@ -0,0 +1,480 @@
+"""
+HTTP load benchmark.
+
+Drives the ASGI app in-process (no network) against a throwaway SQLite
+database, or the database in PGDB_URL, with objects kept in memory instead of
+COS. Each scenario covers one hot path: RSS polling, cover and audio
+delivery, list pagination, login, and episode creation with the feed rebuild
+it triggers; `mixed` interleaves them by traffic share. For every endpoint it
+reports requests per second and latency percentiles, and writes the results
+as JSON so runs can be compared.
+
+    python -m benchmarks.load --requests 500 --concurrency 8 --output before.json
+    python -m benchmarks.load --requests 500 --concurrency 8 --baseline before.json
+
+Run it from the repository root.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import closing
+from datetime import datetime, timezone
+from email.utils import formatdate
+from hashlib import md5
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable
+
+_workdir = None
+if "PGDB_URL" not in os.environ:
+    _workdir = tempfile.mkdtemp(prefix="load-")
+    _database = os.path.join(_workdir, "load.sqlite")
+    # WAL lets reads proceed during a write, as they do on PostgreSQL; with
+    # the default journal the mixed run mostly measures lock waits.
+    with closing(sqlite3.connect(_database)) as connection:
+        connection.execute("PRAGMA journal_mode=WAL")
+    os.environ["PGDB_URL"] = f"sqlite:///{_database}"
+# Keeps COS out of the process; the backend is swapped for MemoryStorage below.
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ.setdefault("CONTENTS_DIR", tempfile.gettempdir())
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import httpx
+from PIL import Image
+from sqlalchemy.engine import make_url
+
+from src.config.settings import settings
+from src.core.exceptions import StorageError
+from src.core.storage import FileInfo, InstrumentedStorage, StorageBackend
+from src.main import app
+from src.services import storage_service
+from src.services.rss_scheduler import rss_rebuild_scheduler
+from src.utils.range_utils import ByteRange
+
+PASSWORD = "benchmark-password"
+# One MPEG-1 Layer III frame, 128 kbit/s at 44.1 kHz, carrying silence
+MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+# Bytes a podcast player asks for per Range request
+AUDIO_RANGE_BYTES = 256 * 1024
+
+# Share of each scenario in the `mixed` run, roughly what a feed host serves
+MIXED_WEIGHTS = {
+    "rss_conditional": 40,
+    "rss": 10,
+    "cover": 20,
+    "audio": 15,
+    "list": 10,
+    "login": 3,
+    "episode_create": 2,
+}
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Objects in a dict, standing in for COS. `latency_seconds` is added to
+    every call to model the storage round trip.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self._objects: dict[str, tuple[bytes, FileInfo]] = {}
+        self._uploads: dict[str, dict[int, bytes]] = {}
+
+    async def put(self, key: str, content: bytes | AsyncIterable[bytes], size: int | None, content_type: str | None):
+        if not isinstance(content, bytes):
+            content = b"".join([chunk async for chunk in content])
+        await self._wait()
+        if size is not None and len(content) != size:
+            raise StorageError("Incomplete Upload.")
+        self._store(key, content, content_type)
+
+    async def get(self, key: str, byte_range: ByteRange | None = None) -> tuple[AsyncIterator[bytes], FileInfo]:
+        content, file_info = await self.read(key, byte_range)
+        return self._iter_chunks(content), file_info
+
+    async def read(self, key: str, byte_range: ByteRange | None = None) -> tuple[bytes, FileInfo]:
+        await self._wait()
+        if key not in self._objects:
+            raise StorageError()
+        content, file_info = self._objects[key]
+        if byte_range:
+            content = content[byte_range.start:byte_range.end + 1]
+        return content, file_info
+
+    async def head(self, key: str) -> FileInfo | None:
+        await self._wait()
+        entry = self._objects.get(key)
+        return entry[1] if entry else None
+
+    async def delete(self, key: str):
+        await self.delete_many([key])
+
+    async def delete_many(self, keys: list[str]):
+        await self._wait()
+        for key in keys:
+            self._objects.pop(key, None)
+
+    async def create_multipart_upload(self, key: str, content_type: str | None = None) -> str:
+        await self._wait()
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = {}
+        return upload_id
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, content: bytes | AsyncIterable[bytes], size: int) -> str:
+        if not isinstance(content, bytes):
+            content = b"".join([chunk async for chunk in content])
+        await self._wait()
+        if upload_id not in self._uploads:
+            raise StorageError("Upload Not Found.")
+        self._uploads[upload_id][part_number] = content
+        return f'"{md5(content).hexdigest()}"'
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]):
+        await self._wait()
+        stored = self._uploads.pop(upload_id, None)
+        if stored is None:
+            raise StorageError("Upload Not Found.")
+        self._store(key, b"".join(stored[part_number] for part_number, _ in sorted(parts)), None)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        await self._wait()
+        self._uploads.pop(upload_id, None)
+
+    def _store(self, key: str, content: bytes, content_type: str | None):
+        self._objects[key] = (content, FileInfo(
+            size=len(content),
+            etag=f'"{md5(content).hexdigest()}"',
+            last_modified=formatdate(usegmt=True),
+            content_type=content_type
+        ))
+
+    async def _wait(self):
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+    async def _iter_chunks(self, content: bytes) -> AsyncIterator[bytes]:
+        for offset in range(0, len(content), self.CHUNK_SIZE):
+            yield content[offset:offset + self.CHUNK_SIZE]
+
+
+class ScenarioRun:
+    """Latencies and response statuses of one scenario, by endpoint."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, seconds: float, status: int | str):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][str(status)] += 1
+
+    def summarize(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            quantiles = statistics.quantiles(latencies, n=100, method="inclusive") \
+                if len(latencies) > 1 else latencies * 99
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "requests_per_second": len(latencies) / elapsed,
+                "p50_ms": quantiles[49] * 1000,
+                "p95_ms": quantiles[94] * 1000,
+                "p99_ms": quantiles[98] * 1000,
+                "max_ms": max(latencies) * 1000,
+                "errors": sum(count for status, count in statuses.items() if not _succeeded(status)),
+                "statuses": dict(sorted(statuses.items())),
+            }
+        return endpoints
+
+
+def _succeeded(status: str) -> bool:
+    if status.isdigit():
+        return int(status) < 400
+    return status == "ok"
+
+
+class LoadContext:
+    """The seeded data and the client that every scenario draws from."""
+
+    def __init__(self, client: httpx.AsyncClient, username: str):
+        self.client = client
+        self.username = username
+        self.headers: dict[str, str] = {}
+        self.podcast_ids: list[int] = []
+        self.episode_ids: list[int] = []
+        self.audio_size = 0
+        self.page_urls: list[str] = []
+        self.feed_etags: dict[int, str] = {}
+        # Rebuilds of one podcast are serialized, as the scheduler does
+        self.rebuild_locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def request(self, run: ScenarioRun, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        run.record(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+
+async def rss(ctx: LoadContext, run: ScenarioRun):
+    podcast_id = random.choice(ctx.podcast_ids)
+    response = await ctx.request(run, "GET /podcasts/{id}/rss", "GET", f"/podcasts/{podcast_id}/rss")
+    if response.status_code == 200:
+        ctx.feed_etags[podcast_id] = response.headers["ETag"]
+
+
+async def rss_conditional(ctx: LoadContext, run: ScenarioRun):
+    podcast_id = random.choice(ctx.podcast_ids)
+    headers = {"If-None-Match": ctx.feed_etags[podcast_id]} if podcast_id in ctx.feed_etags else {}
+    response = await ctx.request(run, "GET /podcasts/{id}/rss (conditional)", "GET",
+                                 f"/podcasts/{podcast_id}/rss", headers=headers)
+    if response.status_code == 200:
+        ctx.feed_etags[podcast_id] = response.headers["ETag"]
+
+
+async def cover(ctx: LoadContext, run: ScenarioRun):
+    podcast_id = random.choice(ctx.podcast_ids)
+    size = random.choice(settings.IMAGE_VARIANT_SIZES)
+    await ctx.request(run, "GET /podcasts/{id}/cover", "GET", f"/podcasts/{podcast_id}/cover",
+                      params={"size": size}, headers={"Accept": "image/webp,image/*"})
+
+
+async def audio(ctx: LoadContext, run: ScenarioRun):
+    episode_id = random.choice(ctx.episode_ids)
+    start = random.randrange(0, max(ctx.audio_size - AUDIO_RANGE_BYTES, 1))
+    end = min(start + AUDIO_RANGE_BYTES, ctx.audio_size) - 1
+    await ctx.request(run, "GET /episodes/{id}/audio (range)", "GET", f"/episodes/{episode_id}/audio",
+                      headers={"Range": f"bytes={start}-{end}"})
+
+
+async def list_podcasts(ctx: LoadContext, run: ScenarioRun):
+    await ctx.request(run, "GET /podcasts", "GET", random.choice(ctx.page_urls))
+
+
+async def login(ctx: LoadContext, run: ScenarioRun):
+    await ctx.request(run, "POST /token", "POST", "/token",
+                      data={"username": ctx.username, "password": PASSWORD})
+
+
+async def episode_create(ctx: LoadContext, run: ScenarioRun):
+    podcast_id = random.choice(ctx.podcast_ids)
+    await ctx.request(run, "POST /podcasts/{id}/episodes", "POST", f"/podcasts/{podcast_id}/episodes",
+                      headers=ctx.headers, json={"title": f"Episode {uuid.uuid4().hex[:8]}", "description": "Load test."})
+
+    # The create only marks the feed dirty; rebuild it now instead of after
+    # the debounce, so its cost is measured.
+    async with ctx.rebuild_locks[podcast_id]:
+        started = time.perf_counter()
+        try:
+            await rss_rebuild_scheduler.rebuild_now(podcast_id)
+            status = "ok"
+        except Exception as e:
+            status = type(e).__name__
+        run.record("feed rebuild", time.perf_counter() - started, status)
+
+
+SCENARIOS: dict[str, Callable[[LoadContext, ScenarioRun], Awaitable[None]]] = {
+    "rss": rss,
+    "rss_conditional": rss_conditional,
+    "cover": cover,
+    "audio": audio,
+    "list": list_podcasts,
+    "login": login,
+    "episode_create": episode_create,
+}
+
+
+def make_cover(index: int) -> bytes:
+    # Noise keeps the encoded size and the resize cost close to a real photo.
+    image = Image.effect_noise((1400, 1400), 16 + index % 80).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def seed(ctx: LoadContext, podcasts: int, episodes: int, audio_bytes: int, page_size: int):
+    response = await ctx.client.post("/users", json={"username": ctx.username, "password": PASSWORD, "nickname": ctx.username})
+    response.raise_for_status()
+    response = await ctx.client.post("/token", data={"username": ctx.username, "password": PASSWORD})
+    response.raise_for_status()
+    ctx.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    audio_content = MP3_FRAME * max(audio_bytes // len(MP3_FRAME), 1)
+    ctx.audio_size = len(audio_content)
+    for index in range(podcasts):
+        response = await ctx.client.post("/users/me/podcasts", headers=ctx.headers, json={
+            "title": f"Podcast {index}",
+            "description": "Load test.",
+            "itunes_category": "Arts",
+            "itunes_subcategory": "Books",
+            "copyright": ctx.username
+        })
+        response.raise_for_status()
+        podcast_id = response.json()["id"]
+        ctx.podcast_ids.append(podcast_id)
+
+        response = await ctx.client.put(f"/podcasts/{podcast_id}/cover", headers=ctx.headers,
+                                        files={"avatar_update": ("cover.jpg", make_cover(index), "image/jpeg")})
+        response.raise_for_status()
+
+        for episode_index in range(episodes):
+            response = await ctx.client.post(f"/podcasts/{podcast_id}/episodes", headers=ctx.headers,
+                                             json={"title": f"Episode {episode_index}", "description": "Load test."})
+            response.raise_for_status()
+            episode_id = response.json()["id"]
+            ctx.episode_ids.append(episode_id)
+
+            response = await ctx.client.put(f"/episodes/{episode_id}/audio", headers=ctx.headers,
+                                            files={"audio_update": ("episode.mp3", audio_content, "audio/mpeg")})
+            response.raise_for_status()
+
+        await rss_rebuild_scheduler.rebuild_now(podcast_id)
+
+    url = f"/podcasts?limit={page_size}"
+    while url:
+        ctx.page_urls.append(url)
+        response = await ctx.client.get(url)
+        response.raise_for_status()
+        url = response.links.get("next", {}).get("url")
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run_scenario(ctx: LoadContext, name: str, requests: int, concurrency: int, warmup: int) -> dict:
+    if name == "mixed":
+        operations = random.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()), k=requests)
+    else:
+        operations = [name] * requests
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def execute(operation: str, run: ScenarioRun):
+        async with semaphore:
+            await SCENARIOS[operation](ctx, run)
+
+    # Fills the caches a long-running worker would already have warm.
+    warmup_run = ScenarioRun()
+    await asyncio.gather(*(execute(operation, warmup_run) for operation in operations[:warmup]))
+
+    run = ScenarioRun()
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(execute(operation, run) for operation in operations))
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    return {
+        "elapsed_seconds": elapsed,
+        "operations_per_second": requests / elapsed,
+        "max_loop_lag_ms": await lag * 1000,
+        "endpoints": run.summarize(elapsed),
+    }
+
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict, baseline: dict | None):
+    print(f"{'scenario':<16} {'endpoint':<38} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for scenario, result in results["scenarios"].items():
+        for endpoint, stats in result["endpoints"].items():
+            line = (f"{scenario:<16} {endpoint:<38} {stats['requests_per_second']:>9.1f} "
+                    f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['errors']:>6}")
+            previous = (baseline or {}).get("scenarios", {}).get(scenario, {}).get("endpoints", {}).get(endpoint)
+            if previous:
+                line += (f"   req/s {_change(stats['requests_per_second'], previous['requests_per_second'])}"
+                         f"  p95 {_change(stats['p95_ms'], previous['p95_ms'])}")
+            print(line)
+        print(f"{scenario:<16} {'(max event loop lag)':<38} {'':>9} {result['max_loop_lag_ms']:>8.1f}")
+
+
+def _change(current: float, previous: float) -> str:
+    if not previous:
+        return "    n/a"
+    return f"{(current - previous) / previous * 100:+6.1f}%"
+
+
+async def main(args: argparse.Namespace):
+    random.seed(args.seed)
+    storage_service.storage_backend = InstrumentedStorage(MemoryStorage(args.storage_latency_ms / 1000), "memory")
+    scenarios = args.scenarios or [*SCENARIOS, "mixed"]
+
+    # Failures are counted as 500s instead of ending the run.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        ctx = LoadContext(client, f"load-{uuid.uuid4().hex[:8]}")
+        await seed(ctx, args.podcasts, args.episodes, args.audio_kib * 1024, args.page_size)
+
+        results = {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": get_git_commit(),
+            "python": platform.python_version(),
+            "database": make_url(settings.PGDB_URL).get_backend_name(),
+            "options": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "scenarios": {},
+        }
+        for scenario in scenarios:
+            results["scenarios"][scenario] = await run_scenario(
+                ctx, scenario, args.requests, args.concurrency, args.warmup)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+
+    output = args.output or f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=[*SCENARIOS, "mixed"],
+                        help="scenarios to run (default: all, then mixed)")
+    parser.add_argument("--requests", type=int, default=200, help="operations per scenario")
+    # Endpoints on the sync session hold a connection until the response is
+    # sent, so concurrency above DB_POOL_SIZE + DB_MAX_OVERFLOW stalls them.
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="unrecorded operations before each scenario")
+    parser.add_argument("--podcasts", type=int, default=20)
+    parser.add_argument("--episodes", type=int, default=5, help="episodes per podcast")
+    parser.add_argument("--audio-kib", type=int, default=2048, help="size of each episode's audio")
+    parser.add_argument("--page-size", type=int, default=5, help="limit of the list pages")
+    parser.add_argument("--storage-latency-ms", type=float, default=0.0,
+                        help="delay added to every storage call, e.g. a COS round trip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file for the results (default: load-<timestamp>.json)")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        if _workdir:
+            shutil.rmtree(_workdir, ignore_errors=True)
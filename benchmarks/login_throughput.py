@@ -0,0 +1,111 @@
+"""
+Login throughput benchmark.
+
+Drives `POST /token` through the ASGI app in-process (no network, throwaway
+SQLite database) and reports, for each password hashing pool size, logins
+per second, logins per second per worker, latency percentiles, the number of
+503 responses and the worst event loop lag seen while the logins ran.
+
+    python -m benchmarks.login_throughput --workers 1 2 4 --requests 200 --concurrency 32
+
+Run it from the repository root. Real deployments should pin
+PASSWORD_HASH_WORKERS to the cores left over for hashing.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_database = tempfile.NamedTemporaryFile(suffix=".sqlite", delete=False)
+os.environ.setdefault("PGDB_URL", f"sqlite:///{_database.name}")
+os.environ.setdefault("COS_REGION", "ap-guangzhou")
+os.environ.setdefault("COS_BUCKET", "benchmark-1250000000")
+os.environ.setdefault("COS_SECRET_ID", "benchmark")
+os.environ.setdefault("COS_SECRET_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import httpx
+
+from src.config.settings import settings
+from src.core import auth
+from src.main import app
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark-password"
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run(client: httpx.AsyncClient, workers: int, requests: int, concurrency: int) -> dict:
+    auth.password_hash_pool.shutdown()
+    auth.password_hash_pool = auth.PasswordHashPool(
+        workers, settings.PASSWORD_HASH_MAX_QUEUE, settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = []
+
+    async def login():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+            latencies.append(time.perf_counter() - started)
+            statuses.append(response.status_code)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    succeeded = statuses.count(200)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "workers": workers,
+        "logins_per_second": succeeded / elapsed,
+        "logins_per_second_per_worker": succeeded / elapsed / workers,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "rejected": statuses.count(503),
+        "max_loop_lag_ms": await lag * 1000
+    }
+
+
+async def main(args: argparse.Namespace):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        response = await client.post("/users", json={"username": USERNAME, "password": PASSWORD, "nickname": USERNAME})
+        response.raise_for_status()
+
+        print(f"{'workers':>7} {'logins/s':>9} {'per worker':>10} {'p50 ms':>8} {'p99 ms':>8} {'503s':>5} {'loop lag ms':>11}")
+        for workers in args.workers:
+            result = await run(client, workers, args.requests, args.concurrency)
+            print(f"{result['workers']:>7} {result['logins_per_second']:>9.1f} "
+                  f"{result['logins_per_second_per_worker']:>10.1f} {result['p50_ms']:>8.1f} "
+                  f"{result['p99_ms']:>8.1f} {result['rejected']:>5} {result['max_loop_lag_ms']:>11.1f}")
+
+    auth.password_hash_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        os.unlink(_database.name)
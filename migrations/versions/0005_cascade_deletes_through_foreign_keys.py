@@ -0,0 +1,54 @@
+"""cascade deletes through foreign keys
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 21:47:03.512840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table)
+FOREIGN_KEYS = [
+    ('podcast', 'author_id', 'user'),
+    ('episode', 'podcast_id', 'podcast'),
+    ('audiouploadsession', 'episode_id', 'episode'),
+    ('audiouploadsession', 'user_id', 'user'),
+    ('audiouploadpart', 'session_id', 'audiouploadsession'),
+]
+
+# 0001 left the foreign keys unnamed. Batch mode (SQLite) names reflected
+# constraints with this convention; PostgreSQL named them <table>_<column>_fkey.
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s"}
+
+
+def _constraint_name(table: str, column: str) -> str:
+    if op.get_bind().dialect.name == "sqlite":
+        return f"fk_{table}_{column}"
+    return f"{table}_{column}_fkey"
+
+
+def _replace_foreign_keys(ondelete: str | None) -> None:
+    for table, column, referred_table in FOREIGN_KEYS:
+        name = _constraint_name(table, column)
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred_table, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    _replace_foreign_keys(None)
@@ -13,4 +13,4 @@ router = APIRouter(tags=["认证"])
 @router.post("/token", response_model=Token, summary="获取登陆 token")
 async def post_token(session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
     auth_service = AuthenticationService(session, form_data)
-    return auth_service.get_token()
+    return await auth_service.get_token()
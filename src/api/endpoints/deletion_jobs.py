@@ -0,0 +1,11 @@
+from fastapi import APIRouter, status
+
+from src.models.deletion_job import DeletionJobPublic
+from src.services.deletion_service import DeletionServiceLoginDep
+
+router = APIRouter(prefix="/deletion-jobs", tags=["删除任务"])
+
+
+@router.get("/{job_id}", status_code=status.HTTP_200_OK, response_model=DeletionJobPublic, summary="获取删除任务进度")
+async def get_deletion_job_by_path(deletion_service: DeletionServiceLoginDep, job_id: str):
+    return await deletion_service.get_job_by_id(job_id)
@@ -1,10 +1,15 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Query, UploadFile, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Header, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 
 from src.core.constants import CommonMessage
 from src.models.episode import EpisodeCreate, EpisodePublic, EpisodeUpdate
+from src.models.upload_session import AudioUploadCreate, AudioUploadPublic, DirectUploadComplete, DirectUploadCreate, DirectUploadPublic
+from src.utils.http_utils import MediaVersionQuery
+from src.utils.image_utils import ImageFormatQuery, ImageSizeQuery
+from src.utils.multipart_utils import MultipartFileStream, multipart_file_openapi
+from src.utils.pagination_utils import AfterQuery, KeywordQuery, LimitQuery, OffsetQuery, set_next_link
 from src.services.episodes_service import EpisodeServiceDep, EpisodeServiceLoginDep
 
 router = APIRouter(tags=["单集"])
@@ -12,54 +17,109 @@ router = APIRouter(tags=["单集"])
 
 @router.post("/episodes", status_code=status.HTTP_201_CREATED, response_model=EpisodePublic, summary="创建单集")
 async def post_episode_with_query(episode_service: EpisodeServiceLoginDep, podcast_id: Annotated[int, Query()], episode_upload: EpisodeCreate):
-    return episode_service.create_episode_by_podcast_id(podcast_id, episode_upload)
+    return await episode_service.create_episode_by_podcast_id(podcast_id, episode_upload)
 
 
 @router.get("/episodes", status_code=status.HTTP_200_OK, response_model=list[EpisodePublic], summary="获取单集列表")
-async def get_episodes(episode_service: EpisodeServiceDep, offset: Annotated[int, Query()] = 0, limit: Annotated[int, Query()] = 10):
-    return episode_service.get_all_episodes(offset, limit)
+async def get_episodes(episode_service: EpisodeServiceDep, request: Request, response: Response, keyword: KeywordQuery = None, offset: OffsetQuery = 0, limit: LimitQuery = 10, after: AfterQuery = None):
+    if keyword:
+        episodes, cursor = await episode_service.search_episodes(keyword, offset, limit, after)
+        set_next_link(request, response, episodes, limit, cursor)
+        return episodes
+
+    episodes = await episode_service.get_all_episodes(offset, limit, after)
+    set_next_link(request, response, episodes, limit)
+    return episodes
 
 
 @router.get("/episodes/{id}", status_code=status.HTTP_200_OK, response_model=EpisodePublic, summary="获取指定单集")
 async def get_episode_by_path(episode_service: EpisodeServiceDep, id: int):
-    return episode_service.get_episode_by_id(id)
+    return await episode_service.get_episode_by_id(id)
 
 
 @router.put("/episodes/{id}", status_code=status.HTTP_200_OK, response_model=EpisodePublic, summary="修改指定单集")
 async def put_episode_by_path(episode_service: EpisodeServiceLoginDep, id: int, episode_update: EpisodeUpdate):
-    return episode_service.update_episode_by_id(id, episode_update)
+    return await episode_service.update_episode_by_id(id, episode_update)
 
 
 @router.delete("/episodes/{id}", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="删除指定单集")
 async def delete_episode_by_path(episode_service: EpisodeServiceLoginDep, id: int):
-    return episode_service.delete_episode_by_id(id)
+    return await episode_service.delete_episode_by_id(id)
 
 
 @router.get("/episodes/{id}/cover", status_code=status.HTTP_200_OK, response_class=FileResponse, summary="获取指定单集封面")
-async def get_episode_cover(episode_service: EpisodeServiceDep, id: int):
-    return episode_service.get_cover_by_id(id)
+async def get_episode_cover(episode_service: EpisodeServiceDep, id: int, size: ImageSizeQuery = None, format: ImageFormatQuery = None, v: MediaVersionQuery = None, accept: Annotated[str | None, Header()] = None, if_none_match: Annotated[str | None, Header()] = None, range: Annotated[str | None, Header()] = None):
+    return await episode_service.get_cover_by_id(id, size, format, accept, v, if_none_match, range)
+
+
+@router.put("/episodes/{id}/cover", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定单集封面", openapi_extra=multipart_file_openapi("cover_update"))
+async def put_episode_cover(episode_service: EpisodeServiceLoginDep, id: int, request: Request, x_content_sha256: Annotated[str | None, Header()] = None):
+    return await episode_service.update_cover_by_id(id, MultipartFileStream(request, "cover_update"), x_content_sha256)
+
+
+@router.post("/episodes/{id}/cover/direct-uploads", status_code=status.HTTP_201_CREATED, response_model=DirectUploadPublic, summary="创建指定单集封面直传")
+async def post_episode_cover_direct_upload(episode_service: EpisodeServiceLoginDep, id: int, upload_create: DirectUploadCreate):
+    return await episode_service.create_cover_direct_upload(id, upload_create)
+
+
+@router.post("/episodes/{id}/cover/direct-uploads/complete", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="完成指定单集封面直传")
+async def post_episode_cover_direct_upload_complete(episode_service: EpisodeServiceLoginDep, id: int, upload_complete: DirectUploadComplete):
+    return await episode_service.complete_cover_direct_upload(id, upload_complete)
+
+
+@router.get("/episodes/{id}/audio", status_code=status.HTTP_200_OK, response_class=StreamingResponse, summary="获取指定单集音频")
+async def get_episode_audio(episode_service: EpisodeServiceDep, id: int, range: Annotated[str | None, Header()] = None, if_range: Annotated[str | None, Header()] = None, v: MediaVersionQuery = None, if_none_match: Annotated[str | None, Header()] = None):
+    return await episode_service.get_audio_by_id(id, range, if_range, v, if_none_match)
+
+
+@router.put("/episodes/{id}/audio", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定单集音频", openapi_extra=multipart_file_openapi("audio_update"))
+async def put_episode_audio(episode_service: EpisodeServiceLoginDep, id: int, request: Request, x_content_sha256: Annotated[str | None, Header()] = None):
+    return await episode_service.update_audio_by_id(id, MultipartFileStream(request, "audio_update"), x_content_sha256)
+
+
+@router.post("/episodes/{id}/audio/direct-uploads", status_code=status.HTTP_201_CREATED, response_model=DirectUploadPublic, summary="创建指定单集音频直传")
+async def post_episode_audio_direct_upload(episode_service: EpisodeServiceLoginDep, id: int, upload_create: DirectUploadCreate):
+    return await episode_service.create_audio_direct_upload(id, upload_create)
+
+
+@router.post("/episodes/{id}/audio/direct-uploads/complete", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="完成指定单集音频直传")
+async def post_episode_audio_direct_upload_complete(episode_service: EpisodeServiceLoginDep, id: int, upload_complete: DirectUploadComplete):
+    return await episode_service.complete_audio_direct_upload(id, upload_complete)
+
+
+@router.post("/episodes/{id}/audio/uploads", status_code=status.HTTP_201_CREATED, response_model=AudioUploadPublic, summary="创建指定单集音频分块上传")
+async def post_episode_audio_upload(episode_service: EpisodeServiceLoginDep, id: int, upload_create: AudioUploadCreate):
+    return await episode_service.create_audio_upload(id, upload_create)
+
+
+@router.get("/episodes/{id}/audio/uploads/{upload_id}", status_code=status.HTTP_200_OK, response_model=AudioUploadPublic, summary="获取指定单集音频分块上传进度")
+async def get_episode_audio_upload(episode_service: EpisodeServiceLoginDep, id: int, upload_id: str):
+    return episode_service.get_audio_upload(id, upload_id)
 
 
-@router.put("/episodes/{id}/cover", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定单集封面")
-async def put_episode_cover(episode_service: EpisodeServiceLoginDep, id: int, cover_update: UploadFile):
-    return episode_service.update_cover_by_id(id, cover_update)
+@router.put("/episodes/{id}/audio/uploads/{upload_id}/chunks/{chunk_number}", status_code=status.HTTP_200_OK, response_model=AudioUploadPublic, summary="上传指定单集音频分块",
+            openapi_extra={"requestBody": {"required": True, "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}}}})
+async def put_episode_audio_chunk(episode_service: EpisodeServiceLoginDep, id: int, upload_id: str, chunk_number: int, request: Request, content_length: Annotated[int | None, Header()] = None):
+    return await episode_service.upload_audio_chunk(id, upload_id, chunk_number, request.stream(), content_length)
 
 
-@router.get("/episodes/{id}/audio", status_code=status.HTTP_200_OK, response_class=FileResponse, summary="获取指定单集音频")
-async def get_episode_cover(episode_service: EpisodeServiceDep, id: int):
-    return episode_service.get_audio_by_id(id)
+@router.post("/episodes/{id}/audio/uploads/{upload_id}/complete", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="完成指定单集音频分块上传")
+async def post_episode_audio_upload_complete(episode_service: EpisodeServiceLoginDep, id: int, upload_id: str):
+    return await episode_service.complete_audio_upload(id, upload_id)
 
 
-@router.put("/episodes/{id}/audio", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定单集音频")
-async def put_episode_cover(episode_service: EpisodeServiceLoginDep, id: int, audio_update: UploadFile):
-    return episode_service.update_audio_by_id(id, audio_update)
+@router.delete("/episodes/{id}/audio/uploads/{upload_id}", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="取消指定单集音频分块上传")
+async def delete_episode_audio_upload(episode_service: EpisodeServiceLoginDep, id: int, upload_id: str):
+    return await episode_service.abort_audio_upload(id, upload_id)
 
 
 @router.get("/podcasts/{podcast_id}/episodes", status_code=status.HTTP_200_OK, response_model=list[EpisodePublic], summary="获取指定播客单集列表")
-async def get_podcast_episodes(episode_service: EpisodeServiceDep, podcast_id: int, offset: Annotated[int, Query()] = 0, limit: Annotated[int, Query] = 10):
-    return episode_service.get_episodes_by_podcast_id(podcast_id, offset, limit)
+async def get_podcast_episodes(episode_service: EpisodeServiceDep, podcast_id: int, request: Request, response: Response, offset: OffsetQuery = 0, limit: LimitQuery = 10, after: AfterQuery = None):
+    episodes = await episode_service.get_episodes_by_podcast_id(podcast_id, offset, limit, after)
+    set_next_link(request, response, episodes, limit)
+    return episodes
 
 
 @router.post("/podcasts/{podcast_id}/episodes", status_code=status.HTTP_201_CREATED, response_model=EpisodePublic, summary="为指定播客创建单集")
 async def post_podcast_episode(episode_service: EpisodeServiceLoginDep, podcast_id: int, episode_upload: EpisodeCreate):
-    return episode_service.create_episode_by_podcast_id(podcast_id, episode_upload)
+    return await episode_service.create_episode_by_podcast_id(podcast_id, episode_upload)
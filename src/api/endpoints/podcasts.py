@@ -1,10 +1,16 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Query, UploadFile, status
+from fastapi import APIRouter, Header, Query, Request, Response, status
 from fastapi.responses import StreamingResponse
 
 from src.core.constants import CommonMessage
+from src.models.deletion_job import DeletionJobPublic
+from src.models.upload_session import DirectUploadComplete, DirectUploadCreate, DirectUploadPublic
 from src.models.podcast import PodcastCreate, PodcastPublic, PodcastUpdate
+from src.utils.http_utils import MediaVersionQuery
+from src.utils.image_utils import ImageFormatQuery, ImageSizeQuery
+from src.utils.multipart_utils import MultipartFileStream, multipart_file_openapi
+from src.utils.pagination_utils import AfterQuery, KeywordQuery, LimitQuery, OffsetQuery, set_next_link
 from src.services.podcast_service import PodcastServiceDep, PodcastServiceLoginDep
 
 router = APIRouter(tags=["播客"])
@@ -12,59 +18,82 @@ router = APIRouter(tags=["播客"])
 
 @router.post("/users/me/podcasts", status_code=status.HTTP_201_CREATED, response_model=PodcastPublic, summary="为当前用户创建播客")
 async def post_user_me_podcast(podcast_service: PodcastServiceLoginDep, podcast_upload: PodcastCreate):
-    return podcast_service.create_podcast_by_author_id(podcast_service.user_login.id, podcast_upload)
+    return await podcast_service.create_podcast_by_author_id(podcast_service.user_login.id, podcast_upload)
 
 
 @router.get("/users/me/podcasts", status_code=status.HTTP_201_CREATED, response_model=list[PodcastPublic], summary="获取当前用户播客列表")
-async def get_user_me_podcasts(podcast_service: PodcastServiceLoginDep, offset: Annotated[int, Query()] = 0, limit: Annotated[int, Query()] = 10):
-    return podcast_service.get_podcasts_by_author_id(podcast_service.user_login.id, offset, limit)
+async def get_user_me_podcasts(podcast_service: PodcastServiceLoginDep, request: Request, response: Response, offset: OffsetQuery = 0, limit: LimitQuery = 10, after: AfterQuery = None):
+    podcasts = await podcast_service.get_podcasts_by_author_id(podcast_service.user_login.id, offset, limit, after)
+    set_next_link(request, response, podcasts, limit)
+    return podcasts
 
 
 @router.post("/users/{user_id}/podcasts", status_code=status.HTTP_201_CREATED, response_model=PodcastPublic, summary="为用户创建播客")
 async def post_user_podcast(podcast_service: PodcastServiceLoginDep, user_id: int, podcast_upload: PodcastCreate):
-    return podcast_service.create_podcast_by_author_id(user_id, podcast_upload)
+    return await podcast_service.create_podcast_by_author_id(user_id, podcast_upload)
 
 
 @router.get("/users/{user_id}/podcasts", status_code=status.HTTP_200_OK, response_model=list[PodcastPublic], summary="获取用户播客列表")
-async def get_user_podcasts(podcast_service: PodcastServiceDep, user_id: int, offset: Annotated[int | None, Query()] = 0, limit: Annotated[int | None, Query()] = 10):
-    return podcast_service.get_podcasts_by_author_id(user_id, offset, limit)
+async def get_user_podcasts(podcast_service: PodcastServiceDep, user_id: int, request: Request, response: Response, offset: OffsetQuery = 0, limit: LimitQuery = 10, after: AfterQuery = None):
+    podcasts = await podcast_service.get_podcasts_by_author_id(user_id, offset, limit, after)
+    set_next_link(request, response, podcasts, limit)
+    return podcasts
 
 
 @router.post("/podcasts", status_code=status.HTTP_201_CREATED, response_model=PodcastPublic, summary="创建播客")
 async def post_podcast_with_query(podcast_service: PodcastServiceLoginDep, author_id: Annotated[int, Query], podcast_upload: PodcastCreate):
-    return podcast_service.create_podcast_by_author_id(author_id, podcast_upload)
+    return await podcast_service.create_podcast_by_author_id(author_id, podcast_upload)
 
 
 @router.get("/podcasts", status_code=status.HTTP_200_OK, response_model=list[PodcastPublic], summary="获取播客列表")
-async def get_podcasts(podcast_service: PodcastServiceDep, offset: Annotated[int | None, Query()] = 0, limit: Annotated[int | None, Query()] = 10):
-    return podcast_service.get_all_podcasts(offset, limit)
+async def get_podcasts(podcast_service: PodcastServiceDep, request: Request, response: Response, keyword: KeywordQuery = None, offset: OffsetQuery = 0, limit: LimitQuery = 10, after: AfterQuery = None):
+    if keyword:
+        podcasts, cursor = await podcast_service.search_podcasts(keyword, offset, limit, after)
+        set_next_link(request, response, podcasts, limit, cursor)
+        return podcasts
+
+    podcasts = await podcast_service.get_all_podcasts(offset, limit, after)
+    set_next_link(request, response, podcasts, limit)
+    return podcasts
 
 
 @router.get("/podcasts/{id}", status_code=status.HTTP_200_OK, response_model=PodcastPublic, summary="获取指定播客")
 async def get_user_by_path(podcast_service: PodcastServiceDep, id: int):
-    return podcast_service.get_podcast_by_id(id)
+    return await podcast_service.get_podcast_by_id(id)
 
 
 @router.put("/podcasts/{id}", status_code=status.HTTP_200_OK, response_model=PodcastPublic, summary="修改指定播客")
 async def put_podcast_by_path(podcast_service: PodcastServiceLoginDep, id: int, podcast_update: PodcastUpdate):
-    return podcast_service.update_podcast_by_id(id, podcast_update)
+    return await podcast_service.update_podcast_by_id(id, podcast_update)
 
 
-@router.delete("/podcasts/{id}", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="删除指定播客")
-async def delete_podcast_by_path(podcast_service: PodcastServiceLoginDep, id: int):
-    return podcast_service.delete_podcast_by_id(id)
+@router.delete("/podcasts/{id}", status_code=status.HTTP_202_ACCEPTED, response_model=DeletionJobPublic, summary="删除指定播客")
+async def delete_podcast_by_path(podcast_service: PodcastServiceLoginDep, response: Response, id: int):
+    job = await podcast_service.delete_podcast_by_id(id)
+    response.headers["Location"] = f"/deletion-jobs/{job.id}"
+    return job
 
 
 @router.get("/podcasts/{id}/cover", status_code=status.HTTP_200_OK, response_class=StreamingResponse, summary="获取指定播客封面")
-async def get_podcast_cover(podcast_service: PodcastServiceDep, id: int):
-    return podcast_service.get_cover_by_id(id)
+async def get_podcast_cover(podcast_service: PodcastServiceDep, id: int, size: ImageSizeQuery = None, format: ImageFormatQuery = None, v: MediaVersionQuery = None, accept: Annotated[str | None, Header()] = None, if_none_match: Annotated[str | None, Header()] = None, range: Annotated[str | None, Header()] = None):
+    return await podcast_service.get_cover_by_id(id, size, format, accept, v, if_none_match, range)
+
+
+@router.put("/podcasts/{id}/cover", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定播客封面", openapi_extra=multipart_file_openapi("avatar_update"))
+async def put_podcast_cover(podcast_service: PodcastServiceLoginDep, id: int, request: Request, x_content_sha256: Annotated[str | None, Header()] = None):
+    return await podcast_service.update_cover_by_id(id, MultipartFileStream(request, "avatar_update"), x_content_sha256)
+
+
+@router.post("/podcasts/{id}/cover/direct-uploads", status_code=status.HTTP_201_CREATED, response_model=DirectUploadPublic, summary="创建指定播客封面直传")
+async def post_podcast_cover_direct_upload(podcast_service: PodcastServiceLoginDep, id: int, upload_create: DirectUploadCreate):
+    return await podcast_service.create_cover_direct_upload(id, upload_create)
 
 
-@router.put("/podcasts/{id}/cover", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定播客封面")
-async def put_podcast_cover(podcast_service: PodcastServiceLoginDep, id: int, avatar_update: UploadFile):
-    return podcast_service.update_cover_by_id(id, avatar_update)
+@router.post("/podcasts/{id}/cover/direct-uploads/complete", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="完成指定播客封面直传")
+async def post_podcast_cover_direct_upload_complete(podcast_service: PodcastServiceLoginDep, id: int, upload_complete: DirectUploadComplete):
+    return await podcast_service.complete_cover_direct_upload(id, upload_complete)
 
 
 @router.get("/podcasts/{id}/rss", status_code=status.HTTP_200_OK, summary="获取指定播客RSS")
-async def get_podcast_cover(podcast_service: PodcastServiceDep, id: int):
-    return podcast_service.get_rss_by_id(id)
+async def get_podcast_rss(podcast_service: PodcastServiceDep, id: int, if_none_match: Annotated[str | None, Header()] = None, if_modified_since: Annotated[str | None, Header()] = None):
+    return await podcast_service.get_rss_by_id(id, if_none_match, if_modified_since)
@@ -1,10 +1,16 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Query, UploadFile, status
+from fastapi import APIRouter, Header, Request, Response, status
 from fastapi.responses import FileResponse, StreamingResponse
 
 from src.core.constants import CommonMessage
+from src.models.deletion_job import DeletionJobPublic
+from src.models.upload_session import DirectUploadComplete, DirectUploadCreate, DirectUploadPublic
 from src.models.user import UserCreate, UserPublic, UserUpdate
+from src.utils.http_utils import MediaVersionQuery
+from src.utils.image_utils import ImageFormatQuery, ImageSizeQuery
+from src.utils.multipart_utils import MultipartFileStream, multipart_file_openapi
+from src.utils.pagination_utils import AfterQuery, LimitQuery, OffsetQuery, set_next_link
 from src.services.user_service import UserServiceDep, UserServiceLoginDep
 
 router = APIRouter(prefix="/users", tags=["用户"])
@@ -12,12 +18,14 @@ router = APIRouter(prefix="/users", tags=["用户"])
 
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=UserPublic, summary="创建用户")
 async def post_user(user_service: UserServiceDep, user: UserCreate):
-    return user_service.create_user(user)
+    return await user_service.create_user(user)
 
 
 @router.get("", status_code=status.HTTP_200_OK, response_model=list[UserPublic], summary="获取用户列表")
-async def get_users_with_query(user_service: UserServiceDep, offset: Annotated[int, Query()] = 0, limit: Annotated[int, Query()] = 10):
-    return user_service.get_all_users(offset, limit)
+async def get_users_with_query(user_service: UserServiceDep, request: Request, response: Response, offset: OffsetQuery = 0, limit: LimitQuery = 10, after: AfterQuery = None):
+    users = await user_service.get_all_users(offset, limit, after)
+    set_next_link(request, response, users, limit)
+    return users
 
 
 @router.get("/me", status_code=status.HTTP_200_OK, response_model=UserPublic, summary="获取当前用户")
@@ -27,44 +35,71 @@ async def get_user_me(user_service: UserServiceLoginDep):
 
 @router.put("/me", status_code=status.HTTP_200_OK, response_model=UserPublic, summary="修改当前用户")
 async def put_user_me(user_service: UserServiceLoginDep, user_update: UserUpdate):
-    return user_service.update_user_by_id(user_service.user_login.id, user_update)
+    return await user_service.update_user_by_id(user_service.user_login.id, user_update)
 
 
-@router.delete("/me", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="删除当前用户")
-async def delete_user_me(user_service: UserServiceLoginDep):
-    return user_service.delete_user_by_id(user_service.user_login.id)
+@router.delete("/me", status_code=status.HTTP_202_ACCEPTED, response_model=DeletionJobPublic, summary="删除当前用户")
+async def delete_user_me(user_service: UserServiceLoginDep, response: Response):
+    job = await user_service.delete_user_by_id(user_service.user_login.id)
+    response.headers["Location"] = f"/deletion-jobs/{job.id}"
+    return job
 
 
-@router.put("/me/avatar", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改当前用户头像")
-async def put_user_me_avatar(user_service: UserServiceLoginDep, avatar_update: UploadFile):
-    return user_service.update_avatar_by_id(user_service.user_login.id, avatar_update)
+@router.put("/me/avatar", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改当前用户头像", openapi_extra=multipart_file_openapi("avatar_update"))
+async def put_user_me_avatar(user_service: UserServiceLoginDep, request: Request, x_content_sha256: Annotated[str | None, Header()] = None):
+    return await user_service.update_avatar_by_id(user_service.user_login.id, MultipartFileStream(request, "avatar_update"), x_content_sha256)
+
+
+@router.post("/me/avatar/direct-uploads", status_code=status.HTTP_201_CREATED, response_model=DirectUploadPublic, summary="创建当前用户头像直传")
+async def post_user_me_avatar_direct_upload(user_service: UserServiceLoginDep, upload_create: DirectUploadCreate):
+    return await user_service.create_avatar_direct_upload(user_service.user_login.id, upload_create)
+
+
+@router.post("/me/avatar/direct-uploads/complete", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="完成当前用户头像直传")
+async def post_user_me_avatar_direct_upload_complete(user_service: UserServiceLoginDep, upload_complete: DirectUploadComplete):
+    return await user_service.complete_avatar_direct_upload(user_service.user_login.id, upload_complete)
 
 
 @router.get("/me/avatar", status_code=status.HTTP_200_OK, response_class=FileResponse, summary="获取当前用户头像")
-async def get_user_me_avatar(user_service: UserServiceLoginDep):
-    return user_service.get_avatar_by_id(user_service.user_login.id)
+async def get_user_me_avatar(user_service: UserServiceLoginDep, size: ImageSizeQuery = None, format: ImageFormatQuery = None, accept: Annotated[str | None, Header()] = None, if_none_match: Annotated[str | None, Header()] = None, range: Annotated[str | None, Header()] = None):
+    response = await user_service.get_avatar_by_id(user_service.user_login.id, size, format, accept, None, if_none_match, range)
+    # Whose avatar this is depends on the Authorization header.
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
 @router.get("/{id}", status_code=status.HTTP_200_OK, response_model=UserPublic, summary="获取指定用户")
 async def get_user_by_path(user_service: UserServiceDep, id: int):
-    return user_service.get_user_by_id(id)
+    return await user_service.get_user_by_id(id)
 
 
 @router.put("/{id}", status_code=status.HTTP_200_OK, response_model=UserPublic, summary="修改指定用户")
 async def put_user_by_path(user_service: UserServiceLoginDep, id: int, user_update: UserUpdate):
-    return user_service.update_user_by_id(id, user_update)
+    return await user_service.update_user_by_id(id, user_update)
 
 
-@router.delete("/{id}", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="删除指定用户")
-async def delete_user_by_path(user_service: UserServiceLoginDep, id: int):
-    return user_service.delete_user_by_id(id)
+@router.delete("/{id}", status_code=status.HTTP_202_ACCEPTED, response_model=DeletionJobPublic, summary="删除指定用户")
+async def delete_user_by_path(user_service: UserServiceLoginDep, response: Response, id: int):
+    job = await user_service.delete_user_by_id(id)
+    response.headers["Location"] = f"/deletion-jobs/{job.id}"
+    return job
 
 
 @router.get("/{id}/avatar", status_code=status.HTTP_200_OK, response_class=StreamingResponse, summary="获取指定用户头像")
-async def get_user_avatar_by_path(user_service: UserServiceDep, id: int):
-    return user_service.get_avatar_by_id(id)
+async def get_user_avatar_by_path(user_service: UserServiceDep, id: int, size: ImageSizeQuery = None, format: ImageFormatQuery = None, v: MediaVersionQuery = None, accept: Annotated[str | None, Header()] = None, if_none_match: Annotated[str | None, Header()] = None, range: Annotated[str | None, Header()] = None):
+    return await user_service.get_avatar_by_id(id, size, format, accept, v, if_none_match, range)
+
+
+@router.put("/{id}/avatar", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定用户头像", openapi_extra=multipart_file_openapi("avatar_update"))
+async def put_user_avatar_by_path(user_service: UserServiceLoginDep, id: int, request: Request, x_content_sha256: Annotated[str | None, Header()] = None):
+    return await user_service.update_avatar_by_id(id, MultipartFileStream(request, "avatar_update"), x_content_sha256)
+
+
+@router.post("/{id}/avatar/direct-uploads", status_code=status.HTTP_201_CREATED, response_model=DirectUploadPublic, summary="创建指定用户头像直传")
+async def post_user_avatar_direct_upload(user_service: UserServiceLoginDep, id: int, upload_create: DirectUploadCreate):
+    return await user_service.create_avatar_direct_upload(id, upload_create)
 
 
-@router.put("/{id}/avatar", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="修改指定用户头像")
-async def put_user_avatar_by_path(user_service: UserServiceLoginDep, id: int, avatar_update: UploadFile):
-    return user_service.update_avatar_by_id(id, avatar_update)
+@router.post("/{id}/avatar/direct-uploads/complete", status_code=status.HTTP_200_OK, response_model=CommonMessage, summary="完成指定用户头像直传")
+async def post_user_avatar_direct_upload_complete(user_service: UserServiceLoginDep, id: int, upload_complete: DirectUploadComplete):
+    return await user_service.complete_avatar_direct_upload(id, upload_complete)
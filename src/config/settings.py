@@ -1,3 +1,5 @@
+import os
+
 from pydantic_settings import BaseSettings
 
 
@@ -20,6 +22,29 @@ class Settings(BaseSettings):
 
     # Database
     PGDB_URL: str = ""
+    # Async driver URL for read paths; derived from PGDB_URL when empty
+    PGDB_ASYNC_URL: str = ""
+    # Create missing tables on startup (development). Deployments should run
+    # `alembic upgrade head` and turn this off.
+    DB_CREATE_TABLES_ON_STARTUP: bool = True
+
+    # Database connection pools (applied to the sync and the async engine
+    # each, so a worker holds up to 2 * (size + overflow) connections)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Reconnect connections older than this; -1 disables
+    DB_POOL_RECYCLE: int = 1800
+    # Test connections on checkout so stale ones after a failover are replaced
+    DB_POOL_PRE_PING: bool = True
+    # Server-side limit for each statement (PostgreSQL only), set on every
+    # pooled connection; migrations run without it. 0 disables
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+
+    # Object storage: "cos", or "local" to keep objects under CONTENTS_DIR and
+    # serve them straight from disk. Local storage has no presigned URLs, so
+    # media is always proxied and direct uploads are refused.
+    STORAGE_BACKEND: str = "cos"
 
     # COS
 
@@ -27,12 +52,107 @@ class Settings(BaseSettings):
     COS_SECRET_KEY: str = ""
     COS_REGION: str = ""
     COS_BUCKET: str = ""
+    COS_SCHEME: str = "https"
+
+    # COS connection pool & timeouts (seconds)
+    COS_MAX_CONNECTIONS: int = 100
+    COS_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    COS_KEEPALIVE_EXPIRY: float = 30.0
+    COS_CONNECT_TIMEOUT: float = 5.0
+    COS_READ_TIMEOUT: float = 30.0
+    COS_WRITE_TIMEOUT: float = 60.0
+    COS_POOL_TIMEOUT: float = 10.0
+
+    # Objects above the threshold are uploaded as parallel multipart parts
+    COS_MULTIPART_THRESHOLD: int = 32 * 1024 * 1024
+    COS_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    COS_MULTIPART_CONCURRENCY: int = 4
+
+    # Media delivery: "proxy" streams bytes through the API, "redirect" answers
+    # with a short-lived presigned COS URL
+    MEDIA_DELIVERY_MODE: str = "proxy"
+    MEDIA_REDIRECT_STATUS_CODE: int = 307
+    PRESIGNED_URL_EXPIRE_SECONDS: int = 600
+    # Cached URLs are re-signed this long before they expire
+    PRESIGNED_URL_REFRESH_MARGIN_SECONDS: int = 120
+    PRESIGNED_URL_CACHE_SIZE: int = 10000
+    # Cache-Control of proxied media: URLs carrying the current version (`v`)
+    # are immutable, plain URLs are revalidated after max-age
+    MEDIA_MAX_AGE_SECONDS: int = 60
+    MEDIA_IMMUTABLE_MAX_AGE_SECONDS: int = 365 * 24 * 3600
+
+    # Read-through cache of objects fetched from COS, per worker. Objects up
+    # to the memory limit are kept in memory; larger ones go to a private
+    # directory under OBJECT_CACHE_DIR (empty disables the disk tier)
+    OBJECT_CACHE_MEMORY_BYTES: int = 64 * 1024 * 1024
+    OBJECT_CACHE_MEMORY_MAX_OBJECT_BYTES: int = 1024 * 1024
+    OBJECT_CACHE_DIR: str = ""
+    OBJECT_CACHE_DISK_BYTES: int = 1024 * 1024 * 1024
+    OBJECT_CACHE_DISK_MAX_OBJECT_BYTES: int = 64 * 1024 * 1024
+
+    # Covers and avatars are re-encoded at these sizes (longest side, in px)
+    # as WebP and JPEG on upload, by a pool of worker processes
+    IMAGE_VARIANT_SIZES: list[int] = [64, 300, 1400]
+    IMAGE_VARIANT_QUALITY: int = 85
+    IMAGE_VARIANT_WORKERS: int = 2
+    # Variant linked from the feed's itunes:image; Apple Podcasts requires
+    # 1400 to 3000 px JPEG or PNG
+    RSS_IMAGE_SIZE: int = 1400
+
+    # Rendered RSS feeds kept in memory per worker
+    FEED_CACHE_SIZE: int = 1000
+    FEED_CACHE_TTL_SECONDS: int = 3600
+    # Pre-rendered <item> fragments, reused across feed rebuilds
+    RSS_ITEM_CACHE_SIZE: int = 100000
+    RSS_ITEM_CACHE_TTL_SECONDS: int = 86400
+
+    # Feed rebuilds are coalesced per podcast: rebuild once mutations have been
+    # quiet for the debounce window, but never later than the max delay
+    RSS_REBUILD_DEBOUNCE_SECONDS: float = 2.0
+    RSS_REBUILD_MAX_DELAY_SECONDS: float = 30.0
+
+    # Verified bearer tokens kept per worker, so authenticated requests skip
+    # the user query; entries never outlive the token's exp
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 300
+
+    # Password hashing runs on its own threads (bcrypt releases the GIL), so
+    # logins never block the event loop. Requests beyond the workers plus the
+    # queue are refused with 503 and Retry-After instead of piling up.
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # Largest page any list endpoint returns
+    PAGINATION_MAX_LIMIT: int = 100
 
     # Base Url
     BASE_URL: str = "http://10.42.0.1:8000/"
     # BASE_URL: str = "http://127.0.0.1:8000/"
 
-    # Static files dir
+    # Resumable audio uploads (chunks map onto COS multipart parts, which must
+    # be at least 1 MiB except for the last one)
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+    UPLOAD_MIN_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_CHUNK_SIZE: int = 512 * 1024 * 1024
+    UPLOAD_MAX_CHUNKS: int = 10000
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+    UPLOAD_SESSION_GC_INTERVAL_SECONDS: int = 3600
+
+    # Direct uploads: clients PUT straight to COS with a presigned URL, then
+    # ask the API to verify and attach the object
+    DIRECT_UPLOAD_EXPIRE_SECONDS: int = 3600
+
+    # Background deletion of users and podcasts: episodes are purged in
+    # batches, failed jobs are retried with exponential backoff, and a job
+    # whose worker stopped reporting progress is picked up again
+    DELETION_JOB_BATCH_SIZE: int = 200
+    DELETION_JOB_MAX_ATTEMPTS: int = 5
+    DELETION_JOB_RETRY_SECONDS: int = 30
+    DELETION_JOB_LEASE_SECONDS: int = 300
+    DELETION_JOB_POLL_INTERVAL_SECONDS: int = 10
+
+    # Root directory of the local storage backend
     CONTENTS_DIR: str = ""
 
     # Authentication & Authorization
@@ -42,6 +162,8 @@ class Settings(BaseSettings):
 
     # DevOps
     STATE_CHECK_KEY: str = ""
+    # How often the event loop lag reported by /metrics is sampled
+    METRICS_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
 
     class Config:
         env_file = ".env"
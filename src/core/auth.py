@@ -1,3 +1,8 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
@@ -8,7 +13,9 @@ from pydantic import BaseModel
 from sqlmodel import Session, select
 from passlib.context import CryptContext
 
+from src.core.cache import TTLCache
 from src.core.database import SessionDep
+from src.core.exceptions import ServiceBusyError
 from src.models.user import User
 from src.config.settings import settings
 
@@ -19,24 +26,119 @@ TokenDep = Annotated[str, Depends(oauth2_scheme)]
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+class PrincipalCache:
+    """
+    Verified bearer token -> authenticated user, so repeat requests skip both
+    `jwt.decode` and the user query.
+
+    Entries are keyed by the token's SHA-256 and never outlive its `exp`, nor
+    PRINCIPAL_CACHE_TTL_SECONDS from when the user row was read. `invalidate`
+    records when a user changed, which retires every entry read before then;
+    a record is dropped once it is older than the TTL, as no entry it could
+    retire is left. Other workers only catch up when their entries expire, so
+    the TTL also bounds how stale they can be.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._entries: TTLCache[tuple[float, User]] = TTLCache(max_size)
+        # username -> when it was last invalidated, oldest first, in monotonic time
+        self._invalidated: OrderedDict[str, float] = OrderedDict()
+        self._ttl = ttl
+
+    def get(self, token: str) -> User | None:
+        entry = self._entries.get(self._digest(token))
+        if entry is None:
+            return None
+        loaded_at, user = entry
+        invalidated_at = self._invalidated.get(user.username)
+        if invalidated_at is not None and loaded_at <= invalidated_at:
+            return None
+        return user
+
+    def set(self, token: str, user: User, loaded_at: float, expires_at: float):
+        # A detached copy: the loaded instance belongs to the request's session.
+        snapshot = User.model_validate(user.model_dump())
+        self._entries.set(self._digest(token), (loaded_at, snapshot),
+                          min(loaded_at + self._ttl - time.monotonic(), expires_at - time.time()))
+
+    def invalidate(self, username: str):
+        now = time.monotonic()
+        self._invalidated.pop(username, None)
+        self._invalidated[username] = now
+        while next(iter(self._invalidated.values())) <= now - self._ttl:
+            self._invalidated.popitem(last=False)
+
+    def _digest(self, token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+class PasswordHashPool:
+    """
+    Runs bcrypt off the event loop on a fixed set of threads.
+
+    At most `workers + max_queue` calls are admitted at once; the rest fail
+    fast with ServiceBusyError, so a login burst sheds load instead of growing
+    an unbounded backlog whose requests would time out anyway.
+    """
+
+    def __init__(self, workers: int, max_queue: int, retry_after: int):
+        self._executor = ThreadPoolExecutor(
+            workers, thread_name_prefix="password-hash")
+        self._capacity = workers + max_queue
+        self._retry_after = retry_after
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, func, *args):
+        if self._pending >= self._capacity:
+            raise ServiceBusyError(self._retry_after)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hash_pool = PasswordHashPool(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_QUEUE,
+    settings.PASSWORD_HASH_RETRY_AFTER_SECONDS
+)
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await password_hash_pool.run(pwd_context.hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(pwd_context.verify, plain_password, hashed_password)
 
 
 def get_user(session: Session, username: str) -> User:
-    return session.exec(select(User).where(User.username == username)).first()
+    return session.exec(select(User).where(User.username == username, User.deleted_at.is_(None))).first()
 
 
 async def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -51,17 +153,21 @@ async def get_current_user(session: SessionDep, token: TokenDep) -> User:
     except jwt.InvalidTokenError:
         raise credentials_exception
 
+    # Taken before the query, so an update racing with it leaves the entry stale.
+    loaded_at = time.monotonic()
     user = get_user(session, username)
     if user is None:
         raise credentials_exception
+    if "exp" in payload:
+        principal_cache.set(token, user, loaded_at, payload["exp"])
     return user
 
 
-def authenticate_user(session: Session, username: str, password: str) -> bool | User:
+async def authenticate_user(session: Session, username: str, password: str) -> bool | User:
     user = get_user(session, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -16,5 +16,27 @@ class ContentFileType(Enum):
     RSS_XML = "rss_xmls"
 
 
+class MediaDeliveryMode(Enum):
+    PROXY = "proxy"
+    REDIRECT = "redirect"
+
+
+class StorageBackendType(Enum):
+    COS = "cos"
+    LOCAL = "local"
+
+
+class DeletionEntityType(Enum):
+    USER = "user"
+    PODCAST = "podcast"
+
+
+class DeletionJobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 class CommonMessage(BaseModel):
     message: str
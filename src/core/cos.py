@@ -1,18 +1,300 @@
 
+import asyncio
+import base64
+import hashlib
+import logging
+from typing import AsyncIterable, AsyncIterator
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import httpx
 from qcloud_cos import CosConfig
 from qcloud_cos import CosS3Client
 
-from src.core.exceptions import CosError
+from src.core.exceptions import InvalidUploadError, StorageError
 from src.config.settings import settings
+from src.core.storage import FileInfo, StorageBackend
+from src.utils.range_utils import ByteRange
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCosClient:
+    """
+    Non-blocking COS client sharing one keep-alive connection pool.
+
+    Requests are signed with the SDK's `CosS3Client.get_auth` (a pure local
+    computation) and sent with `httpx.AsyncClient`, so no COS round trip ever
+    blocks the event loop.
+    """
+
+    def __init__(self, signer: CosS3Client, bucket: str):
+        self._signer = signer
+        self._bucket = bucket
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.COS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.COS_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.COS_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.COS_CONNECT_TIMEOUT,
+                read=settings.COS_READ_TIMEOUT,
+                write=settings.COS_WRITE_TIMEOUT,
+                pool=settings.COS_POOL_TIMEOUT
+            )
+        )
+
+    async def send(self, method: str, key: str, headers: dict[str, str] | None = None, params: dict[str, str] | None = None, content=None, stream: bool = False) -> httpx.Response:
+        headers = dict(headers or {})
+        params = dict(params or {})
+        headers["Authorization"] = self._signer.get_auth(
+            Method=method, Bucket=self._bucket, Key=key, Headers=headers, Params=params)
+        request = self._http.build_request(
+            method, self._signer.get_object_url(self._bucket, key),
+            headers=headers, params=params, content=content)
+        return await self._http.send(request, stream=stream)
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class CosStorage(StorageBackend):
+    """Objects in a COS bucket, over the shared `AsyncCosClient`."""
+
+    supports_presigned_urls = True
+    CHUNK_SIZE = 64 * 1024
+    # Most keys COS accepts in one multi-object delete
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(self, client: AsyncCosClient, signer: CosS3Client, bucket: str):
+        self._client = client
+        self._signer = signer
+        self._bucket = bucket
+
+    async def put(self, key: str, content: bytes | AsyncIterable[bytes], size: int | None, content_type: str | None):
+        if not isinstance(content, bytes) and (size is None or size > settings.COS_MULTIPART_THRESHOLD):
+            return await self._put_stream(content, key, content_type)
+
+        headers = {"Content-Type": content_type} if content_type else {}
+        if size is not None:
+            headers["Content-Length"] = str(size)
+        try:
+            response = await self._client.send("PUT", key, headers=headers, content=content)
+            response.raise_for_status()
+        except Exception as e:
+            raise StorageError
+
+    async def get(self, key: str, byte_range: ByteRange | None = None) -> tuple[AsyncIterator[bytes], FileInfo]:
+        headers = {"Range": byte_range.to_header()} if byte_range else {}
+        try:
+            response = await self._client.send("GET", key, headers=headers, stream=True)
+            if response.is_error:
+                await response.aclose()
+                response.raise_for_status()
+        except Exception as e:
+            raise StorageError
+
+        return self._iter_response(response), self._get_file_info(response)
+
+    async def read(self, key: str, byte_range: ByteRange | None = None) -> tuple[bytes, FileInfo]:
+        headers = {"Range": byte_range.to_header()} if byte_range else {}
+        try:
+            response = await self._client.send("GET", key, headers=headers)
+            response.raise_for_status()
+        except Exception as e:
+            raise StorageError
+
+        return response.content, self._get_file_info(response)
+
+    async def head(self, key: str) -> FileInfo | None:
+        try:
+            response = await self._client.send("HEAD", key)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+        except Exception as e:
+            raise StorageError
+
+        return self._get_file_info(response)
+
+    async def delete(self, key: str):
+        try:
+            response = await self._client.send("DELETE", key)
+            # Deleting a missing key is not an error for our callers.
+            if response.status_code != 404:
+                response.raise_for_status()
+        except Exception as e:
+            raise StorageError
+
+    async def delete_many(self, keys: list[str]):
+        body = "".join(f"<Object><Key>{escape(key)}</Key></Object>" for key in keys)
+        body = f"<Delete><Quiet>true</Quiet>{body}</Delete>".encode()
+        headers = {
+            "Content-Type": "application/xml",
+            "Content-MD5": base64.b64encode(hashlib.md5(body).digest()).decode()
+        }
+        try:
+            # "/" addresses the bucket itself
+            response = await self._client.send("POST", "/", headers=headers, params={"delete": ""}, content=body)
+            response.raise_for_status()
+            # Quiet mode only lists the keys that failed.
+            if _find_xml_text(response.content, "Code"):
+                raise StorageError()
+        except Exception as e:
+            raise StorageError
+
+    async def create_multipart_upload(self, key: str, content_type: str | None = None) -> str:
+        headers = {"Content-Type": content_type} if content_type else {}
+        try:
+            response = await self._client.send("POST", key, headers=headers, params={"uploads": ""})
+            response.raise_for_status()
+            return _find_xml_text(response.content, "UploadId")
+        except Exception as e:
+            raise StorageError
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, content: bytes | AsyncIterable[bytes], size: int) -> str:
+        params = {"partNumber": str(part_number), "uploadId": upload_id}
+        try:
+            response = await self._client.send("PUT", key, headers={"Content-Length": str(size)}, params=params, content=content)
+            response.raise_for_status()
+            return response.headers["etag"]
+        except Exception as e:
+            raise StorageError
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]):
+        body = "".join(
+            f"<Part><PartNumber>{part_number}</PartNumber><ETag>{etag}</ETag></Part>"
+            for part_number, etag in sorted(parts)
+        )
+        body = f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode()
+        try:
+            response = await self._client.send("POST", key, headers={"Content-Type": "application/xml"}, params={"uploadId": upload_id}, content=body)
+            response.raise_for_status()
+            # COS may report a failed completion with 200 and an <Error> body.
+            if _find_xml_text(response.content, "Code"):
+                raise StorageError()
+        except Exception as e:
+            raise StorageError
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        try:
+            response = await self._client.send("DELETE", key, params={"uploadId": upload_id})
+            if response.status_code != 404:
+                response.raise_for_status()
+        except Exception as e:
+            raise StorageError
+
+    def get_presigned_url(self, key: str, method: str, expire_seconds: int, headers: dict[str, str] | None = None) -> str:
+        try:
+            # The signer adds its own headers to the dict it is given, hence the copy.
+            return self._signer.get_presigned_url(
+                Bucket=self._bucket, Key=key, Method=method, Expired=expire_seconds, Headers=dict(headers or {}))
+        except Exception as e:
+            raise StorageError
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _get_file_info(self, response: httpx.Response) -> FileInfo:
+        size = response.headers["content-length"]
+        # A ranged GET's length is the range's; the object's follows the slash
+        # in `Content-Range: bytes a-b/total`.
+        if response.status_code == 206:
+            _, _, total = response.headers.get("content-range", "").rpartition("/")
+            if total.isdigit():
+                size = total
+        return FileInfo(
+            size=int(size),
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            content_type=response.headers.get("content-type")
+        )
+
+    async def _iter_response(self, response: httpx.Response) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def _put_stream(self, chunks: AsyncIterable[bytes], key: str, content_type: str | None):
+        """
+        Upload a stream of unknown length in constant memory.
+
+        Chunks are buffered into COS_MULTIPART_PART_SIZE parts which are sent
+        in parallel; reading the stream pauses while
+        COS_MULTIPART_CONCURRENCY parts are in flight. A stream that fits in
+        one part becomes a single PUT.
+        """
+        part_size = settings.COS_MULTIPART_PART_SIZE
+        semaphore = asyncio.Semaphore(settings.COS_MULTIPART_CONCURRENCY)
+        buffer = bytearray()
+        upload_id = None
+        part_count = 0
+        parts = []
+
+        async def upload(part_number: int, content: bytes):
+            try:
+                parts.append((part_number, await self.upload_part(key, upload_id, part_number, content, len(content))))
+            finally:
+                semaphore.release()
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                async for chunk in chunks:
+                    buffer += chunk
+                    while len(buffer) >= part_size:
+                        if upload_id is None:
+                            upload_id = await self.create_multipart_upload(key, content_type)
+                        await semaphore.acquire()
+                        part_count += 1
+                        task_group.create_task(
+                            upload(part_count, bytes(buffer[:part_size])))
+                        del buffer[:part_size]
+
+                if upload_id is not None and buffer:
+                    await semaphore.acquire()
+                    part_count += 1
+                    task_group.create_task(upload(part_count, bytes(buffer)))
+
+            if upload_id is None:
+                headers = {"Content-Type": content_type} if content_type else {}
+                response = await self._client.send("PUT", key, headers=headers, content=bytes(buffer))
+                response.raise_for_status()
+            else:
+                await self.complete_multipart_upload(key, upload_id, parts)
+        except Exception as e:
+            if upload_id is not None:
+                await self.abort_multipart_upload(key, upload_id)
+            # A malformed client body is the caller's error, not storage's. The
+            # body is read inside the task group, so its error arrives grouped.
+            if isinstance(e, ExceptionGroup):
+                e = next((error for error in e.exceptions if isinstance(error, InvalidUploadError)), e)
+            if isinstance(e, InvalidUploadError):
+                raise e
+            raise StorageError
+
+
+def _find_xml_text(content: bytes, tag: str) -> str | None:
+    if not content:
+        return None
+    for node in ElementTree.fromstring(content).iter():
+        if node.tag.rsplit("}", 1)[-1] == tag:
+            return node.text
+    return None
+
 
 try:
     config = CosConfig(
         Region=settings.COS_REGION,
         SecretId=settings.COS_SECRET_ID,
-        SecretKey=settings.COS_SECRET_KEY
+        SecretKey=settings.COS_SECRET_KEY,
+        Scheme=settings.COS_SCHEME
     )
 
     cos_client = CosS3Client(config)
-except Exception as e:
-    print(e)
-    raise CosError()
+    async_cos_client = AsyncCosClient(cos_client, settings.COS_BUCKET)
+except Exception:
+    logger.exception("Failed to create the COS client")
+    raise StorageError()
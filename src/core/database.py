@@ -1,9 +1,221 @@
+import re
+import threading
+from time import perf_counter
 from typing import Annotated
 from fastapi import Depends
+from sqlalchemy import DDL, UniqueConstraint, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from src.config.settings import settings
+from src.core.metrics import CallbackMetric, metrics_registry, record_db_query
 
-engine = create_engine(settings.PGDB_URL)
+# Async drivers for the sync URLs we accept in PGDB_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class PoolWaitStats:
+    """How long callers waited to get a connection out of a pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+
+class WaitTimingMixin:
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(perf_counter() - start)
+
+    def recreate(self):
+        # Keep the counters across dispose(), which swaps in a fresh pool.
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(WaitTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_async_url(url: str) -> str:
+    if settings.PGDB_ASYNC_URL:
+        return settings.PGDB_ASYNC_URL
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+
+def get_connect_args(url: str) -> dict:
+    """
+    Make DB_STATEMENT_TIMEOUT_MS the connection's default, so it covers every
+    statement run on it, DDL included; migrations lift it in their own session.
+    """
+    url: URL = make_url(url)
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if url.get_backend_name() != "postgresql" or not timeout:
+        return {}
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(timeout)}}
+    return {"options": f"-c statement_timeout={timeout}"}
+
+
+def get_engine_options(url: str) -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": get_connect_args(url),
+    }
+
+
+# The sync engine serves writes and migrations; read-heavy endpoints go through
+# the async engine so a worker can overlap their round trips.
+engine = create_engine(
+    settings.PGDB_URL,
+    poolclass=TimedQueuePool,
+    **get_engine_options(settings.PGDB_URL)
+)
+async_engine = create_async_engine(
+    get_async_url(settings.PGDB_URL),
+    poolclass=TimedAsyncAdaptedQueuePool,
+    **get_engine_options(get_async_url(settings.PGDB_URL))
+)
+
+
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+# SQLite leaves foreign keys, and so ON DELETE CASCADE, unenforced by default.
+for sync_engine in (engine, async_engine.sync_engine):
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", enable_sqlite_foreign_keys)
+
+
+def instrument_queries(sync_engine, name: str):
+    """Time every statement run on `sync_engine` into the SQL metrics."""
+
+    def start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+    def finish(conn, cursor, statement, parameters, context, executemany):
+        record_db_query(name, perf_counter() - conn.info["query_started"].pop())
+
+    def fail(exception_context):
+        started = exception_context.connection.info.get("query_started") \
+            if exception_context.connection is not None else None
+        if started:
+            record_db_query(name, perf_counter() - started.pop())
+
+    event.listen(sync_engine, "before_cursor_execute", start)
+    event.listen(sync_engine, "after_cursor_execute", finish)
+    event.listen(sync_engine, "handle_error", fail)
+
+
+instrument_queries(engine, "sync")
+instrument_queries(async_engine.sync_engine, "async")
+
+
+def get_pool_stats(pool: Pool) -> dict:
+    wait_stats: PoolWaitStats = pool.wait_stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": wait_stats.count,
+        "wait_seconds_total": round(wait_stats.total_seconds, 6),
+        "wait_seconds_max": round(wait_stats.max_seconds, 6),
+    }
+
+
+def get_database_pool_stats() -> dict:
+    return {
+        "sync": get_pool_stats(engine.pool),
+        "async": get_pool_stats(async_engine.pool),
+    }
+
+
+metrics_registry.add(CallbackMetric(
+    "yuyi_db_pool_connections", "Connections of the database pools, by state.", ("engine", "state"),
+    lambda: [((name, state), stats[state])
+             for name, stats in get_database_pool_stats().items()
+             for state in ("checked_out", "idle", "overflow")]))
+metrics_registry.add(CallbackMetric(
+    "yuyi_db_pool_wait_seconds_total", "Time spent waiting to check out a connection.", ("engine",),
+    lambda: [((name,), stats["wait_seconds_total"]) for name, stats in get_database_pool_stats().items()],
+    "counter"))
+
+
+def get_violated_constraint(error: IntegrityError) -> str | None:
+    """Name of the unique constraint an INSERT or UPDATE ran into, if any."""
+    # psycopg2 reports it directly
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        return diag.constraint_name
+
+    # SQLite only names the columns: "UNIQUE constraint failed: user.username"
+    match = re.search(r"UNIQUE constraint failed: (.+)$", str(error.orig))
+    if not match:
+        return None
+    table_name = match.group(1).split(".", 1)[0]
+    columns = {column.strip().split(".", 1)[-1] for column in match.group(1).split(",")}
+    table = SQLModel.metadata.tables.get(table_name)
+    for constraint in table.constraints if table is not None else ():
+        if isinstance(constraint, UniqueConstraint) and set(constraint.columns.keys()) == columns:
+            return constraint.name
+    return None
+
+
+def commit_unique(session: Session, errors: dict[str, type[Exception]]):
+    """
+    Commit, translating a unique-constraint violation into the application
+    error registered for that constraint name.
+    """
+    try:
+        session.commit()
+    except IntegrityError as e:
+        session.rollback()
+        error = errors.get(get_violated_constraint(e))
+        if error:
+            raise error() from e
+        raise
+
+
+# The keyword search indexes need pg_trgm; migration 0004 does the same.
+event.listen(SQLModel.metadata, "before_create", DDL(
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
 
 
 def create_db_and_tables():
@@ -15,4 +227,10 @@ def get_session():
         yield session
 
 
+async def get_async_session():
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
@@ -1,12 +1,14 @@
 
 class AppError(Exception):
 
-    def __init__(self, message: str, code: int = 400):
+    def __init__(self, message: str, code: int = 400, headers: dict[str, str] | None = None):
         super().__init__(message)
         # content
         self.message = message
         # status code
         self.code = code
+        # extra response headers
+        self.headers = headers
 
 
 class AuthenticationFailedError(AppError):
@@ -99,13 +101,67 @@ class EpisodeNotFoundError(NotFoundError):
         super().__init__(message)
 
 
+class DeletionJobNotFoundError(NotFoundError):
+
+    def __init__(self, message: str = "Deletion Job Not Found."):
+        super().__init__(message)
+
+
+class RangeNotSatisfiableError(AppError):
+
+    def __init__(self, size: int, message: str = "Range Not Satisfiable."):
+        super().__init__(message, 416, {"Content-Range": f"bytes */{size}"})
+
+
+class AudioUploadNotFoundError(NotFoundError):
+
+    def __init__(self, message: str = "Audio Upload Not Found."):
+        super().__init__(message)
+
+
+class InvalidUploadError(AppError):
+
+    def __init__(self, message: str = "Invalid Upload."):
+        super().__init__(message, 400)
+
+
+class UploadIncompleteError(AppError):
+
+    def __init__(self, message: str = "Upload Incomplete."):
+        super().__init__(message, 409)
+
+
+class InvalidCursorError(AppError):
+
+    def __init__(self, message: str = "Invalid Cursor."):
+        super().__init__(message, 400)
+
+
 class NoPermissionError(AppError):
 
     def __init__(self, message: str = "Current User Have No Permission."):
         super().__init__(message, 403)
 
 
-class CosError(AppError):
+class ServiceBusyError(AppError):
+
+    def __init__(self, retry_after: int, message: str = "Service Busy, Please Retry Later."):
+        super().__init__(message, 503, {"Retry-After": str(retry_after)})
+
+
+class StorageError(AppError):
+
+    def __init__(self, message: str = "Storage Error."):
+        super().__init__(message, 500)
+
+
+class DirectUploadNotSupportedError(AppError):
+
+    def __init__(self, message: str = "Direct Uploads Are Not Supported By This Storage."):
+        super().__init__(message, 501)
+
+
+class ImageProcessingError(AppError):
 
-    def __init__(self, message: str = "Cos Error."):
+    def __init__(self, message: str = "Image Processing Failed."):
         super().__init__(message, 500)
@@ -0,0 +1,292 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metric:
+    """
+    One metric family in the Prometheus text format, with a sample per
+    combination of label values.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for suffix, labels, value in self._samples():
+            yield f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+
+    def _samples(self) -> Iterable[tuple[str, Iterable[tuple[str, str]], float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield "", zip(self.label_names, label_values), value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class CallbackMetric(Metric):
+    """A gauge or counter read from elsewhere (pool stats, process time) at scrape time."""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...],
+                 collect: Callable[[], Iterable[tuple[tuple[str, ...], float]]], type: str = "gauge"):
+        super().__init__(name, documentation, label_names)
+        self.type = type
+        self._collect = collect
+
+    def _samples(self) -> Iterable[tuple[str, Iterable[tuple[str, str]], float]]:
+        for label_values, value in self._collect():
+            yield "", zip(self.label_names, label_values), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+        # label values -> (count per bucket plus +Inf, sum)
+        self._histograms: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            histogram = self._histograms.get(label_values)
+            if histogram is None:
+                histogram = self._histograms[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = histogram
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def _samples(self) -> Iterable[tuple[str, Iterable[tuple[str, str]], float]]:
+        with self._lock:
+            histograms = [(label_values, list(counts), total[0])
+                          for label_values, (counts, total) in self._histograms.items()]
+        for label_values, counts, total in histograms:
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield "_bucket", [*labels, ("le", _format_value(bound))], cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def add(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(f"{line}\n" for metric in self._metrics for line in metric.render())
+
+
+class RequestStats:
+    """Database and storage time spent on behalf of the request being served."""
+
+    __slots__ = ("db_queries", "db_seconds", "storage_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.storage_seconds = 0.0
+
+
+# Set per request by MetricsMiddleware; threadpool calls and tasks started
+# from the request copy the context, so they add to the same stats.
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+metrics_registry = MetricsRegistry()
+
+http_requests = metrics_registry.add(Counter(
+    "yuyi_http_requests_total", "HTTP requests served, by route template and status.",
+    ("method", "route", "status")))
+http_request_duration = metrics_registry.add(Histogram(
+    "yuyi_http_request_duration_seconds", "Time from receiving a request to finishing its response.",
+    ("method", "route")))
+http_requests_in_progress = metrics_registry.add(Gauge(
+    "yuyi_http_requests_in_progress", "HTTP requests being served.",
+    ("method", "route")))
+request_db_queries = metrics_registry.add(Histogram(
+    "yuyi_http_request_db_queries", "SQL statements executed per request.",
+    ("route",), QUERY_COUNT_BUCKETS))
+request_db_duration = metrics_registry.add(Histogram(
+    "yuyi_http_request_db_seconds", "Time per request spent executing SQL statements.",
+    ("route",)))
+request_storage_duration = metrics_registry.add(Histogram(
+    "yuyi_http_request_storage_seconds", "Time per request spent waiting on object storage.",
+    ("route",)))
+
+db_queries = metrics_registry.add(Counter(
+    "yuyi_db_queries_total", "SQL statements executed, by engine.",
+    ("engine",)))
+db_query_duration = metrics_registry.add(Histogram(
+    "yuyi_db_query_duration_seconds", "Execution time of SQL statements, by engine.",
+    ("engine",)))
+
+storage_operations = metrics_registry.add(Counter(
+    "yuyi_storage_operations_total", "Object storage calls, by backend, operation and outcome.",
+    ("backend", "operation", "outcome")))
+storage_operation_duration = metrics_registry.add(Histogram(
+    "yuyi_storage_operation_duration_seconds",
+    "Latency of object storage calls; for streamed reads, the time to the first byte.",
+    ("backend", "operation")))
+storage_bytes = metrics_registry.add(Counter(
+    "yuyi_storage_bytes_total", "Bytes sent to or received from object storage, by operation.",
+    ("backend", "operation")))
+
+event_loop_lag = metrics_registry.add(Histogram(
+    "yuyi_event_loop_lag_seconds", "How late the event loop ran a timer, sampled periodically.",
+    (), LOOP_LAG_BUCKETS))
+metrics_registry.add(CallbackMetric(
+    "process_cpu_seconds_total", "User and system CPU time of this process.", (),
+    lambda: [((), time.process_time())], "counter"))
+
+
+def record_db_query(engine: str, seconds: float):
+    db_queries.inc(engine)
+    db_query_duration.observe(seconds, engine)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += seconds
+
+
+@contextmanager
+def time_storage_operation(backend: str, operation: str):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        seconds = time.perf_counter() - started
+        storage_operations.inc(backend, operation, outcome)
+        storage_operation_duration.observe(seconds, backend, operation)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.storage_seconds += seconds
+
+
+async def monitor_event_loop_lag(interval_seconds: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval_seconds)
+        event_loop_lag.observe(max(loop.time() - started - interval_seconds, 0.0))
+
+
+class MetricsMiddleware:
+    """
+    Records every HTTP request under its route template (`/podcasts/{id}`),
+    so label cardinality stays bounded, along with the SQL and storage time
+    it spent. What is left of the duration is CPU time or waiting on the loop.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = get_route_template(scope)
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        http_requests_in_progress.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(method, route)
+            http_requests.inc(method, route, str(status_code))
+            http_request_duration.observe(time.perf_counter() - started, method, route)
+            request_db_queries.observe(stats.db_queries, route)
+            request_db_duration.observe(stats.db_seconds, route)
+            request_storage_duration.observe(stats.storage_seconds, route)
+            request_stats.reset(token)
+
+
+def get_route_template(scope: Scope) -> str:
+    # Routing has not run yet, so match the app's routes the way the router will.
+    partial = None
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "<unmatched>"
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    formatted = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{formatted}}}" if formatted else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
@@ -0,0 +1,324 @@
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from hashlib import sha256
+from typing import AsyncIterator, Generic, Hashable, TypeVar
+
+import anyio.to_thread
+
+from src.utils.range_utils import ByteRange
+
+I = TypeVar("I")
+
+
+class ObjectCache(Generic[I]):
+    """
+    Read-through cache of storage objects, in two byte-budgeted LRU tiers.
+
+    Objects up to `memory_max_object_bytes` are kept in memory; larger ones,
+    up to `disk_max_object_bytes`, in a directory private to this process.
+    Disk entries are written to a temporary file and renamed into place, and
+    are served from an mmap of an already open file, so evicting them never
+    cuts off a response in flight.
+
+    Every write or delete of a key must call `invalidate`. A fill that was
+    running when its key got invalidated is dropped instead of stored. As with
+    `TTLCache`, other worker processes are not told about invalidations;
+    object keys are never reused for new content, which keeps that harmless.
+    """
+
+    def __init__(self, memory_bytes: int, memory_max_object_bytes: int, directory: str, disk_bytes: int, disk_max_object_bytes: int):
+        self._memory_bytes = memory_bytes
+        self._memory_max_object_bytes = min(memory_max_object_bytes, memory_bytes)
+        self._directory = directory
+        self._disk_bytes = disk_bytes
+        self._disk_max_object_bytes = min(disk_max_object_bytes, disk_bytes) if directory else -1
+        self._disk_path: str | None = None
+
+        self._memory: OrderedDict[Hashable, tuple[I, bytes]] = OrderedDict()
+        self._disk: OrderedDict[Hashable, tuple[I, int]] = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = 0
+        # key -> token of the fill allowed to store it
+        self._fills: dict[Hashable, object] = {}
+        self._lock = threading.Lock()
+
+        self._hits = {"memory": 0, "disk": 0}
+        self._evictions = {"memory": 0, "disk": 0}
+        self._misses = 0
+
+    def accepts(self, size: int) -> bool:
+        return size <= max(self._memory_max_object_bytes, self._disk_max_object_bytes)
+
+    def get_info(self, key: Hashable) -> I | None:
+        """Metadata of a cached object, without counting a read."""
+        with self._lock:
+            entry = self._memory.get(key) or self._disk.get(key)
+            return entry[0] if entry else None
+
+    async def read(self, key: Hashable, byte_range: ByteRange | None = None) -> tuple[bytes, I] | None:
+
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        info, content, path, size = entry
+        if content is None:
+            content = await anyio.to_thread.run_sync(_read_file, path, byte_range)
+            if content is None:
+                return self._lost(key)
+        elif byte_range:
+            content = content[byte_range.start:byte_range.end + 1]
+
+        return content, info
+
+    async def stream(self, key: Hashable, chunk_size: int, byte_range: ByteRange | None = None) -> tuple[AsyncIterator[bytes], I] | None:
+
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        info, content, path, size = entry
+        start, end = byte_range or (0, size - 1)
+        if content is None:
+            mapped = await anyio.to_thread.run_sync(_map_file, path)
+            if mapped is None:
+                return self._lost(key)
+            return _iter_mapped(mapped, start, end, chunk_size), info
+
+        return _iter_bytes(content, start, end, chunk_size), info
+
+    def start_fill(self, key: Hashable, info: I, size: int) -> "ObjectCacheFill[I] | None":
+        """Begin storing an object that is being read from storage anyway."""
+        if not self.accepts(size):
+            return None
+        token = object()
+        with self._lock:
+            self._fills[key] = token
+        return ObjectCacheFill(self, key, info, size, token)
+
+    async def put(self, key: Hashable, info: I, content: bytes):
+        """Store an object that was read from storage in full."""
+        fill = self.start_fill(key, info, len(content))
+        if fill:
+            await fill.write(content)
+            await fill.commit()
+
+    def invalidate(self, key: Hashable):
+
+        with self._lock:
+            self._fills.pop(key, None)
+            entry = self._memory.pop(key, None)
+            if entry:
+                self._memory_used -= len(entry[1])
+            entry = self._disk.pop(key, None)
+            if entry:
+                self._disk_used -= entry[1]
+                _unlink(self._get_path(key))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory": {
+                    "entries": len(self._memory),
+                    "bytes": self._memory_used,
+                    "max_bytes": self._memory_bytes,
+                    "hits": self._hits["memory"],
+                    "evictions": self._evictions["memory"],
+                },
+                "disk": {
+                    "entries": len(self._disk),
+                    "bytes": self._disk_used,
+                    "max_bytes": self._disk_bytes if self._directory else 0,
+                    "hits": self._hits["disk"],
+                    "evictions": self._evictions["disk"],
+                },
+                "misses": self._misses,
+            }
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            self._disk.clear()
+            self._memory_used = self._disk_used = 0
+            if self._disk_path:
+                shutil.rmtree(self._disk_path, ignore_errors=True)
+                self._disk_path = None
+
+    def _lookup(self, key: Hashable) -> tuple[I, bytes | None, str | None, int] | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._hits["memory"] += 1
+                info, content = entry
+                return info, content, None, len(content)
+            entry = self._disk.get(key)
+            if entry is not None:
+                self._disk.move_to_end(key)
+                self._hits["disk"] += 1
+                info, size = entry
+                return info, None, self._get_path(key), size
+            self._misses += 1
+            return None
+
+    def _lost(self, key: Hashable) -> None:
+        # The file went away between the lookup and the open: evicted or removed
+        # from outside. Report a miss so the caller reads storage instead.
+        with self._lock:
+            self._hits["disk"] -= 1
+            self._misses += 1
+            entry = self._disk.pop(key, None)
+            if entry:
+                self._disk_used -= entry[1]
+        return None
+
+    def _commit(self, key: Hashable, info: I, token: object, content: bytes | None, temp_path: str | None, size: int) -> bool:
+        with self._lock:
+            if self._fills.get(key) is not token:
+                return False
+            del self._fills[key]
+            if content is not None:
+                self._store_memory(key, info, content)
+            else:
+                os.replace(temp_path, self._get_path(key))
+                self._store_disk(key, info, size)
+            return True
+
+    def _discard(self, key: Hashable, token: object):
+        with self._lock:
+            if self._fills.get(key) is token:
+                del self._fills[key]
+
+    def _store_memory(self, key: Hashable, info: I, content: bytes):
+        entry = self._memory.pop(key, None)
+        if entry:
+            self._memory_used -= len(entry[1])
+        self._memory[key] = (info, content)
+        self._memory_used += len(content)
+        while self._memory_used > self._memory_bytes:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self._evictions["memory"] += 1
+
+    def _store_disk(self, key: Hashable, info: I, size: int):
+        entry = self._disk.pop(key, None)
+        if entry:
+            self._disk_used -= entry[1]
+        self._disk[key] = (info, size)
+        self._disk_used += size
+        while self._disk_used > self._disk_bytes:
+            evicted_key, (_, evicted_size) = self._disk.popitem(last=False)
+            self._disk_used -= evicted_size
+            self._evictions["disk"] += 1
+            _unlink(self._get_path(evicted_key))
+
+    def _get_disk_path(self) -> str:
+        with self._lock:
+            if self._disk_path is None:
+                os.makedirs(self._directory, exist_ok=True)
+                self._disk_path = tempfile.mkdtemp(prefix=f"objects-{os.getpid()}-", dir=self._directory)
+            return self._disk_path
+
+    def _get_path(self, key: Hashable) -> str:
+        return os.path.join(self._disk_path, sha256(repr(key).encode()).hexdigest())
+
+
+class ObjectCacheFill(Generic[I]):
+    """
+    Copy of an object being streamed from storage, stored once complete.
+
+    Objects small enough for the memory tier are buffered; larger ones are
+    written to a temporary file beside their final path.
+    """
+
+    def __init__(self, cache: ObjectCache[I], key: Hashable, info: I, size: int, token: object):
+        self._cache = cache
+        self._key = key
+        self._info = info
+        self._size = size
+        self._token = token
+        self._written = 0
+        self._buffer: bytearray | None = None
+        self._file = None
+        self._temp_path: str | None = None
+
+        if size <= cache._memory_max_object_bytes:
+            self._buffer = bytearray()
+
+    async def write(self, chunk: bytes):
+        self._written += len(chunk)
+        if self._buffer is not None:
+            self._buffer += chunk
+            return
+        if self._file is None:
+            self._temp_path = os.path.join(
+                await anyio.to_thread.run_sync(self._cache._get_disk_path), f"{uuid.uuid4().hex}.tmp")
+            self._file = await anyio.to_thread.run_sync(open, self._temp_path, "wb")
+        await anyio.to_thread.run_sync(self._file.write, chunk)
+
+    async def commit(self):
+        # A short read (connection dropped, object replaced) is not cached.
+        if self._written != self._size:
+            return await self.abort()
+        if self._buffer is not None:
+            self._cache._commit(self._key, self._info, self._token, bytes(self._buffer), None, self._size)
+            return
+        if self._file is not None:
+            await anyio.to_thread.run_sync(self._file.close)
+            self._file = None
+        if not self._cache._commit(self._key, self._info, self._token, None, self._temp_path, self._size):
+            await self.abort()
+
+    async def abort(self):
+        self._cache._discard(self._key, self._token)
+        self._buffer = None
+        if self._file is not None:
+            await anyio.to_thread.run_sync(self._file.close)
+            self._file = None
+        if self._temp_path:
+            _unlink(self._temp_path)
+            self._temp_path = None
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _read_file(path: str, byte_range: ByteRange | None) -> bytes | None:
+    try:
+        with open(path, "rb") as file:
+            if not byte_range:
+                return file.read()
+            file.seek(byte_range.start)
+            return file.read(byte_range.length)
+    except FileNotFoundError:
+        return None
+
+
+def _map_file(path: str) -> mmap.mmap | None:
+    try:
+        with open(path, "rb") as file:
+            # The mapping keeps the data readable after the file is unlinked.
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+
+async def _iter_bytes(content: bytes, start: int, end: int, chunk_size: int) -> AsyncIterator[bytes]:
+    view = memoryview(content)
+    for offset in range(start, end + 1, chunk_size):
+        yield bytes(view[offset:min(offset + chunk_size, end + 1)])
+
+
+async def _iter_mapped(mapped: mmap.mmap, start: int, end: int, chunk_size: int) -> AsyncIterator[bytes]:
+    try:
+        for offset in range(start, end + 1, chunk_size):
+            yield mapped[offset:min(offset + chunk_size, end + 1)]
+    finally:
+        mapped.close()
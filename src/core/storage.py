@@ -0,0 +1,363 @@
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from email.utils import formatdate
+from mimetypes import guess_type
+from typing import AsyncIterable, AsyncIterator, Iterator, NamedTuple
+
+import anyio.to_thread
+
+from src.core.exceptions import StorageError
+from src.core.metrics import storage_bytes, time_storage_operation
+from src.utils.range_utils import ByteRange
+
+
+class FileInfo(NamedTuple):
+    size: int
+    etag: str | None
+    last_modified: str | None
+    content_type: str | None
+
+
+class StorageBackend(ABC):
+    """
+    Raw object operations of one storage system.
+
+    Keys are `/`-separated paths such as `users/1/avatar/<name>.png`; every
+    failure surfaces as StorageError. Caching, checksums and the choice of
+    delivery live in `StorageService`, above all backends.
+    """
+
+    # Objects can be fetched by clients through presigned URLs, which
+    # redirect delivery and direct uploads rely on
+    supports_presigned_urls = False
+    # Most keys one `delete_many` call takes
+    DELETE_BATCH_SIZE = 1000
+
+    @abstractmethod
+    async def put(self, key: str, content: bytes | AsyncIterable[bytes], size: int | None, content_type: str | None):
+        """Store an object; `size` is None when a stream's length is unknown."""
+
+    @abstractmethod
+    async def get(self, key: str, byte_range: ByteRange | None = None) -> tuple[AsyncIterator[bytes], FileInfo]:
+        """Stream an object, or one range of it."""
+
+    @abstractmethod
+    async def read(self, key: str, byte_range: ByteRange | None = None) -> tuple[bytes, FileInfo]:
+        """Read an object, or one range of it, into memory."""
+
+    @abstractmethod
+    async def head(self, key: str) -> FileInfo | None:
+        """Metadata of an object; None when it does not exist."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Delete an object; a missing key counts as deleted."""
+
+    @abstractmethod
+    async def delete_many(self, keys: list[str]):
+        """Delete up to DELETE_BATCH_SIZE objects; missing keys count as deleted."""
+
+    @abstractmethod
+    async def create_multipart_upload(self, key: str, content_type: str | None = None) -> str:
+        """Start an upload assembled from parts; returns its id."""
+
+    @abstractmethod
+    async def upload_part(self, key: str, upload_id: str, part_number: int, content: bytes | AsyncIterable[bytes], size: int) -> str:
+        """Store one part of an upload; returns the part's ETag."""
+
+    @abstractmethod
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]):
+        """Join the given (part number, ETag) parts into the object."""
+
+    @abstractmethod
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        """Discard an upload and its parts; an unknown upload counts as aborted."""
+
+    def get_presigned_url(self, key: str, method: str, expire_seconds: int, headers: dict[str, str] | None = None) -> str:
+        raise NotImplementedError
+
+    def get_path(self, key: str) -> str | None:
+        """Path of the object on this machine, when the backend keeps objects on local disk."""
+        return None
+
+    async def aclose(self):
+        pass
+
+
+class LocalStorage(StorageBackend):
+    """
+    Objects as files under one directory, for single-node deployments and
+    offline runs.
+
+    Writes go to a temporary file beside the target and are renamed into
+    place, so readers never see partial objects. Multipart uploads keep their
+    parts under `.multipart/<upload id>/` until they are joined.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, root: str):
+        if not root:
+            raise StorageError("CONTENTS_DIR Is Required For Local Storage.")
+        os.makedirs(root, exist_ok=True)
+        self._root = os.path.realpath(root)
+        self._uploads = os.path.join(self._root, ".multipart")
+
+    async def put(self, key: str, content: bytes | AsyncIterable[bytes], size: int | None, content_type: str | None):
+        await self._write(self._resolve(key), content, size)
+
+    async def get(self, key: str, byte_range: ByteRange | None = None) -> tuple[AsyncIterator[bytes], FileInfo]:
+        path = self._resolve(key)
+        try:
+            file = await anyio.to_thread.run_sync(open, path, "rb")
+        except OSError:
+            raise StorageError()
+        file_info = self._get_file_info(path, os.fstat(file.fileno()))
+        if byte_range:
+            file.seek(byte_range.start)
+
+        return self._iter_file(file, byte_range.length if byte_range else file_info.size), file_info
+
+    async def read(self, key: str, byte_range: ByteRange | None = None) -> tuple[bytes, FileInfo]:
+        path = self._resolve(key)
+
+        def read() -> tuple[bytes, FileInfo]:
+            with open(path, "rb") as file:
+                file_info = self._get_file_info(path, os.fstat(file.fileno()))
+                if not byte_range:
+                    return file.read(), file_info
+                file.seek(byte_range.start)
+                return file.read(byte_range.length), file_info
+
+        try:
+            return await anyio.to_thread.run_sync(read)
+        except OSError:
+            raise StorageError()
+
+    async def head(self, key: str) -> FileInfo | None:
+        path = self._resolve(key)
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, path)
+        except FileNotFoundError:
+            return None
+        except OSError:
+            raise StorageError()
+
+        return self._get_file_info(path, stat_result)
+
+    async def delete(self, key: str):
+        await self.delete_many([key])
+
+    async def delete_many(self, keys: list[str]):
+        paths = [self._resolve(key) for key in keys]
+
+        def delete():
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+        try:
+            await anyio.to_thread.run_sync(delete)
+        except OSError:
+            raise StorageError()
+
+    async def create_multipart_upload(self, key: str, content_type: str | None = None) -> str:
+        self._resolve(key)
+        upload_id = uuid.uuid4().hex
+        try:
+            await anyio.to_thread.run_sync(os.makedirs, os.path.join(self._uploads, upload_id))
+        except OSError:
+            raise StorageError()
+
+        return upload_id
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, content: bytes | AsyncIterable[bytes], size: int) -> str:
+        upload_path = self._get_upload_path(upload_id)
+        if not os.path.isdir(upload_path):
+            raise StorageError("Upload Not Found.")
+        await self._write(os.path.join(upload_path, str(part_number)), content, size)
+
+        return f'"{part_number}-{size}"'
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]):
+        path = self._resolve(key)
+        upload_path = self._get_upload_path(upload_id)
+        part_paths = [os.path.join(upload_path, str(part_number)) for part_number, _ in sorted(parts)]
+
+        def join() -> Iterator[bytes]:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part:
+                    while chunk := part.read(self.CHUNK_SIZE):
+                        yield chunk
+
+        async def iter_parts() -> AsyncIterator[bytes]:
+            chunks = join()
+            while chunk := await anyio.to_thread.run_sync(next, chunks, b""):
+                yield chunk
+
+        await self._write(path, iter_parts(), None)
+        await self.abort_multipart_upload(key, upload_id)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        await anyio.to_thread.run_sync(
+            lambda: shutil.rmtree(self._get_upload_path(upload_id), ignore_errors=True))
+
+    def get_path(self, key: str) -> str | None:
+        return self._resolve(key)
+
+    def _resolve(self, key: str) -> str:
+        path = os.path.realpath(os.path.join(self._root, key))
+        if not path.startswith(self._root + os.sep) or path.startswith(self._uploads + os.sep):
+            raise StorageError("Invalid Storage Key.")
+        return path
+
+    def _get_upload_path(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise StorageError("Upload Not Found.")
+        return os.path.join(self._uploads, upload_id)
+
+    async def _write(self, path: str, content: bytes | AsyncIterable[bytes], size: int | None):
+        temp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.tmp")
+        written = 0
+        try:
+            await anyio.to_thread.run_sync(lambda: os.makedirs(os.path.dirname(path), exist_ok=True))
+            with await anyio.to_thread.run_sync(open, temp_path, "wb") as file:
+                if isinstance(content, bytes):
+                    await anyio.to_thread.run_sync(file.write, content)
+                    written = len(content)
+                else:
+                    async for chunk in content:
+                        await anyio.to_thread.run_sync(file.write, chunk)
+                        written += len(chunk)
+            if size is not None and written != size:
+                raise StorageError("Incomplete Upload.")
+            await anyio.to_thread.run_sync(os.replace, temp_path, path)
+        except BaseException as e:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            if isinstance(e, OSError):
+                raise StorageError()
+            raise
+
+    async def _iter_file(self, file, remaining: int) -> AsyncIterator[bytes]:
+        try:
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(file.read, min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            file.close()
+
+    def _get_file_info(self, path: str, stat_result: os.stat_result) -> FileInfo:
+        return FileInfo(
+            size=stat_result.st_size,
+            etag=f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+            last_modified=formatdate(stat_result.st_mtime, usegmt=True),
+            content_type=guess_type(path)[0]
+        )
+
+
+class InstrumentedStorage(StorageBackend):
+    """
+    Another backend, with the count, latency and bytes of every call recorded
+    in the storage metrics. Files served straight from `get_path` bypass it.
+    """
+
+    def __init__(self, backend: StorageBackend, name: str):
+        self._backend = backend
+        self._name = name
+        self.supports_presigned_urls = backend.supports_presigned_urls
+        self.DELETE_BATCH_SIZE = backend.DELETE_BATCH_SIZE
+
+    async def put(self, key: str, content: bytes | AsyncIterable[bytes], size: int | None, content_type: str | None):
+        content = self._count_sent(content, "put")
+        with time_storage_operation(self._name, "put"):
+            await self._backend.put(key, content, size, content_type)
+
+    async def get(self, key: str, byte_range: ByteRange | None = None) -> tuple[AsyncIterator[bytes], FileInfo]:
+        with time_storage_operation(self._name, "get"):
+            chunks, file_info = await self._backend.get(key, byte_range)
+        return _CountingIterator(chunks, self._name, "get"), file_info
+
+    async def read(self, key: str, byte_range: ByteRange | None = None) -> tuple[bytes, FileInfo]:
+        with time_storage_operation(self._name, "read"):
+            content, file_info = await self._backend.read(key, byte_range)
+        storage_bytes.inc(self._name, "read", amount=len(content))
+        return content, file_info
+
+    async def head(self, key: str) -> FileInfo | None:
+        with time_storage_operation(self._name, "head"):
+            return await self._backend.head(key)
+
+    async def delete(self, key: str):
+        with time_storage_operation(self._name, "delete"):
+            await self._backend.delete(key)
+
+    async def delete_many(self, keys: list[str]):
+        with time_storage_operation(self._name, "delete_many"):
+            await self._backend.delete_many(keys)
+
+    async def create_multipart_upload(self, key: str, content_type: str | None = None) -> str:
+        with time_storage_operation(self._name, "create_multipart_upload"):
+            return await self._backend.create_multipart_upload(key, content_type)
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, content: bytes | AsyncIterable[bytes], size: int) -> str:
+        content = self._count_sent(content, "upload_part")
+        with time_storage_operation(self._name, "upload_part"):
+            return await self._backend.upload_part(key, upload_id, part_number, content, size)
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[tuple[int, str]]):
+        with time_storage_operation(self._name, "complete_multipart_upload"):
+            await self._backend.complete_multipart_upload(key, upload_id, parts)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        with time_storage_operation(self._name, "abort_multipart_upload"):
+            await self._backend.abort_multipart_upload(key, upload_id)
+
+    def get_presigned_url(self, key: str, method: str, expire_seconds: int, headers: dict[str, str] | None = None) -> str:
+        return self._backend.get_presigned_url(key, method, expire_seconds, headers)
+
+    def get_path(self, key: str) -> str | None:
+        return self._backend.get_path(key)
+
+    async def aclose(self):
+        await self._backend.aclose()
+
+    def _count_sent(self, content: bytes | AsyncIterable[bytes], operation: str) -> bytes | AsyncIterable[bytes]:
+        if isinstance(content, bytes):
+            storage_bytes.inc(self._name, operation, amount=len(content))
+            return content
+        return _CountingIterator(content.__aiter__(), self._name, operation)
+
+
+class _CountingIterator:
+    """
+    Passes chunks through while adding their size to the storage byte count.
+    Closing it closes the wrapped stream, even if it was never read.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], backend: str, operation: str):
+        self._chunks = chunks
+        self._backend = backend
+        self._operation = operation
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        chunk = await self._chunks.__anext__()
+        storage_bytes.inc(self._backend, self._operation, amount=len(chunk))
+        return chunk
+
+    async def aclose(self):
+        aclose = getattr(self._chunks, "aclose", None)
+        if aclose:
+            await aclose()
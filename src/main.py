@@ -1,22 +1,55 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from typing import Annotated
 
 from fastapi import FastAPI, HTTPException, Request, status, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.config.settings import settings
 from src.core.constants import CommonMessage
 from src.models import *
-from src.core.database import create_db_and_tables
+from src.core.auth import password_hash_pool
+from src.core.database import async_engine, create_db_and_tables, get_database_pool_stats
+from src.core.metrics import METRICS_MEDIA_TYPE, MetricsMiddleware, metrics_registry, monitor_event_loop_lag
+from src.services.storage_service import object_cache, storage_backend
+from src.services.episodes_service import run_audio_upload_gc
+from src.services.deletion_service import deletion_job_worker
+from src.services.image_service import image_variant_pool
+from src.services.rss_scheduler import rss_rebuild_scheduler
 from src.core.exceptions import AppError, AuthenticationFailedError
-from src.api.endpoints import auth, users, podcasts, episodes
+from src.api.endpoints import auth, users, podcasts, episodes, deletion_jobs
+
+logger = logging.getLogger(__name__)
+
+if settings.DB_CREATE_TABLES_ON_STARTUP:
+    create_db_and_tables()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    audio_upload_gc = asyncio.create_task(run_audio_upload_gc())
+    deletion_jobs = asyncio.create_task(deletion_job_worker.run())
+    loop_lag_monitor = asyncio.create_task(
+        monitor_event_loop_lag(settings.METRICS_LOOP_LAG_INTERVAL_SECONDS))
+    yield
+    audio_upload_gc.cancel()
+    deletion_jobs.cancel()
+    loop_lag_monitor.cancel()
+    await rss_rebuild_scheduler.flush()
+    await storage_backend.aclose()
+    await async_engine.dispose()
+    password_hash_pool.shutdown()
+    image_variant_pool.shutdown()
+    object_cache.close()
 
-create_db_and_tables()
 
 app = FastAPI(
     title=settings.PROJECT_TITLE,
     summary=settings.PROJECT_SUMMARY,
-    description=settings.PROJECT_DESCRIPTION
+    description=settings.PROJECT_DESCRIPTION,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -26,6 +59,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(MetricsMiddleware)
 
 
 @app.exception_handler(AppError)
@@ -36,12 +70,12 @@ async def app_exception_handler(request: Request, exc: AppError):
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return JSONResponse(status_code=exc.code, content={"message": exc.message})
+    return JSONResponse(status_code=exc.code, content={"message": exc.message}, headers=exc.headers)
 
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    print(exc)
+    logger.error("Unhandled error in %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(status_code=500, content={"message": "服务器内部错误"})
 
 
@@ -51,5 +85,26 @@ async def check_app_state(key: Annotated[str, Query()]):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     return CommonMessage(message="Running fine.")
 
-for router in [users.router, podcasts.router, episodes.router, auth.router]:
+
+@app.get("/state/db", status_code=status.HTTP_200_OK, include_in_schema=False)
+async def check_database_state(key: Annotated[str, Query()]):
+    if key != settings.STATE_CHECK_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return get_database_pool_stats()
+
+
+@app.get("/state/cache", status_code=status.HTTP_200_OK, include_in_schema=False)
+async def check_cache_state(key: Annotated[str, Query()]):
+    if key != settings.STATE_CHECK_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return object_cache.get_stats()
+
+
+@app.get("/metrics", status_code=status.HTTP_200_OK, include_in_schema=False)
+async def get_metrics(key: Annotated[str, Query()]):
+    if key != settings.STATE_CHECK_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(metrics_registry.render(), media_type=METRICS_MEDIA_TYPE)
+
+for router in [users.router, podcasts.router, episodes.router, auth.router, deletion_jobs.router]:
     app.include_router(router)
@@ -1,5 +1,7 @@
 from . import (
     user,
     episode,
-    podcast
+    podcast,
+    upload_session,
+    deletion_job
 )
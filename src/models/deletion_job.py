@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index
+from sqlmodel import SQLModel, Field
+
+from src.core.constants import DeletionJobStatus
+from src.models.upload_session import utc_now
+
+
+class DeletionJob(SQLModel, table=True):
+    __table_args__ = (
+        # Workers poll for due jobs
+        Index("ix_deletionjob_status_run_after", "status", "run_after"),
+    )
+
+    id: str = Field(primary_key=True)
+    # "user" or "podcast"
+    entity_type: str
+    entity_id: int
+    # Not a foreign key: the requester may be the user being deleted
+    requested_by: int
+    status: str = DeletionJobStatus.PENDING.value
+    attempts: int = 0
+    total_episodes: int = 0
+    deleted_episodes: int = 0
+    error: str | None = None
+    run_after: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+    createtime: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+    updatetime: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+
+
+class DeletionJobPublic(SQLModel):
+
+    id: str
+    entity_type: str
+    entity_id: int
+    status: str
+    attempts: int
+    total_episodes: int
+    deleted_episodes: int
+    error: str | None = None
+    createtime: datetime
+    updatetime: datetime
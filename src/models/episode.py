@@ -1,4 +1,5 @@
 from typing import Optional, TYPE_CHECKING
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Relationship, SQLModel, Field
 
 if TYPE_CHECKING:
@@ -11,9 +12,19 @@ class EpisodeBase(SQLModel):
 
 
 class Episode(EpisodeBase, table=True):
+    __table_args__ = (
+        UniqueConstraint("podcast_id", "title", name="uq_episode_podcast_id_title"),
+        # Lookups and keyset pagination of a podcast's episodes
+        Index("ix_episode_podcast_id_id", "podcast_id", "id"),
+        # Keyword search (pg_trgm)
+        Index("ix_episode_title_trgm", "title",
+              postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_episode_description_trgm", "description",
+              postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
-    podcast_id: int = Field(foreign_key="podcast.id")
+    podcast_id: int = Field(foreign_key="podcast.id", ondelete="CASCADE")
     podcast: Optional["Podcast"] = Relationship(back_populates="episodes")
     guid: str
     enclosure_path: str | None = None
@@ -24,6 +35,8 @@ class Episode(EpisodeBase, table=True):
     itunes_duration: int | None = None
     link: str | None = None
     itunes_image_path: str | None = None
+    # Comma separated sizes with pre-rendered variants, see ImageService
+    itunes_image_sizes: str | None = None
     itunes_explicit: bool = False
     block: bool = False
     is_complete: bool = False
@@ -1,5 +1,7 @@
+from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
+from sqlalchemy import DateTime, Index, UniqueConstraint
 from sqlmodel import Relationship, SQLModel, Field
 
 if TYPE_CHECKING:
@@ -19,10 +21,22 @@ class PodcastBase(SQLModel):
 
 
 class Podcast(PodcastBase, table=True):
+    __table_args__ = (
+        UniqueConstraint("title", name="uq_podcast_title"),
+        # Keyset pagination of an author's podcasts
+        Index("ix_podcast_author_id_id", "author_id", "id"),
+        # Keyword search (pg_trgm)
+        Index("ix_podcast_title_trgm", "title",
+              postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_podcast_description_trgm", "description",
+              postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
-    author_id: int = Field(foreign_key="user.id")
+    author_id: int = Field(foreign_key="user.id", ondelete="CASCADE")
     itunes_image_path: str | None = None
+    # Comma separated sizes with pre-rendered variants, see ImageService
+    itunes_image_sizes: str | None = None
     feed_path: str | None = None
 
     itunes_explicit: bool = False
@@ -32,9 +46,11 @@ class Podcast(PodcastBase, table=True):
     itunes_block: bool | None = False
     generator: str | None = None
     createtime: str | None = None
+    # Set when a deletion job is queued; the row is hidden until it is purged
+    deleted_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
 
     author: Optional["User"] = Relationship(back_populates="podcasts")
-    episodes: list["Episode"] = Relationship(back_populates="podcast")
+    episodes: list["Episode"] = Relationship(back_populates="podcast", passive_deletes="all")
 
 
 class PodcastCreate(PodcastBase):
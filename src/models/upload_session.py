@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime
+from sqlmodel import SQLModel, Field
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class AudioUploadSession(SQLModel, table=True):
+
+    id: str = Field(primary_key=True)
+    episode_id: int = Field(foreign_key="episode.id", ondelete="CASCADE")
+    user_id: int = Field(foreign_key="user.id", ondelete="CASCADE")
+    key: str
+    upload_id: str
+    filename: str
+    content_type: str
+    total_size: int
+    chunk_size: int
+    createtime: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+    updatetime: datetime = Field(default_factory=utc_now, sa_type=DateTime(timezone=True))
+
+
+class AudioUploadPart(SQLModel, table=True):
+
+    session_id: str = Field(foreign_key="audiouploadsession.id", primary_key=True, ondelete="CASCADE")
+    part_number: int = Field(primary_key=True)
+    etag: str
+    size: int
+
+
+class AudioUploadCreate(SQLModel):
+
+    filename: str
+    content_type: str = "audio/mpeg"
+    total_size: int = Field(gt=0)
+    chunk_size: int | None = None
+
+
+class AudioUploadPublic(SQLModel):
+
+    id: str
+    episode_id: int
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: list[int] = []
+    received_ranges: list[str] = []
+    expires_at: datetime
+
+
+class DirectUploadCreate(SQLModel):
+
+    filename: str
+    content_type: str
+
+
+class DirectUploadPublic(SQLModel):
+
+    key: str
+    url: str
+    method: str = "PUT"
+    headers: dict[str, str] = {}
+    expires_at: datetime
+
+
+class DirectUploadComplete(SQLModel):
+
+    key: str
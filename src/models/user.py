@@ -1,8 +1,9 @@
 from typing import TYPE_CHECKING, Optional
 
+from sqlalchemy import DateTime, UniqueConstraint
 from sqlmodel import Relationship, SQLModel, Field
 from pydantic import EmailStr
-from datetime import date
+from datetime import date, datetime
 
 from ..core.constants import UserRole
 
@@ -17,14 +18,23 @@ class UserBase(SQLModel):
 
 
 class User(UserBase, table=True):
+    __table_args__ = (
+        UniqueConstraint("username", name="uq_user_username"),
+        UniqueConstraint("nickname", name="uq_user_nickname"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     username: str
     hashed_password: str
     avatar_path: str | None = None
+    # Comma separated sizes with pre-rendered variants, see ImageService
+    avatar_sizes: str | None = None
     createtime: date
     role: str | None = UserRole.USER.value
+    # Set when a deletion job is queued; the row is hidden until it is purged
+    deleted_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
 
-    podcasts: list["Podcast"] = Relationship(back_populates="author")
+    podcasts: list["Podcast"] = Relationship(back_populates="author", passive_deletes="all")
 
 
 class UserCreate(UserBase):
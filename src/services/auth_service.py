@@ -14,8 +14,8 @@ class AuthenticationService:
         self.session = session
         self.form_data = form_data
 
-    def get_token(self) -> Token:
-        user = authenticate_user(
+    async def get_token(self) -> Token:
+        user = await authenticate_user(
             self.session, self.form_data.username, self.form_data.password)
         if not user:
             raise AuthenticationFailedError()
@@ -0,0 +1,310 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Annotated
+from uuid import uuid4
+
+from fastapi import Depends
+from sqlalchemy import String, cast, func, null, or_, union_all, update
+from sqlmodel import Session, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from src.config.settings import settings
+from src.core.auth import UserDep
+from src.core.constants import DeletionEntityType, DeletionJobStatus, UserRole
+from src.core.database import AsyncSessionDep, SessionDep, engine
+from src.core.exceptions import DeletionJobNotFoundError
+from src.models.deletion_job import DeletionJob
+from src.models.episode import Episode
+from src.models.podcast import Podcast
+from src.models.upload_session import AudioUploadSession, utc_now
+from src.models.user import User
+from src.services.storage_service import StorageService, StorageServiceDep
+from src.utils.image_utils import get_image_keys
+
+logger = logging.getLogger(__name__)
+
+
+class DeletionService:
+    """
+    Set-based deletion of users, podcasts and episodes.
+
+    One query collects every storage key under the deleted entity, the keys
+    are removed with COS multi-object deletes, and a single DELETE leaves the
+    rows beneath it to the foreign keys' ON DELETE CASCADE. Storage goes
+    first, so a failed deletion can simply be retried.
+
+    Users and podcasts are too big to delete inside a request: they are
+    tombstoned and a DeletionJob purges them in the background.
+
+    The sync session's queries and commits run on a worker thread, so only
+    the storage calls are awaited on the event loop.
+    """
+
+    def __init__(self, session: Session, async_session: AsyncSession | None, storage_service: StorageService, user_login: User | None = None):
+
+        self.session = session
+        self.async_session = async_session
+        self.storage_service = storage_service
+        self.user_login = user_login
+
+    def schedule_user_deletion(self, user: User, requested_by: int) -> DeletionJob:
+
+        now = utc_now()
+        user.deleted_at = now
+        self.session.add(user)
+        self.session.exec(update(Podcast).where(
+            Podcast.author_id == user.id, Podcast.deleted_at.is_(None)).values(deleted_at=now))
+
+        return self._schedule(DeletionEntityType.USER, user.id, requested_by,
+                              Podcast.author_id == user.id)
+
+    def schedule_podcast_deletion(self, podcast: Podcast, requested_by: int) -> DeletionJob:
+
+        podcast.deleted_at = utc_now()
+        self.session.add(podcast)
+
+        return self._schedule(DeletionEntityType.PODCAST, podcast.id, requested_by,
+                              Podcast.id == podcast.id)
+
+    async def get_job_by_id(self, job_id: str) -> DeletionJob:
+
+        job = await self.async_session.get(DeletionJob, job_id)
+        # Someone else's job is reported as missing, so ids cannot be probed.
+        if not job or (self.user_login.id != job.requested_by and self.user_login.role != UserRole.ADMIN.value):
+            raise DeletionJobNotFoundError()
+
+        return job
+
+    async def delete_user(self, user_id: int):
+
+        await self._delete(
+            delete(User).where(User.id == user_id),
+            episode_scope=Podcast.author_id == user_id,
+            upload_scope=or_(Podcast.author_id == user_id,
+                             AudioUploadSession.user_id == user_id),
+            podcast_scope=Podcast.author_id == user_id,
+            user_scope=User.id == user_id
+        )
+
+    async def delete_podcast(self, podcast_id: int):
+
+        await self._delete(
+            delete(Podcast).where(Podcast.id == podcast_id),
+            episode_scope=Episode.podcast_id == podcast_id,
+            upload_scope=Episode.podcast_id == podcast_id,
+            podcast_scope=Podcast.id == podcast_id
+        )
+
+    async def delete_episode(self, episode_id: int):
+
+        await self._delete(
+            delete(Episode).where(Episode.id == episode_id),
+            episode_scope=Episode.id == episode_id,
+            upload_scope=Episode.id == episode_id
+        )
+
+    async def delete_episode_batch(self, podcast_id: int, limit: int) -> int:
+        """Delete up to `limit` episodes of a podcast; returns how many went."""
+        episode_ids = await run_in_threadpool(lambda: self.session.exec(
+            select(Episode.id).where(Episode.podcast_id == podcast_id).order_by(Episode.id).limit(limit)).all())
+        if episode_ids:
+            await self._delete(
+                delete(Episode).where(Episode.id.in_(episode_ids)),
+                episode_scope=Episode.id.in_(episode_ids),
+                upload_scope=Episode.id.in_(episode_ids)
+            )
+
+        return len(episode_ids)
+
+    def get_storage_keys(self, episode_scope, podcast_scope=None, user_scope=None) -> list[str]:
+
+        # (key, image sizes) pairs; images also own their size variants
+        no_sizes = cast(null(), String)
+        queries = [
+            select(Episode.itunes_image_path, Episode.itunes_image_sizes).join(Podcast).where(episode_scope),
+            select(Episode.enclosure_path, no_sizes).join(Podcast).where(episode_scope)
+        ]
+        if podcast_scope is not None:
+            queries.append(select(Podcast.itunes_image_path, Podcast.itunes_image_sizes).where(podcast_scope))
+            queries.append(select(Podcast.feed_path, no_sizes).where(podcast_scope))
+        if user_scope is not None:
+            queries.append(select(User.avatar_path, User.avatar_sizes).where(user_scope))
+
+        return [
+            image_key
+            for key, sizes in self.session.exec(union_all(*queries)) if key
+            for image_key in get_image_keys(key, sizes)
+        ]
+
+    def _schedule(self, entity_type: DeletionEntityType, entity_id: int, requested_by: int, podcast_scope) -> DeletionJob:
+
+        total_episodes = self.session.exec(
+            select(func.count()).select_from(Episode).join(Podcast).where(podcast_scope)).one()
+        job = DeletionJob(
+            id=uuid4().hex,
+            entity_type=entity_type.value,
+            entity_id=entity_id,
+            requested_by=requested_by,
+            total_episodes=total_episodes
+        )
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+
+        deletion_job_worker.wake()
+
+        return job
+
+    async def _delete(self, statement, episode_scope, upload_scope, podcast_scope=None, user_scope=None):
+
+        keys = await run_in_threadpool(self.get_storage_keys, episode_scope, podcast_scope, user_scope)
+        uploads = await run_in_threadpool(lambda: self.session.exec(
+            select(AudioUploadSession).join(Episode).join(Podcast).where(upload_scope)).all())
+
+        # Unfinished multipart uploads hold parts that no key points to yet.
+        await asyncio.gather(*(
+            self.storage_service.abort_multipart_upload(upload.key, upload.upload_id)
+            for upload in uploads
+        ))
+        await self.storage_service.delete_many(keys)
+
+        await run_in_threadpool(self._execute, statement)
+
+    def _execute(self, statement):
+
+        self.session.exec(statement)
+        self.session.commit()
+
+
+class DeletionJobWorker:
+    """
+    Runs queued DeletionJobs one at a time.
+
+    A job is claimed with a conditional UPDATE on its `updatetime`, which also
+    serves as a heartbeat: it is bumped after every batch, so a job whose
+    worker died is claimed again once `DELETION_JOB_LEASE_SECONDS` pass
+    without progress. Every step is idempotent, which makes retries safe.
+    """
+
+    def __init__(self, batch_size: int, max_attempts: int, retry_seconds: int, lease_seconds: int, poll_interval_seconds: int):
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._retry_seconds = retry_seconds
+        self._lease_seconds = lease_seconds
+        self._poll_interval_seconds = poll_interval_seconds
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def run(self):
+        while True:
+            try:
+                while await self.run_next():
+                    pass
+            except Exception:
+                logger.exception("Deletion job polling failed")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval_seconds)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_next(self) -> bool:
+        """Claim and run one due job; returns False when there is none."""
+        # Commits happen on a worker thread; without expiry the loop can read
+        # the job between them without a lazy reload. The job row is leased
+        # to this worker, and _claim and _fail refresh it explicitly.
+        with Session(engine, expire_on_commit=False) as session:
+            job = await run_in_threadpool(self._claim, session)
+            if not job:
+                return False
+
+            try:
+                await self._purge(session, job)
+            except Exception as e:
+                logger.exception("Deletion job %s failed", job.id)
+                await run_in_threadpool(self._fail, session, job, e)
+
+            return True
+
+    def _claim(self, session: Session) -> DeletionJob | None:
+        now = utc_now()
+        candidates = session.exec(select(DeletionJob).where(or_(
+            (DeletionJob.status == DeletionJobStatus.PENDING.value) & (DeletionJob.run_after <= now),
+            (DeletionJob.status == DeletionJobStatus.RUNNING.value) &
+            (DeletionJob.updatetime <= now - timedelta(seconds=self._lease_seconds))
+        )).order_by(DeletionJob.run_after).limit(10)).all()
+
+        for job in candidates:
+            claimed = session.exec(update(DeletionJob).where(
+                DeletionJob.id == job.id, DeletionJob.updatetime == job.updatetime
+            ).values(status=DeletionJobStatus.RUNNING.value, updatetime=now))
+            session.commit()
+            if claimed.rowcount == 1:
+                session.refresh(job)
+                return job
+
+        return None
+
+    async def _purge(self, session: Session, job: DeletionJob):
+        deletion_service = DeletionService(session, None, StorageService())
+
+        if job.entity_type == DeletionEntityType.USER.value:
+            podcast_ids = await run_in_threadpool(lambda: session.exec(
+                select(Podcast.id).where(Podcast.author_id == job.entity_id)).all())
+        else:
+            podcast_ids = [job.entity_id]
+
+        for podcast_id in podcast_ids:
+            while deleted := await deletion_service.delete_episode_batch(podcast_id, self._batch_size):
+                job.deleted_episodes = min(job.deleted_episodes + deleted, job.total_episodes)
+                await run_in_threadpool(self._save, session, job)
+
+        if job.entity_type == DeletionEntityType.USER.value:
+            await deletion_service.delete_user(job.entity_id)
+        else:
+            await deletion_service.delete_podcast(job.entity_id)
+
+        job.status = DeletionJobStatus.SUCCEEDED.value
+        job.deleted_episodes = job.total_episodes
+        job.error = None
+        await run_in_threadpool(self._save, session, job)
+
+    def _fail(self, session: Session, job: DeletionJob, error: Exception):
+        session.rollback()
+        session.refresh(job)
+        job.attempts += 1
+        job.error = str(error) or type(error).__name__
+        if job.attempts >= self._max_attempts:
+            job.status = DeletionJobStatus.FAILED.value
+        else:
+            job.status = DeletionJobStatus.PENDING.value
+            job.run_after = utc_now() + timedelta(
+                seconds=self._retry_seconds * 2 ** (job.attempts - 1))
+        self._save(session, job)
+
+    def _save(self, session: Session, job: DeletionJob):
+        job.updatetime = utc_now()
+        session.add(job)
+        session.commit()
+
+
+deletion_job_worker = DeletionJobWorker(
+    settings.DELETION_JOB_BATCH_SIZE,
+    settings.DELETION_JOB_MAX_ATTEMPTS,
+    settings.DELETION_JOB_RETRY_SECONDS,
+    settings.DELETION_JOB_LEASE_SECONDS,
+    settings.DELETION_JOB_POLL_INTERVAL_SECONDS
+)
+
+
+def get_deletion_service_with_login(session: SessionDep, async_session: AsyncSessionDep, storage_service: StorageServiceDep, user_login: UserDep):
+    return DeletionService(session, async_session, storage_service, user_login)
+
+
+DeletionServiceLoginDep = Annotated[DeletionService, Depends(
+    get_deletion_service_with_login)]
@@ -1,22 +1,43 @@
+import asyncio
+import logging
+import math
+from datetime import timedelta
 from time import time
 from email.utils import formatdate
-from typing import Annotated, BinaryIO
+from typing import Annotated, AsyncIterable, BinaryIO
 from uuid import uuid4
 
-from fastapi import Depends, UploadFile
+from fastapi import Depends, Response, status
 from fastapi.responses import StreamingResponse
-from sqlmodel import Session, select
+from sqlmodel import Session, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.core.auth import UserDep
-from src.core.database import SessionDep
-from src.services.cos_service import CosService, CosServiceDep
+from src.config.settings import settings
+from src.core.database import AsyncSessionDep, SessionDep, commit_unique, engine
+from src.services.storage_service import StorageService, StorageServiceDep
+from src.services.deletion_service import DeletionService
+from src.services.image_service import ImageService
 from src.core.constants import UserRole, CommonMessage
 from src.models.episode import Episode, EpisodeCreate, EpisodeUpdate
 from src.models.podcast import Podcast
+from src.models.upload_session import (
+    AudioUploadCreate,
+    AudioUploadPart,
+    AudioUploadPublic,
+    AudioUploadSession,
+    DirectUploadComplete,
+    DirectUploadCreate,
+    DirectUploadPublic,
+    utc_now
+)
 from src.models.user import User
-from src.services.rss_service import RssService, RssServiceDep
-from src.services.utils import delete_file_from_contents
+from src.services.rss_scheduler import rss_rebuild_scheduler
 from src.core.exceptions import (
+    AudioUploadNotFoundError,
+    StorageError,
+    InvalidUploadError,
+    UploadIncompleteError,
     EpisodeAudioNotFoundError,
     EpisodeNotFoundError,
     NoPermissionError,
@@ -24,46 +45,63 @@ from src.core.exceptions import (
     EpisodeTitleAlreadyExistsError,
     EpisodeCoverNotFoundError
 )
-from src.utils.file_utils import get_audio_duration_from_binaryio, get_unique_filename
+from src.utils.file_utils import get_unique_filename
+from src.utils.http_utils import get_media_headers, is_not_modified
+from src.utils.image_utils import ImageFormat
+from src.utils.multipart_utils import MultipartFileStream
+from src.utils.pagination_utils import encode_cursor, paginate, paginate_ranked
+from src.utils.range_utils import ByteRange, if_range_matches, parse_range_header
+from src.utils.search_utils import keyword_match
+
+logger = logging.getLogger(__name__)
+
+EPISODE_UNIQUE_ERRORS = {
+    "uq_episode_podcast_id_title": EpisodeTitleAlreadyExistsError
+}
 
 
 class EpisodeService:
 
-    def __init__(self, session: Session, cos_service: CosService, rss_service: RssService, user_login: User | None = None):
+    def __init__(self, session: Session, async_session: AsyncSession, storage_service: StorageService, user_login: User | None = None):
         self.session = session
-        self.cos_service = cos_service
-        self.rss_service = rss_service
+        self.async_session = async_session
+        self.storage_service = storage_service
         self.user_login = user_login
+        self.image_service = ImageService(storage_service)
 
-    def get_episode_by_id(self, id: int) -> Episode:
-        episode = self.session.get(Episode, id)
+    async def get_episode_by_id(self, id: int) -> Episode:
+        episode = (await self.async_session.exec(self._select_live_episode(id))).first()
         if not episode:
             raise EpisodeNotFoundError()
         return episode
 
-    def get_all_episodes(self, offset: int, limit: int) -> list[Episode]:
-        return self.session.exec(select(Episode).offset(offset).limit(limit)).all()
+    async def get_all_episodes(self, offset: int, limit: int, after: str | None = None) -> list[Episode]:
+        return (await self.async_session.exec(paginate(self._select_live_episodes(), Episode.id, offset, limit, after))).all()
 
-    def get_episodes_by_podcast_id(self, podcast_id: int, offset: int, limit: int) -> list[Episode]:
-        podcast = self.session.get(Podcast, podcast_id)
-        if not podcast:
+    async def search_episodes(self, keyword: str, offset: int, limit: int, after: str | None = None) -> tuple[list[Episode], str | None]:
+        where, rank = keyword_match(
+            Episode.title, Episode.description, keyword, self.async_session.bind.dialect.name)
+        rows = (await self.async_session.exec(
+            paginate_ranked(self._select_live_episodes(rank).where(where), rank, Episode.id, offset, limit, after)
+        )).all()
+
+        next_cursor = encode_cursor(rank=rows[-1][1], id=rows[-1][0].id) if rows else None
+        return [episode for episode, _ in rows], next_cursor
+
+    async def get_episodes_by_podcast_id(self, podcast_id: int, offset: int, limit: int, after: str | None = None) -> list[Episode]:
+        podcast = await self.async_session.get(Podcast, podcast_id)
+        if not podcast or podcast.deleted_at:
             raise PodcastNotFoundError()
 
-        return self.session.exec(select(Episode).where(Episode.podcast_id == podcast_id).offset(offset).limit(limit)).all()
+        return (await self.async_session.exec(paginate(select(Episode).where(Episode.podcast_id == podcast_id), Episode.id, offset, limit, after))).all()
 
-    def create_episode_by_podcast_id(self, podcast_id: int, episode_upload: EpisodeCreate) -> Episode:
+    async def create_episode_by_podcast_id(self, podcast_id: int, episode_upload: EpisodeCreate) -> Episode:
         podcast = self.session.get(Podcast, podcast_id)
-        if not podcast:
+        if not podcast or podcast.deleted_at:
             raise PodcastNotFoundError()
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        same_title_episode = self.session.exec(select(Episode).where(
-            Episode.podcast_id == podcast_id, Episode.title == episode_upload.title)).first()
-
-        if same_title_episode:
-            raise EpisodeTitleAlreadyExistsError()
-
         extra_data = {
             "podcast_id": podcast_id,
             "guid": uuid4().hex,
@@ -72,149 +110,487 @@ class EpisodeService:
 
         new_episode = Episode.model_validate(episode_upload, update=extra_data)
         self.session.add(new_episode)
-        self.session.commit()
+        commit_unique(self.session, EPISODE_UNIQUE_ERRORS)
 
-        self.session.refresh(podcast)
-        self.rss_service.update_podcast_rss(podcast)
-        self.session.add(podcast)
-        self.session.commit()
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
 
         self.session.refresh(new_episode)
 
         return new_episode
 
-    def update_episode_by_id(self, id: int, episode_upload: EpisodeUpdate) -> Episode:
-        episode = self.get_episode_by_id(id)
+    async def update_episode_by_id(self, id: int, episode_upload: EpisodeUpdate) -> Episode:
+        episode = self._get_episode_by_id(id)
         podcast = self.session.get(Podcast, episode.podcast_id)
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        same_title_episode = self.session.exec(select(Episode).where(
-            Episode.podcast_id == episode.podcast_id, Episode.title == episode_upload.title)).first()
-
-        if same_title_episode:
-            raise EpisodeTitleAlreadyExistsError()
-
         episode.sqlmodel_update(
             episode_upload.model_dump(exclude_unset=True)
         )
         self.session.add(episode)
-        self.session.commit()
+        commit_unique(self.session, EPISODE_UNIQUE_ERRORS)
 
-        self.session.refresh(podcast)
-        self.rss_service.update_podcast_rss(podcast)
-        self.session.add(podcast)
-        self.session.commit()
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
 
         return episode
 
-    def delete_episode_by_id(self, id: int) -> CommonMessage:
-        episode = self.get_episode_by_id(id)
+    async def delete_episode_by_id(self, id: int) -> CommonMessage:
+        episode = self._get_episode_by_id(id)
         podcast = self.session.get(Podcast, episode.podcast_id)
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        self._delete_existing_cover(episode)
-        if episode.enclosure_path:
-            delete_file_from_contents(episode.enclosure_path)
-
-        self.session.delete(episode)
-        self.session.commit()
+        await DeletionService(self.session, self.async_session, self.storage_service).delete_episode(episode.id)
 
-        self.session.refresh(podcast)
-        self.rss_service.update_podcast_rss(podcast)
-        self.session.add(podcast)
-        self.session.commit()
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
 
         return CommonMessage(message="Episode Deleted.")
 
-    def get_cover_by_id(self, id: int) -> StreamingResponse:
-        episode = self.get_episode_by_id(id)
+    async def get_cover_by_id(self, id: int, size: int | None = None, image_format: ImageFormat | None = None, accept: str | None = None, version: str | None = None, if_none_match: str | None = None, range_header: str | None = None) -> Response:
+        episode = await self.get_episode_by_id(id)
 
         if not episode.itunes_image_path:
             raise EpisodeCoverNotFoundError()
 
-        return StreamingResponse(self.cos_service.fetch_file(episode.itunes_image_path))
+        return await self.image_service.get_image(
+            episode.itunes_image_path, episode.itunes_image_sizes, size, image_format, accept, version, if_none_match, range_header)
 
-    def update_cover_by_id(self, id: int, cover_update: UploadFile) -> CommonMessage:
-        episode = self.get_episode_by_id(id)
+    async def update_cover_by_id(self, id: int, cover_update: MultipartFileStream, content_sha256: str | None = None) -> CommonMessage:
+        episode = self._get_episode_by_id(id)
         podcast = self.session.get(Podcast, episode.podcast_id)
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        self._delete_existing_cover(episode)
+        await cover_update.open()
         cover_filename = self._get_cover_filename(
             podcast.author.id, podcast.id, episode.id, cover_update.filename)
-        self.cos_service.save_file(cover_update.file, cover_filename)
+        await self.storage_service.save_upload(cover_update, cover_filename, content_sha256)
+        image_sizes = await self.image_service.create_variants(cover_filename)
+
+        await self._delete_existing_cover(episode)
         episode.itunes_image_path = cover_filename
+        episode.itunes_image_sizes = image_sizes
 
         self.session.add(episode)
         self.session.commit()
 
-        self.session.refresh(podcast)
-        self.rss_service.update_podcast_rss(podcast)
-        self.session.add(podcast)
-        self.session.commit()
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
 
         return CommonMessage(message="Cover Changed.")
 
-    def get_audio_by_id(self, id: int) -> StreamingResponse:
-        episode = self.get_episode_by_id(id)
+    async def create_cover_direct_upload(self, id: int, upload_create: DirectUploadCreate) -> DirectUploadPublic:
+        episode = self._get_episode_by_id(id)
+        podcast = self.session.get(Podcast, episode.podcast_id)
+        self._check_permission(podcast)
+
+        cover_filename = self._get_cover_filename(
+            podcast.author_id, podcast.id, episode.id, upload_create.filename)
+        return self.storage_service.create_direct_upload(cover_filename, upload_create.content_type)
+
+    async def complete_cover_direct_upload(self, id: int, upload_complete: DirectUploadComplete) -> CommonMessage:
+        episode = self._get_episode_by_id(id)
+        podcast = self.session.get(Podcast, episode.podcast_id)
+        self._check_permission(podcast)
+
+        if upload_complete.key != episode.itunes_image_path:
+            await self.storage_service.get_direct_upload_info(
+                upload_complete.key, self._get_cover_prefix(podcast.author_id, podcast.id, episode.id))
+            image_sizes = await self.image_service.create_variants(upload_complete.key)
+
+            await self._delete_existing_cover(episode)
+            episode.itunes_image_path = upload_complete.key
+            episode.itunes_image_sizes = image_sizes
+
+            self.session.add(episode)
+            self.session.commit()
+
+            rss_rebuild_scheduler.mark_dirty(podcast.id)
+
+        return CommonMessage(message="Cover Changed.")
+
+    async def get_audio_by_id(self, id: int, range_header: str | None = None, if_range: str | None = None, version: str | None = None, if_none_match: str | None = None) -> Response:
+        episode = await self.get_episode_by_id(id)
 
         if not episode.enclosure_path:
             raise EpisodeAudioNotFoundError()
-        return StreamingResponse(self.cos_service.fetch_file(episode.enclosure_path))
 
-    def update_audio_by_id(self, id: int, audio_update: UploadFile) -> CommonMessage:
-        episode = self.get_episode_by_id(id)
+        if self.storage_service.redirects_media:
+            return self.storage_service.redirect_to_file(episode.enclosure_path)
+
+        headers = {"Accept-Ranges": "bytes"}
+        headers.update(get_media_headers(episode.enclosure_path, episode.enclosure_path, version))
+        if is_not_modified(headers["ETag"], None, if_none_match, None):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = await self.storage_service.get_file_response(
+            episode.enclosure_path, episode.enclosure_type, headers, range_header)
+        if response:
+            return response
+
+        # Length and type are recorded on upload; only older rows need a HEAD.
+        size, media_type = episode.enclosure_length, episode.enclosure_type
+        if size is None or not media_type:
+            file_info = await self.storage_service.get_file_info(episode.enclosure_path)
+            size = file_info.size
+            media_type = media_type or file_info.content_type or "application/octet-stream"
+
+        byte_ranges = None
+        if if_range_matches(if_range, headers["ETag"], None):
+            byte_ranges = parse_range_header(range_header, size)
+
+        if not byte_ranges:
+            headers["Content-Length"] = str(size)
+            return StreamingResponse(await self.storage_service.fetch_file(episode.enclosure_path), media_type=media_type, headers=headers)
+
+        if len(byte_ranges) == 1:
+            byte_range = byte_ranges[0]
+            headers["Content-Range"] = byte_range.content_range(size)
+            headers["Content-Length"] = str(byte_range.length)
+            return StreamingResponse(
+                await self.storage_service.fetch_file(
+                    episode.enclosure_path, byte_range),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=media_type,
+                headers=headers
+            )
+
+        boundary = uuid4().hex
+        part_headers = [
+            f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: {byte_range.content_range(size)}\r\n\r\n".encode()
+            for byte_range in byte_ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode()
+        headers["Content-Length"] = str(
+            sum(len(part_header) + byte_range.length + 2
+                for part_header, byte_range in zip(part_headers, byte_ranges))
+            + len(closing)
+        )
+
+        async def iter_parts():
+            for part_header, byte_range in zip(part_headers, byte_ranges):
+                yield part_header
+                async for chunk in await self.storage_service.fetch_file(episode.enclosure_path, byte_range):
+                    yield chunk
+                yield b"\r\n"
+            yield closing
+
+        return StreamingResponse(
+            iter_parts(),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=f"multipart/byteranges; boundary={boundary}",
+            headers=headers
+        )
+
+    async def update_audio_by_id(self, id: int, audio_update: MultipartFileStream, content_sha256: str | None = None) -> CommonMessage:
+        episode = self._get_episode_by_id(id)
         podcast = self.session.get(Podcast, episode.podcast_id)
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        self._delete_existing_audio(episode)
+        await audio_update.open()
+        enclosure_filename = self._get_enclosure_filename(
+            podcast.author.id, podcast.id, episode.id, audio_update.filename)
+        await self.storage_service.save_upload(audio_update, enclosure_filename, content_sha256)
+        try:
+            duration = await self.storage_service.get_audio_duration(
+                enclosure_filename, audio_update.size)
+        except StorageError:
+            raise
+        except Exception:
+            await self.storage_service.delete_file(enclosure_filename)
+            raise InvalidUploadError("Unsupported Audio File.")
+
+        await self._delete_existing_audio(episode)
+        episode.enclosure_path = enclosure_filename
         episode.enclosure_length = audio_update.size
         episode.enclosure_type = audio_update.content_type
+        episode.itunes_duration = duration
+
+        self.session.add(episode)
+        self.session.commit()
+
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
+
+        return CommonMessage(message="Audio Changed.")
+
+    async def create_audio_direct_upload(self, id: int, upload_create: DirectUploadCreate) -> DirectUploadPublic:
+        episode = self._get_episode_by_id(id)
+        podcast = self.session.get(Podcast, episode.podcast_id)
+        self._check_permission(podcast)
 
         enclosure_filename = self._get_enclosure_filename(
-            podcast.author.id, podcast.id, episode.id, audio_update.filename)
-        self.cos_service.save_file(audio_update.file, enclosure_filename)
-        episode.enclosure_path = enclosure_filename
-        episode.itunes_duration = get_audio_duration_from_binaryio(
-            audio_update.file)
+            podcast.author_id, podcast.id, episode.id, upload_create.filename)
+        return self.storage_service.create_direct_upload(enclosure_filename, upload_create.content_type)
+
+    async def complete_audio_direct_upload(self, id: int, upload_complete: DirectUploadComplete) -> CommonMessage:
+        episode = self._get_episode_by_id(id)
+        podcast = self.session.get(Podcast, episode.podcast_id)
+        self._check_permission(podcast)
+
+        # Completing twice must not delete the audio the episode now points at.
+        if upload_complete.key == episode.enclosure_path:
+            return CommonMessage(message="Audio Changed.")
+
+        info = await self.storage_service.get_direct_upload_info(
+            upload_complete.key, self._get_enclosure_prefix(podcast.author_id, podcast.id, episode.id))
+        try:
+            duration = await self.storage_service.get_audio_duration(upload_complete.key, info.size)
+        except StorageError:
+            raise
+        except Exception:
+            await self.storage_service.delete_file(upload_complete.key)
+            raise InvalidUploadError("Unsupported Audio File.")
+
+        await self._delete_existing_audio(episode)
+        episode.enclosure_path = upload_complete.key
+        episode.enclosure_length = info.size
+        episode.enclosure_type = info.content_type
+        episode.itunes_duration = duration
 
         self.session.add(episode)
         self.session.commit()
 
-        self.session.refresh(podcast)
-        self.rss_service.update_podcast_rss(podcast)
-        self.session.add(podcast)
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
+
+        return CommonMessage(message="Audio Changed.")
+
+    async def create_audio_upload(self, id: int, upload_create: AudioUploadCreate) -> AudioUploadPublic:
+        episode = self._get_episode_by_id(id)
+        podcast = self.session.get(Podcast, episode.podcast_id)
+        self._check_permission(podcast)
+
+        chunk_size = upload_create.chunk_size or settings.UPLOAD_CHUNK_SIZE
+        if not settings.UPLOAD_MIN_CHUNK_SIZE <= chunk_size <= settings.UPLOAD_MAX_CHUNK_SIZE:
+            raise InvalidUploadError(
+                f"Chunk size must be between {settings.UPLOAD_MIN_CHUNK_SIZE} and {settings.UPLOAD_MAX_CHUNK_SIZE} bytes.")
+        if math.ceil(upload_create.total_size / chunk_size) > settings.UPLOAD_MAX_CHUNKS:
+            raise InvalidUploadError(
+                f"An upload can have at most {settings.UPLOAD_MAX_CHUNKS} chunks.")
+
+        enclosure_filename = self._get_enclosure_filename(
+            podcast.author_id, podcast.id, episode.id, upload_create.filename)
+        upload_id = await self.storage_service.create_multipart_upload(
+            enclosure_filename, upload_create.content_type)
+
+        upload = AudioUploadSession(
+            id=uuid4().hex,
+            episode_id=episode.id,
+            user_id=self.user_login.id,
+            key=enclosure_filename,
+            upload_id=upload_id,
+            filename=upload_create.filename,
+            content_type=upload_create.content_type,
+            total_size=upload_create.total_size,
+            chunk_size=chunk_size
+        )
+        self.session.add(upload)
         self.session.commit()
+        self.session.refresh(upload)
+
+        return self._get_audio_upload_public(upload)
+
+    def get_audio_upload(self, id: int, upload_id: str) -> AudioUploadPublic:
+        return self._get_audio_upload_public(self._get_audio_upload(id, upload_id))
+
+    async def upload_audio_chunk(self, id: int, upload_id: str, chunk_number: int, content: AsyncIterable[bytes], content_length: int | None) -> AudioUploadPublic:
+        upload = self._get_audio_upload(id, upload_id)
+
+        total_chunks = self._get_total_chunks(upload)
+        if not 1 <= chunk_number <= total_chunks:
+            raise InvalidUploadError(
+                f"Chunk number must be between 1 and {total_chunks}.")
+
+        chunk_range = self._get_chunk_range(upload, chunk_number)
+        if content_length != chunk_range.length:
+            raise InvalidUploadError(
+                f"Chunk {chunk_number} must be exactly {chunk_range.length} bytes.")
+
+        etag = await self.storage_service.upload_part(
+            upload.key, upload.upload_id, chunk_number, content, chunk_range.length)
+
+        self.session.merge(AudioUploadPart(
+            session_id=upload.id, part_number=chunk_number, etag=etag, size=chunk_range.length))
+        upload.updatetime = utc_now()
+        self.session.add(upload)
+        self.session.commit()
+        self.session.refresh(upload)
+
+        return self._get_audio_upload_public(upload)
+
+    async def complete_audio_upload(self, id: int, upload_id: str) -> CommonMessage:
+        upload = self._get_audio_upload(id, upload_id)
+        parts = self._get_audio_upload_parts(upload)
+        if len(parts) != self._get_total_chunks(upload):
+            raise UploadIncompleteError()
+
+        await self.storage_service.complete_multipart_upload(
+            upload.key, upload.upload_id, [(part.part_number, part.etag) for part in parts])
+
+        try:
+            duration = await self.storage_service.get_audio_duration(upload.key, upload.total_size)
+        except StorageError:
+            raise
+        except Exception:
+            # The parts are already assembled, so the session cannot be retried.
+            await self.storage_service.delete_file(upload.key)
+            self._delete_audio_upload_rows(self.session, upload)
+            self.session.commit()
+            raise InvalidUploadError("Unsupported Audio File.")
+
+        episode = self._get_episode_by_id(id)
+        await self._delete_existing_audio(episode)
+        episode.enclosure_path = upload.key
+        episode.enclosure_length = upload.total_size
+        episode.enclosure_type = upload.content_type
+        episode.itunes_duration = duration
+
+        self.session.add(episode)
+        self._delete_audio_upload_rows(self.session, upload)
+        self.session.commit()
+
+        rss_rebuild_scheduler.mark_dirty(episode.podcast_id)
 
         return CommonMessage(message="Audio Changed.")
 
+    async def abort_audio_upload(self, id: int, upload_id: str) -> CommonMessage:
+        upload = self._get_audio_upload(id, upload_id)
+
+        await self.storage_service.abort_multipart_upload(upload.key, upload.upload_id)
+        self._delete_audio_upload_rows(self.session, upload)
+        self.session.commit()
+
+        return CommonMessage(message="Audio Upload Aborted.")
+
+    def _get_audio_upload(self, id: int, upload_id: str) -> AudioUploadSession:
+        upload = self.session.get(AudioUploadSession, upload_id)
+        if not upload or upload.episode_id != id:
+            raise AudioUploadNotFoundError()
+
+        episode = self._get_episode_by_id(id)
+        self._check_permission(self.session.get(Podcast, episode.podcast_id))
+
+        return upload
+
+    def _get_audio_upload_parts(self, upload: AudioUploadSession) -> list[AudioUploadPart]:
+        return self.session.exec(
+            select(AudioUploadPart)
+            .where(AudioUploadPart.session_id == upload.id)
+            .order_by(AudioUploadPart.part_number)
+        ).all()
+
+    def _get_audio_upload_public(self, upload: AudioUploadSession) -> AudioUploadPublic:
+        received_chunks = [
+            part.part_number for part in self._get_audio_upload_parts(upload)]
+
+        received_ranges = []
+        for chunk_number in received_chunks:
+            chunk_range = self._get_chunk_range(upload, chunk_number)
+            if received_ranges and received_ranges[-1].end + 1 == chunk_range.start:
+                received_ranges[-1] = ByteRange(received_ranges[-1].start, chunk_range.end)
+            else:
+                received_ranges.append(chunk_range)
+
+        return AudioUploadPublic(
+            id=upload.id,
+            episode_id=upload.episode_id,
+            total_size=upload.total_size,
+            chunk_size=upload.chunk_size,
+            total_chunks=self._get_total_chunks(upload),
+            received_chunks=received_chunks,
+            received_ranges=[f"{byte_range.start}-{byte_range.end}" for byte_range in received_ranges],
+            expires_at=upload.updatetime +
+            timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+        )
+
+    def _get_total_chunks(self, upload: AudioUploadSession) -> int:
+        return math.ceil(upload.total_size / upload.chunk_size)
+
+    def _get_chunk_range(self, upload: AudioUploadSession, chunk_number: int) -> ByteRange:
+        start = (chunk_number - 1) * upload.chunk_size
+        return ByteRange(start, min(start + upload.chunk_size, upload.total_size) - 1)
+
+    @staticmethod
+    def _delete_audio_upload_rows(session: Session, upload: AudioUploadSession):
+        session.exec(delete(AudioUploadPart).where(
+            AudioUploadPart.session_id == upload.id))
+        session.delete(upload)
+
+    def _get_episode_by_id(self, id: int) -> Episode:
+        episode = self.session.exec(self._select_live_episode(id)).first()
+        if not episode:
+            raise EpisodeNotFoundError()
+        return episode
+
+    def _select_live_episodes(self, *columns):
+        # Episodes of a podcast queued for deletion are already gone to readers.
+        return select(Episode, *columns).join(Podcast).where(Podcast.deleted_at.is_(None))
+
+    def _select_live_episode(self, id: int):
+        return self._select_live_episodes().where(Episode.id == id)
+
+    def _check_permission(self, podcast: Podcast):
+        if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
+            raise NoPermissionError()
+
+    def _get_cover_prefix(self, author_id, podcast_id, episode_id) -> str:
+
+        return f"users/{author_id}/podcasts/{podcast_id}/episodes/{episode_id}/cover/"
+
     def _get_cover_filename(self, author_id, podcast_id, episode_id, original_filename: str) -> str:
 
-        return f"users/{author_id}/podcasts/{podcast_id}/episodes/{episode_id}/cover/{get_unique_filename(original_filename)}"
+        return self._get_cover_prefix(author_id, podcast_id, episode_id) + get_unique_filename(original_filename)
+
+    def _get_enclosure_prefix(self, author_id, podcast_id, episode_id) -> str:
+
+        return f"users/{author_id}/podcasts/{podcast_id}/episodes/{episode_id}/enclosure/"
 
     def _get_enclosure_filename(self, author_id, podcast_id, episode_id, original_filename: str) -> str:
 
-        return f"users/{author_id}/podcasts/{podcast_id}/episodes/{episode_id}/enclosure/{get_unique_filename(original_filename)}"
+        return self._get_enclosure_prefix(author_id, podcast_id, episode_id) + get_unique_filename(original_filename)
 
-    def _delete_existing_cover(self, episode: Episode):
+    async def _delete_existing_cover(self, episode: Episode):
         if episode.itunes_image_path:
-            self.cos_service.delete_file(episode.itunes_image_path)
+            await self.image_service.delete_image(episode.itunes_image_path, episode.itunes_image_sizes)
 
-    def _delete_existing_audio(self, episode: Episode):
+    async def _delete_existing_audio(self, episode: Episode):
         if episode.enclosure_path:
-            self.cos_service.delete_file(episode.enclosure_path)
+            await self.storage_service.delete_file(episode.enclosure_path)
+
+
+async def collect_expired_audio_uploads():
+    """Abort multipart uploads whose session saw no chunk within the TTL."""
+    storage_service = StorageService()
+    expired_before = utc_now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+    with Session(engine) as session:
+        uploads = session.exec(select(AudioUploadSession).where(
+            AudioUploadSession.updatetime < expired_before)).all()
+
+        for upload in uploads:
+            try:
+                await storage_service.abort_multipart_upload(upload.key, upload.upload_id)
+            except Exception:
+                logger.exception("Failed to abort audio upload %s", upload.id)
+                continue
+            EpisodeService._delete_audio_upload_rows(session, upload)
+            session.commit()
+
+
+async def run_audio_upload_gc():
+    while True:
+        try:
+            await collect_expired_audio_uploads()
+        except Exception:
+            logger.exception("Audio upload garbage collection failed")
+        await asyncio.sleep(settings.UPLOAD_SESSION_GC_INTERVAL_SECONDS)
 
 
-def get_episode_service(session: SessionDep, cos_service: CosServiceDep, rss_service: RssServiceDep):
-    return EpisodeService(session, cos_service, rss_service)
+def get_episode_service(session: SessionDep, async_session: AsyncSessionDep, storage_service: StorageServiceDep):
+    return EpisodeService(session, async_session, storage_service)
 
 
-def get_episode_service_with_login(session: SessionDep, cos_service: CosServiceDep, rss_service: RssServiceDep, user_login: UserDep):
-    return EpisodeService(session, cos_service, rss_service, user_login)
+def get_episode_service_with_login(session: SessionDep, async_session: AsyncSessionDep, storage_service: StorageServiceDep, user_login: UserDep):
+    return EpisodeService(session, async_session, storage_service, user_login)
 
 
 EpisodeServiceDep = Annotated[EpisodeService, Depends(get_episode_service)]
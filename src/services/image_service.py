@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import Response, status
+from fastapi.responses import StreamingResponse
+
+from src.config.settings import settings
+from src.core.exceptions import ImageProcessingError, InvalidUploadError
+from src.services.storage_service import StorageService
+from src.utils.http_utils import get_media_headers, is_not_modified
+from src.utils.image_utils import (
+    IMAGE_VARIANT_FORMATS,
+    ImageFormat,
+    format_image_sizes,
+    get_image_keys,
+    get_image_variant_key,
+    parse_image_sizes,
+    render_image_variants
+)
+
+
+class ImageVariantPool:
+    """
+    Worker processes for resizing and encoding images, started on first use.
+
+    Processes are spawned rather than forked so they do not inherit the
+    event loop, connection pools or threads of the API worker.
+    """
+
+    def __init__(self, workers: int):
+        self._workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def render(self, content: bytes, sizes: list[int], quality: int) -> dict[tuple[int, str], bytes]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self._workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, render_image_variants, content, sizes, quality)
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory); the pool is unusable from
+            # now on, so start a fresh one on the next call.
+            self.shutdown()
+            raise ImageProcessingError()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_variant_pool = ImageVariantPool(settings.IMAGE_VARIANT_WORKERS)
+
+
+class ImageService:
+    """
+    Covers and avatars with pre-rendered size variants.
+
+    Variants live next to the original under derived keys (see
+    `get_image_variant_key`); the entity stores which sizes exist, so images
+    uploaded before variants existed keep being served as they are.
+    """
+
+    def __init__(self, storage_service: StorageService):
+
+        self.storage_service = storage_service
+
+    async def create_variants(self, key: str) -> str:
+        """Render and store every variant of an uploaded image; returns the stored sizes."""
+        content, _ = await self.storage_service.fetch_file_content(key)
+        try:
+            variants = await image_variant_pool.render(
+                content, settings.IMAGE_VARIANT_SIZES, settings.IMAGE_VARIANT_QUALITY)
+        except ImageProcessingError:
+            raise
+        except Exception:
+            await self.storage_service.delete_file(key)
+            raise InvalidUploadError("Unsupported Image File.")
+
+        await asyncio.gather(*(
+            self.storage_service.save_file(
+                variant, get_image_variant_key(key, size, image_format), IMAGE_VARIANT_FORMATS[image_format][1])
+            for (size, image_format), variant in variants.items()
+        ))
+        return format_image_sizes({size for size, _ in variants})
+
+    async def delete_image(self, key: str, sizes: str | None):
+
+        await self.storage_service.delete_many(get_image_keys(key, sizes))
+
+    async def get_image(self, key: str, sizes: str | None, size: int | None = None, image_format: ImageFormat | None = None, accept: str | None = None, version: str | None = None, if_none_match: str | None = None, range_header: str | None = None) -> Response:
+
+        original_key = key
+        media_type = None
+        headers = {}
+        # The smallest variant at least as wide as asked for, or the largest
+        # one when none is (variants stop at the source's own size); the
+        # original when nothing is asked for or no variants are stored.
+        stored_sizes = parse_image_sizes(sizes)
+        if size and stored_sizes:
+            candidates = [stored for stored in stored_sizes if stored >= size]
+            if image_format is None:
+                image_format = "webp" if "image/webp" in (accept or "") else "jpeg"
+                headers["Vary"] = "Accept"
+            key = get_image_variant_key(key, min(candidates) if candidates else max(stored_sizes), image_format)
+            media_type = IMAGE_VARIANT_FORMATS[image_format][1]
+
+        if self.storage_service.redirects_media:
+            response = self.storage_service.redirect_to_file(key)
+            response.headers.update(headers)
+            return response
+
+        headers.update(get_media_headers(key, original_key, version))
+        if is_not_modified(headers["ETag"], None, if_none_match, None):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = await self.storage_service.get_file_response(key, media_type, headers, range_header)
+        if response:
+            return response
+
+        chunks, file_info = await self.storage_service.stream_file(key)
+        headers["Content-Length"] = str(file_info.size)
+        return StreamingResponse(chunks, media_type=media_type or file_info.content_type, headers=headers)
@@ -1,17 +1,21 @@
 from datetime import date
 from typing import Annotated
-from fastapi import Depends, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, Response, status
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.core.auth import UserDep
-from src.core.database import SessionDep
-from src.services.cos_service import CosService, CosServiceDep
+from src.core.database import AsyncSessionDep, SessionDep, commit_unique
+from src.services.storage_service import StorageService, StorageServiceDep
+from src.services.deletion_service import DeletionService
+from src.services.image_service import ImageService
 from src.config.settings import settings
-from src.models.episode import Episode
 from src.models.user import User
 from src.models.podcast import Podcast, PodcastUpdate, PodcastCreate
-from src.services.rss_service import RssService, RssServiceDep
+from src.models.deletion_job import DeletionJob
+from src.models.upload_session import DirectUploadComplete, DirectUploadCreate, DirectUploadPublic
+from src.services.rss_scheduler import rss_rebuild_scheduler
+from src.services.rss_service import RSS_MEDIA_TYPE, RssService, RssServiceDep
 from src.core.constants import CommonMessage, UserRole
 from src.core.exceptions import (
     PodcastCoverNotFoundError,
@@ -22,28 +26,34 @@ from src.core.exceptions import (
     PodcastTitleAlreadyExistsError
 )
 from src.utils.file_utils import get_unique_filename
+from src.utils.image_utils import ImageFormat
+from src.utils.multipart_utils import MultipartFileStream
+from src.utils.pagination_utils import encode_cursor, paginate, paginate_ranked
+from src.utils.search_utils import keyword_match
+from src.utils.http_utils import is_not_modified
+
+
+PODCAST_UNIQUE_ERRORS = {
+    "uq_podcast_title": PodcastTitleAlreadyExistsError
+}
 
 
 class PodcastService:
 
-    def __init__(self, session: Session, cos_service: CosService, rss_service: RssService, user_login: User | None = None):
+    def __init__(self, session: Session, async_session: AsyncSession, storage_service: StorageService, rss_service: RssService, user_login: User | None = None):
         self.session = session
-        self.cos_service = cos_service
+        self.async_session = async_session
+        self.storage_service = storage_service
         self.rss_service = rss_service
         self.user_login = user_login
+        self.image_service = ImageService(storage_service)
 
-    def create_podcast_by_author_id(self, author_id: int, podcast_upload: PodcastCreate) -> Podcast:
+    async def create_podcast_by_author_id(self, author_id: int, podcast_upload: PodcastCreate) -> Podcast:
         if self.user_login.id != author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
         author = self._get_user_by_id(author_id)
 
-        same_name_podcast = self.session.exec(
-            select(Podcast).where(Podcast.title == podcast_upload.title)
-        ).first()
-        if same_name_podcast:
-            raise PodcastTitleAlreadyExistsError()
-
         extra_data = {
             "author_id": author.id,
             "itunes_author": author.nickname,
@@ -53,134 +63,176 @@ class PodcastService:
 
         new_podcast = Podcast.model_validate(podcast_upload, update=extra_data)
         self.session.add(new_podcast)
-        self.session.commit()
+        commit_unique(self.session, PODCAST_UNIQUE_ERRORS)
         self.session.refresh(new_podcast)
 
-        self.rss_service.update_podcast_rss(new_podcast)
-        self.session.commit()
-        self.session.refresh(new_podcast)
+        rss_rebuild_scheduler.mark_dirty(new_podcast.id)
 
         return new_podcast
 
-    def get_podcasts_by_author_id(self, author_id: int, offset: int, limit: int) -> list[Podcast]:
-        return self.session.exec(select(Podcast).where(Podcast.author_id == author_id).offset(offset).limit(limit)).all()
+    async def get_podcasts_by_author_id(self, author_id: int, offset: int, limit: int, after: str | None = None) -> list[Podcast]:
+        return (await self.async_session.exec(paginate(select(Podcast).where(Podcast.author_id == author_id, Podcast.deleted_at.is_(None)), Podcast.id, offset, limit, after))).all()
 
-    def get_all_podcasts(self, offset: int, limit: int) -> list[Podcast]:
-        return self.session.exec(select(Podcast).offset(offset).limit(limit)).all()
+    async def get_all_podcasts(self, offset: int, limit: int, after: str | None = None) -> list[Podcast]:
+        return (await self.async_session.exec(paginate(select(Podcast).where(Podcast.deleted_at.is_(None)), Podcast.id, offset, limit, after))).all()
 
-    def get_podcast_by_id(self, id: int) -> Podcast:
-        podcast = self.session.get(Podcast, id)
-        if not podcast:
+    async def search_podcasts(self, keyword: str, offset: int, limit: int, after: str | None = None) -> tuple[list[Podcast], str | None]:
+        where, rank = keyword_match(
+            Podcast.title, Podcast.description, keyword, self.async_session.bind.dialect.name)
+        rows = (await self.async_session.exec(
+            paginate_ranked(select(Podcast, rank).where(where, Podcast.deleted_at.is_(None)), rank, Podcast.id, offset, limit, after)
+        )).all()
+
+        next_cursor = encode_cursor(rank=rows[-1][1], id=rows[-1][0].id) if rows else None
+        return [podcast for podcast, _ in rows], next_cursor
+
+    async def get_podcast_by_id(self, id: int) -> Podcast:
+        podcast = await self.async_session.get(Podcast, id)
+        if not podcast or podcast.deleted_at:
             raise PodcastNotFoundError()
 
         return podcast
 
-    def update_podcast_by_id(self, id: int, podcast_update: PodcastUpdate) -> Podcast:
-        podcast = self.get_podcast_by_id(id)
+    async def update_podcast_by_id(self, id: int, podcast_update: PodcastUpdate) -> Podcast:
+        podcast = self._get_podcast_by_id(id)
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        same_name_podcast = self.session.exec(
-            select(Podcast).where(Podcast.title == podcast_update.title)
-        ).first()
-        if same_name_podcast:
-            raise PodcastTitleAlreadyExistsError()
-
         podcast.sqlmodel_update(podcast_update.model_dump(exclude_unset=True))
         self.session.add(podcast)
-        self.session.commit()
+        commit_unique(self.session, PODCAST_UNIQUE_ERRORS)
         self.session.refresh(podcast)
 
-        self.rss_service.update_podcast_rss(podcast)
-        self.session.commit()
-        self.session.refresh(podcast)
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
 
         return podcast
 
-    def delete_podcast_by_id(self, id: int) -> CommonMessage:
-        podcast = self.get_podcast_by_id(id)
+    async def delete_podcast_by_id(self, id: int) -> DeletionJob:
+        podcast = self._get_podcast_by_id(id)
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        self._delete_existing_cover(podcast)
-        self._delete_existing_rss_xml(podcast)
-
-        for episode in podcast.episodes:
-            self._delete_episode(episode)
-
-        self.session.delete(podcast)
-        self.session.commit()
-
-        return CommonMessage(message="Podcast Deleted.")
+        return DeletionService(self.session, self.async_session, self.storage_service).schedule_podcast_deletion(
+            podcast, self.user_login.id)
 
-    def get_cover_by_id(self, id: int) -> StreamingResponse:
-        podcast = self.get_podcast_by_id(id)
+    async def get_cover_by_id(self, id: int, size: int | None = None, image_format: ImageFormat | None = None, accept: str | None = None, version: str | None = None, if_none_match: str | None = None, range_header: str | None = None) -> Response:
+        podcast = await self.get_podcast_by_id(id)
 
         if not podcast.itunes_image_path:
             raise PodcastCoverNotFoundError()
 
-        return StreamingResponse(self.cos_service.fetch_file(podcast.itunes_image_path))
+        return await self.image_service.get_image(
+            podcast.itunes_image_path, podcast.itunes_image_sizes, size, image_format, accept, version, if_none_match, range_header)
 
-    def update_cover_by_id(self, id: int, avatar_update: UploadFile) -> CommonMessage:
-        podcast = self.get_podcast_by_id(id)
+    async def update_cover_by_id(self, id: int, avatar_update: MultipartFileStream, content_sha256: str | None = None) -> CommonMessage:
+        podcast = self._get_podcast_by_id(id)
         if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
             raise NoPermissionError()
 
-        self._delete_existing_cover(podcast)
+        await avatar_update.open()
 
         cover_filename = self._get_cover_filename(
             podcast.author.id, podcast.id, avatar_update.filename)
-        self.cos_service.save_file(avatar_update.file, cover_filename)
+        await self.storage_service.save_upload(avatar_update, cover_filename, content_sha256)
+        image_sizes = await self.image_service.create_variants(cover_filename)
+
+        await self._delete_existing_cover(podcast)
         podcast.itunes_image_path = cover_filename
+        podcast.itunes_image_sizes = image_sizes
 
         self.session.add(podcast)
         self.session.commit()
 
+        rss_rebuild_scheduler.mark_dirty(podcast.id)
+
+        return CommonMessage(message="Cover Changed.")
+
+    async def create_cover_direct_upload(self, id: int, upload_create: DirectUploadCreate) -> DirectUploadPublic:
+        podcast = self._get_podcast_by_id(id)
+        if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
+            raise NoPermissionError()
+
+        cover_filename = self._get_cover_filename(
+            podcast.author_id, podcast.id, upload_create.filename)
+        return self.storage_service.create_direct_upload(cover_filename, upload_create.content_type)
+
+    async def complete_cover_direct_upload(self, id: int, upload_complete: DirectUploadComplete) -> CommonMessage:
+        podcast = self._get_podcast_by_id(id)
+        if self.user_login.id != podcast.author_id and self.user_login.role != UserRole.ADMIN.value:
+            raise NoPermissionError()
+
+        if upload_complete.key != podcast.itunes_image_path:
+            await self.storage_service.get_direct_upload_info(
+                upload_complete.key, self._get_cover_prefix(podcast.author_id, podcast.id))
+            image_sizes = await self.image_service.create_variants(upload_complete.key)
+
+            await self._delete_existing_cover(podcast)
+            podcast.itunes_image_path = upload_complete.key
+            podcast.itunes_image_sizes = image_sizes
+
+            self.session.add(podcast)
+            self.session.commit()
+
+            rss_rebuild_scheduler.mark_dirty(podcast.id)
+
         return CommonMessage(message="Cover Changed.")
 
-    def get_rss_by_id(self, id: int) -> StreamingResponse:
+    async def get_rss_by_id(self, id: int, if_none_match: str | None = None, if_modified_since: str | None = None) -> Response:
 
-        podcast = self.get_podcast_by_id(id)
+        podcast = await self.get_podcast_by_id(id)
 
         if not podcast.feed_path:
             raise PodcastFeedNotFoundError()
 
-        return StreamingResponse(self.cos_service.fetch_file(podcast.feed_path))
+        feed = self.rss_service.get_cached_feed(podcast)
+        if not feed:
+            if self.storage_service.redirects_media:
+                return self.storage_service.redirect_to_file(podcast.feed_path)
+            feed = await self.rss_service.get_feed(podcast)
+
+        headers = {
+            "ETag": feed.etag,
+            "Last-Modified": feed.last_modified,
+            "Cache-Control": "no-cache"
+        }
+        if is_not_modified(feed.etag, feed.last_modified, if_none_match, if_modified_since):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(feed.content, media_type=RSS_MEDIA_TYPE, headers=headers)
+
+    def _get_cover_prefix(self, author_id: int, podcast_id: int) -> str:
+
+        return f"users/{author_id}/podcasts/{podcast_id}/cover/"
 
     def _get_cover_filename(self, author_id: int, podcast_id: int, original_filename: str) -> str:
 
-        return f"users/{author_id}/podcasts/{podcast_id}/cover/{get_unique_filename(original_filename)}"
+        return self._get_cover_prefix(author_id, podcast_id) + get_unique_filename(original_filename)
+
+    def _get_podcast_by_id(self, id: int) -> Podcast:
+        podcast = self.session.get(Podcast, id)
+        if not podcast or podcast.deleted_at:
+            raise PodcastNotFoundError()
+
+        return podcast
 
     def _get_user_by_id(self, user_id):
         user = self.session.get(User, user_id)
-        if not user:
+        if not user or user.deleted_at:
             raise UserNotFoundError()
 
         return user
 
-    def _delete_existing_cover(self, podcast: Podcast) -> None:
+    async def _delete_existing_cover(self, podcast: Podcast) -> None:
         if podcast.itunes_image_path:
-            self.cos_service.delete_file(podcast.itunes_image_path)
-
-    def _delete_existing_rss_xml(self, podcast: Podcast) -> None:
-        if podcast.feed_path:
-            self.cos_service.delete_file(podcast.feed_path)
-
-    def _delete_episode(self, episode: Episode) -> None:
-        if episode.itunes_image_path:
-            self.cos_service.delete_file(episode.itunes_image_path)
-        if episode.enclosure_path:
-            self.cos_service.delete_file(episode.enclosure_path)
-
-        self.session.delete(episode)
+            await self.image_service.delete_image(podcast.itunes_image_path, podcast.itunes_image_sizes)
 
 
-def get_podcast_service(session: SessionDep, cos_service: CosServiceDep, rss_service: CosServiceDep):
-    return PodcastService(session, cos_service, rss_service)
+def get_podcast_service(session: SessionDep, async_session: AsyncSessionDep, storage_service: StorageServiceDep, rss_service: RssServiceDep):
+    return PodcastService(session, async_session, storage_service, rss_service)
 
 
-def get_podcast_service_with_login(session: SessionDep, cos_service: CosServiceDep, rss_service: RssServiceDep, user_login: UserDep):
-    return PodcastService(session, cos_service, rss_service, user_login)
+def get_podcast_service_with_login(session: SessionDep, async_session: AsyncSessionDep, storage_service: StorageServiceDep, rss_service: RssServiceDep, user_login: UserDep):
+    return PodcastService(session, async_session, storage_service, rss_service, user_login)
 
 
 PodcastServiceDep = Annotated[PodcastService, Depends(get_podcast_service)]
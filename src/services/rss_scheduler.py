@@ -0,0 +1,126 @@
+import asyncio
+import logging
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from src.config.settings import settings
+from src.core.database import engine
+from src.models.podcast import Podcast
+from src.services.storage_service import StorageService
+from src.services.rss_service import RssService
+
+logger = logging.getLogger(__name__)
+
+
+class RssRebuildScheduler:
+    """
+    Coalesces feed rebuilds off the request path.
+
+    Mutations only mark a podcast dirty. A podcast is rebuilt once it has been
+    quiet for `RSS_REBUILD_DEBOUNCE_SECONDS`, or at the latest
+    `RSS_REBUILD_MAX_DELAY_SECONDS` after it was first marked, so a burst of
+    edits costs a single rebuild. Marks arriving during a rebuild schedule
+    another one.
+
+    A rebuild runs in its own task and is never cancelled half way through an
+    upload; `rebuild_now` only cuts a debounce wait short, and otherwise waits
+    for the running rebuild before starting its own.
+    """
+
+    def __init__(self, debounce_seconds: float, max_delay_seconds: float):
+        self._debounce_seconds = debounce_seconds
+        self._max_delay_seconds = max_delay_seconds
+        # podcast id -> (first marked, last marked), in loop time
+        self._pending: dict[int, tuple[float, float]] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._rebuilds: dict[int, asyncio.Task] = {}
+
+    def mark_dirty(self, podcast_id: int):
+        now = asyncio.get_running_loop().time()
+        first_marked, _ = self._pending.get(podcast_id, (now, now))
+        self._pending[podcast_id] = (first_marked, now)
+
+        if podcast_id not in self._tasks:
+            self._tasks[podcast_id] = asyncio.create_task(
+                self._run(podcast_id))
+
+    async def rebuild_now(self, podcast_id: int):
+        self._pending.pop(podcast_id, None)
+        task = self._tasks.pop(podcast_id, None)
+        if task:
+            # The rebuild it may be awaiting is shielded, so this only ends a
+            # debounce wait.
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        # The running rebuild may have read the podcast before the change the
+        # caller wants published, so rebuild again once it is done.
+        while rebuild := self._rebuilds.get(podcast_id):
+            await asyncio.wait([rebuild])
+        await asyncio.shield(self._start_rebuild(podcast_id))
+
+    async def flush(self):
+        """Rebuild every dirty podcast immediately, e.g. on shutdown or in tests."""
+        for podcast_id in set(self._pending) | set(self._tasks):
+            await self.rebuild_now(podcast_id)
+
+    async def _run(self, podcast_id: int):
+        loop = asyncio.get_running_loop()
+        try:
+            while podcast_id in self._pending:
+                first_marked, last_marked = self._pending[podcast_id]
+                due = min(last_marked + self._debounce_seconds,
+                          first_marked + self._max_delay_seconds)
+                if due > loop.time():
+                    await asyncio.sleep(due - loop.time())
+                    continue
+
+                del self._pending[podcast_id]
+                await asyncio.shield(self._start_rebuild(podcast_id))
+        finally:
+            if self._tasks.get(podcast_id) is asyncio.current_task():
+                del self._tasks[podcast_id]
+
+    def _start_rebuild(self, podcast_id: int) -> asyncio.Task:
+        rebuild = self._rebuilds[podcast_id] = asyncio.create_task(
+            self._rebuild(podcast_id))
+
+        def forget(task: asyncio.Task):
+            if self._rebuilds.get(podcast_id) is task:
+                del self._rebuilds[podcast_id]
+
+        rebuild.add_done_callback(forget)
+        return rebuild
+
+    async def _rebuild(self, podcast_id: int):
+        try:
+            with Session(engine) as session:
+                # Queries and the commit run on a worker thread; rendering only
+                # reads what is loaded here.
+                podcast = await run_in_threadpool(
+                    self._load_podcast, session, podcast_id)
+                if not podcast:
+                    return
+                rss_service = RssService(StorageService())
+                previous_feed_path = await rss_service.update_podcast_rss(podcast)
+                feed_path = podcast.feed_path
+                session.add(podcast)
+                await run_in_threadpool(session.commit)
+            if previous_feed_path != feed_path:
+                await rss_service.delete_feed(podcast_id, previous_feed_path)
+        except Exception:
+            logger.exception("RSS rebuild failed for podcast %s", podcast_id)
+
+    def _load_podcast(self, session: Session, podcast_id: int) -> Podcast | None:
+        # A tombstoned podcast is being purged; a rebuild queued before that
+        # must not upload a feed the purge may already have missed.
+        return session.exec(select(Podcast).where(
+            Podcast.id == podcast_id, Podcast.deleted_at.is_(None)
+        ).options(selectinload(Podcast.author), selectinload(Podcast.episodes))).first()
+
+
+rss_rebuild_scheduler = RssRebuildScheduler(
+    settings.RSS_REBUILD_DEBOUNCE_SECONDS,
+    settings.RSS_REBUILD_MAX_DELAY_SECONDS
+)
@@ -1,203 +1,256 @@
 
-import os
-import io
-from typing import Annotated
+import logging
+import time
+from typing import Annotated, Iterator, NamedTuple
 import uuid
-from xml.dom.minidom import Document, Element
 
 from fastapi import Depends
 
-from src.services.cos_service import CosService, CosServiceDep
+from src.core.cache import TTLCache
+from src.services.storage_service import StorageService, StorageServiceDep
 from src.core.constants import ContentFileType
 from src.models.episode import Episode
 from src.models.podcast import Podcast
 from src.config.settings import settings
+from src.utils.http_utils import get_key_version, http_date, strong_etag
+from src.utils.xml_utils import XML_DECLARATION, element, end_tag, start_tag
 
+logger = logging.getLogger(__name__)
 
-class RssService:
+RSS_MEDIA_TYPE = "application/rss+xml; charset=utf-8"
 
-    def __init__(self, cos_service: CosService):
 
-        self.cos_service = cos_service
-        self.podcast = None
+class CachedFeed(NamedTuple):
+    content: bytes
+    etag: str
+    last_modified: str
 
-    def update_podcast_rss(self, podcast: Podcast):
 
-        self.podcast = podcast
+# Keyed by (podcast id, feed path); every rebuild writes a new feed path, so
+# a stale version can never be served once the podcast row is reloaded.
+feed_cache: TTLCache[CachedFeed] = TTLCache(settings.FEED_CACHE_SIZE)
 
-        self._delete_existing_rss_xml()
-        xml_doc = self._generate_rss()
+# episode id -> (render version, serialized <item>), so a rebuild only
+# re-renders the episodes whose rendered fields changed.
+item_fragment_cache: TTLCache[tuple[tuple, bytes]] = TTLCache(
+    settings.RSS_ITEM_CACHE_SIZE)
 
-        if not xml_doc:
-            return
 
-        xml_str = xml_doc.toxml().encode('utf-8')
-        xml_binary_io = io.BytesIO(xml_str)
-        xml_filename = f"users/{self.podcast.author_id}/podcasts/{self.podcast.id}/rss"
-        self.cos_service.save_file(xml_binary_io, xml_filename)
-        self.podcast.feed_path = xml_filename
+class RssService:
 
-    def _generate_rss(self) -> Document:
+    def __init__(self, storage_service: StorageService):
 
-        if not self._check_podcast_integrity():
-            return
+        self.storage_service = storage_service
+        self.podcast = None
 
-        itunes_namespace_url = "http://www.itunes.com/dtds/podcast-1.0.dtd"
-        content_namespace_url = "http://purl.org/rss/1.0/modules/content/"
+    async def update_podcast_rss(self, podcast: Podcast) -> str | None:
+        """
+        Writes the feed under a new key and points `podcast.feed_path` at it.
 
-        xml_doc = Document()
+        Returns the superseded feed path. The caller deletes it with
+        `delete_feed` once the new path is committed, so a failed upload or
+        commit leaves the podcast serving its previous feed.
+        """
 
-        rss_element = xml_doc.createElement("rss")
-        xml_doc.appendChild(rss_element)
+        self.podcast = podcast
 
-        rss_element.setAttribute("version", "2.0")
-        rss_element.setAttribute("xmlns:itunes", itunes_namespace_url)
-        rss_element.setAttribute("xmlns:content", content_namespace_url)
+        previous_feed_path = self.podcast.feed_path
+        self.podcast.feed_path = None
+        xml_chunks = self._generate_rss()
 
-        channel_element = xml_doc.createElement("channel")
-        rss_element.appendChild(channel_element)
+        if not xml_chunks:
+            return previous_feed_path
 
-        self._populate_channel_element(xml_doc, channel_element)
+        # Chunks are streamed into storage as they are rendered and kept once
+        # for the feed cache.
+        rendered_chunks = []
 
-        return xml_doc
+        async def iter_upload_chunks():
+            for chunk in xml_chunks:
+                rendered_chunks.append(chunk)
+                yield chunk
 
-    def _write_xml_to_file(self, xml_doc: Document) -> str:
+        xml_filename = f"users/{self.podcast.author_id}/podcasts/{self.podcast.id}/rss/{uuid.uuid4().hex}.xml"
+        try:
+            await self.storage_service.save_file(iter_upload_chunks(), xml_filename, RSS_MEDIA_TYPE)
+        except BaseException:
+            self.podcast.feed_path = previous_feed_path
+            raise
+        self.podcast.feed_path = xml_filename
 
-        unique_filename = uuid.uuid4().hex + ".xml"
-        target_dir = os.path.join(
-            settings.CONTENTS_DIR, ContentFileType.RSS_XML.value)
-        if not os.path.exists(target_dir):
-            os.makedirs(target_dir)
-        filename = os.path.join(target_dir, unique_filename)
+        xml_bytes = b"".join(rendered_chunks)
+        self.cache_feed(self.podcast.id, xml_filename,
+                        CachedFeed(xml_bytes, strong_etag(xml_bytes), http_date(time.time())))
 
-        with open(filename, 'w', encoding="UTF-8") as file:
-            xml_doc.writexml(file, encoding="UTF-8")
+        return previous_feed_path
 
-        return filename
+    async def delete_feed(self, podcast_id: int, feed_path: str | None):
 
-    def _populate_channel_element(self, xml_doc: Document, channel_element: Element):
+        if not feed_path:
+            return
 
-        title = xml_doc.createElement("title")
-        channel_element.appendChild(title)
-        title.appendChild(xml_doc.createTextNode(self.podcast.title))
+        feed_cache.delete((podcast_id, feed_path))
+        try:
+            await self.storage_service.delete_file(feed_path)
+        except Exception:
+            logger.exception("Failed to delete superseded feed %s", feed_path)
 
-        description = xml_doc.createElement("description")
-        channel_element.appendChild(description)
-        description.appendChild(
-            xml_doc.createTextNode(self.podcast.description))
+    async def get_feed(self, podcast: Podcast) -> CachedFeed:
 
-        itunes_image = xml_doc.createElement("itunes:image")
-        channel_element.appendChild(itunes_image)
-        itunes_image.setAttribute("href", self._get_content_url(
-            self.podcast.id, ContentFileType.PODCAST_COVER))
+        cached_feed = self.get_cached_feed(podcast)
+        if cached_feed:
+            return cached_feed
 
-        language = xml_doc.createElement("language")
-        channel_element.appendChild(language)
-        language.appendChild(xml_doc.createTextNode(self.podcast.language))
+        content, file_info = await self.storage_service.fetch_file_content(podcast.feed_path)
+        cached_feed = CachedFeed(
+            content, strong_etag(content), file_info.last_modified or http_date(time.time()))
+        self.cache_feed(podcast.id, podcast.feed_path, cached_feed)
 
-        itunes_category = xml_doc.createElement("itunes:category")
-        channel_element.appendChild(itunes_category)
-        itunes_category.setAttribute("text", self.podcast.itunes_category)
+        return cached_feed
 
-        if self.podcast.itunes_subcategory:
-            itunes_subcategory = xml_doc.createElement("itunes:category")
-            itunes_category.appendChild(itunes_subcategory)
-            itunes_subcategory.setAttribute(
-                "text", self.podcast.itunes_subcategory)
+    def get_cached_feed(self, podcast: Podcast) -> CachedFeed | None:
 
-        itunes_explicit = xml_doc.createElement("itunes:explicit")
-        channel_element.appendChild(itunes_explicit)
-        itunes_explicit.appendChild(
-            xml_doc.createTextNode(str(self.podcast.itunes_explicit)))
+        return feed_cache.get((podcast.id, podcast.feed_path))
 
-        if self.podcast.author:
-            author = xml_doc.createElement("author")
-            channel_element.appendChild(author)
-            author.appendChild(xml_doc.createTextNode(
-                self.podcast.author.nickname))
+    def cache_feed(self, podcast_id: int, feed_path: str, cached_feed: CachedFeed):
 
-        if self.podcast.link:
-            link = xml_doc.createElement("link")
-            channel_element.appendChild(link)
-            link.appendChild(xml_doc.createTextNode(self.podcast.link))
+        feed_cache.set((podcast_id, feed_path), cached_feed,
+                       settings.FEED_CACHE_TTL_SECONDS)
 
-        if self.podcast.copyright:
-            copyright = xml_doc.createElement("copyright")
-            channel_element.appendChild(copyright)
-            copyright.appendChild(
-                xml_doc.createTextNode(self.podcast.copyright))
+    def _generate_rss(self) -> Iterator[bytes] | None:
 
-        if self.podcast.generator:
-            generator = xml_doc.createElement("generator")
-            channel_element.appendChild(generator)
-            generator.appendChild(
-                xml_doc.createTextNode(self.podcast.generator))
+        if not self._check_podcast_integrity():
+            return
+
+        return self._iter_rss_chunks()
+
+    def _iter_rss_chunks(self) -> Iterator[bytes]:
+
+        itunes_namespace_url = "http://www.itunes.com/dtds/podcast-1.0.dtd"
+        content_namespace_url = "http://purl.org/rss/1.0/modules/content/"
 
-        self._add_items(xml_doc, channel_element)
+        rss_attrs = {
+            "version": "2.0",
+            "xmlns:itunes": itunes_namespace_url,
+            "xmlns:content": content_namespace_url
+        }
 
-    def _add_items(self, xml_doc: Document, channel_element: Element):
+        yield (
+            XML_DECLARATION
+            + start_tag("rss", rss_attrs)
+            + start_tag("channel")
+            + self._render_channel_header()
+        ).encode("utf-8")
 
         for episode in self.podcast.episodes:
 
             if not self._check_episode_integrity(episode):
                 continue
 
-            item = xml_doc.createElement("item")
-            channel_element.appendChild(item)
+            yield self._get_item_fragment(episode)
+
+        yield (end_tag("channel") + end_tag("rss")).encode("utf-8")
+
+    def _get_item_fragment(self, episode: Episode) -> bytes:
+
+        version = self._get_item_version(episode)
+        cached_item = item_fragment_cache.get(episode.id)
+        if cached_item and cached_item[0] == version:
+            return cached_item[1]
+
+        fragment = element(
+            "item", children=self._render_item_children(episode)).encode("utf-8")
+        item_fragment_cache.set(episode.id, (version, fragment),
+                                settings.RSS_ITEM_CACHE_TTL_SECONDS)
+        return fragment
+
+    def _get_item_version(self, episode: Episode) -> tuple:
+
+        # Every input of _render_item_children, including the URL base.
+        return (
+            settings.BASE_URL,
+            settings.RSS_IMAGE_SIZE,
+            episode.title,
+            episode.enclosure_path,
+            episode.enclosure_length,
+            episode.enclosure_type,
+            episode.guid,
+            episode.pub_date,
+            episode.description,
+            episode.itunes_duration,
+            episode.link,
+            episode.itunes_image_path,
+            episode.itunes_explicit
+        )
+
+    def _render_channel_header(self) -> str:
+
+        parts = [
+            element("title", self.podcast.title),
+            element("description", self.podcast.description),
+            element("itunes:image", attrs={"href": self._get_content_url(
+                self.podcast.id, ContentFileType.PODCAST_COVER, self.podcast.itunes_image_path)}),
+            element("language", self.podcast.language)
+        ]
+
+        itunes_subcategory = ""
+        if self.podcast.itunes_subcategory:
+            itunes_subcategory = element(
+                "itunes:category", attrs={"text": self.podcast.itunes_subcategory})
+        parts.append(element("itunes:category", attrs={
+                     "text": self.podcast.itunes_category}, children=itunes_subcategory))
 
-            self._populate_item_element(episode, xml_doc, item)
+        parts.append(element("itunes:explicit",
+                     str(self.podcast.itunes_explicit)))
 
-    def _populate_item_element(self, episode: Episode, xml_doc: Document, item_element: Element):
+        if self.podcast.author:
+            parts.append(element("author", self.podcast.author.nickname))
 
-        title = xml_doc.createElement("title")
-        item_element.appendChild(title)
-        title.appendChild(xml_doc.createTextNode(episode.title))
+        if self.podcast.link:
+            parts.append(element("link", self.podcast.link))
 
-        enclosure = xml_doc.createElement("enclosure")
-        item_element.appendChild(enclosure)
-        enclosure.setAttribute("url", self._get_content_url(
-            episode.id, ContentFileType.AUDIO))
-        enclosure.setAttribute("length", str(episode.enclosure_length))
-        enclosure.setAttribute("type", episode.enclosure_type)
+        if self.podcast.copyright:
+            parts.append(element("copyright", self.podcast.copyright))
+
+        if self.podcast.generator:
+            parts.append(element("generator", self.podcast.generator))
+
+        return "".join(parts)
+
+    def _render_item_children(self, episode: Episode) -> str:
 
-        guid = xml_doc.createElement("guid")
-        item_element.appendChild(guid)
-        guid.appendChild(xml_doc.createTextNode(episode.guid))
+        parts = [
+            element("title", episode.title),
+            element("enclosure", attrs={
+                "url": self._get_content_url(episode.id, ContentFileType.AUDIO, episode.enclosure_path),
+                "length": str(episode.enclosure_length),
+                "type": episode.enclosure_type
+            }),
+            element("guid", episode.guid)
+        ]
 
         if episode.pub_date:
-            pub_date = xml_doc.createElement("pubDate")
-            item_element.appendChild(pub_date)
-            pub_date.appendChild(xml_doc.createTextNode(episode.pub_date))
+            parts.append(element("pubDate", episode.pub_date))
 
         if episode.description:
-            description = xml_doc.createElement("description")
-            item_element.appendChild(description)
-            description.appendChild(
-                xml_doc.createTextNode(episode.description))
+            parts.append(element("description", episode.description))
 
         if episode.itunes_duration:
-            itunes_duration = xml_doc.createElement("itunes_duration")
-            item_element.appendChild(itunes_duration)
-            itunes_duration.appendChild(
-                xml_doc.createTextNode(str(episode.itunes_duration)))
+            parts.append(element("itunes_duration",
+                         str(episode.itunes_duration)))
 
         if episode.link:
-            title = xml_doc.createElement("title")
-            item_element.appendChild(title)
-            title.appendChild(xml_doc.createTextNode(episode.title))
+            parts.append(element("title", episode.title))
 
         if episode.itunes_image_path:
-            itunes_image = xml_doc.createElement("itunes:image")
-            item_element.appendChild(itunes_image)
-            itunes_image.setAttribute("href", self._get_content_url(
-                episode.id, ContentFileType.EPISODE_COVER))
+            parts.append(element("itunes:image", attrs={"href": self._get_content_url(
+                episode.id, ContentFileType.EPISODE_COVER, episode.itunes_image_path)}))
 
         if episode.itunes_explicit:
-            itunes_image = xml_doc.createElement("itunes:image")
-            item_element.appendChild(itunes_image)
-            itunes_image.appendChild(xml_doc.createTextNode(
-                "true" if episode.itunes_explicit else "false"
-            ))
+            parts.append(element(
+                "itunes:image", "true" if episode.itunes_explicit else "false"))
+
+        return "".join(parts)
 
     def _check_podcast_integrity(self) -> bool:
 
@@ -220,25 +273,27 @@ class RssService:
             episode.enclosure_length and \
             episode.enclosure_type
 
-    def _get_content_url(self, id: int, filetype: ContentFileType) -> str:
+    def _get_content_url(self, id: int, filetype: ContentFileType, key: str | None) -> str:
+
+        # The version pins the URL to this upload, so clients may cache it
+        # for good; covers point at the JPEG variant podcast directories accept.
+        params = [f"v={get_key_version(key)}"] if key else []
+        if filetype != ContentFileType.AUDIO:
+            params += [f"size={settings.RSS_IMAGE_SIZE}", "format=jpeg"]
+        query = "?" + "&".join(params) if params else ""
 
         if filetype == ContentFileType.PODCAST_COVER:
-            return settings.BASE_URL + "/".join(["podcasts", str(id), "cover"])
+            return settings.BASE_URL + "/".join(["podcasts", str(id), "cover"]) + query
 
         if filetype == ContentFileType.EPISODE_COVER:
-            return settings.BASE_URL + "/".join(["episodes", str(id), "cover"])
+            return settings.BASE_URL + "/".join(["episodes", str(id), "cover"]) + query
 
         if filetype == ContentFileType.AUDIO:
-            return settings.BASE_URL + "/".join(["episodes", str(id), "audio"])
-
-    def _delete_existing_rss_xml(self):
-
-        if self.podcast.feed_path:
-            self.cos_service.delete_file(self.podcast.feed_path)
+            return settings.BASE_URL + "/".join(["episodes", str(id), "audio"]) + query
 
 
-def get_rss_service(cos_service: CosServiceDep):
-    return RssService(cos_service)
+def get_rss_service(storage_service: StorageServiceDep):
+    return RssService(storage_service)
 
 
 RssServiceDep = Annotated[RssService, Depends(get_rss_service)]
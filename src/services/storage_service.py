@@ -0,0 +1,272 @@
+import os
+from datetime import timedelta
+from typing import Annotated, AsyncIterable, AsyncIterator, BinaryIO, Iterable
+
+import anyio.from_thread
+import anyio.to_thread
+from fastapi import Depends
+from fastapi.responses import FileResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+
+from src.core.cache import TTLCache
+from src.core.constants import MediaDeliveryMode, StorageBackendType
+from src.core.exceptions import DirectUploadNotSupportedError, InvalidUploadError, StorageError
+from src.config.settings import settings
+from src.core.object_cache import ObjectCache, ObjectCacheFill
+from src.core.storage import FileInfo, InstrumentedStorage, LocalStorage, StorageBackend
+from src.models.upload_session import DirectUploadPublic, utc_now
+from src.utils.file_utils import RangedReader, get_audio_duration_from_binaryio
+from src.utils.multipart_utils import MultipartFileStream
+from src.utils.range_utils import ByteRange
+
+
+def create_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == StorageBackendType.LOCAL.value:
+        backend = LocalStorage(settings.CONTENTS_DIR)
+    else:
+        # Imported here so local deployments need no COS credentials
+        from src.core.cos import CosStorage, async_cos_client, cos_client
+        backend = CosStorage(async_cos_client, cos_client, settings.COS_BUCKET)
+
+    return InstrumentedStorage(backend, settings.STORAGE_BACKEND)
+
+
+storage_backend = create_storage_backend()
+presigned_url_cache: TTLCache[str] = TTLCache(settings.PRESIGNED_URL_CACHE_SIZE)
+object_cache: ObjectCache[FileInfo] = ObjectCache(
+    settings.OBJECT_CACHE_MEMORY_BYTES,
+    settings.OBJECT_CACHE_MEMORY_MAX_OBJECT_BYTES,
+    settings.OBJECT_CACHE_DIR,
+    settings.OBJECT_CACHE_DISK_BYTES,
+    settings.OBJECT_CACHE_DISK_MAX_OBJECT_BYTES
+)
+
+
+class StorageService:
+    """
+    Stored objects (covers, avatars, audio, feeds) in the configured backend.
+
+    Reads go through the shared object cache, which every write and delete
+    invalidates; presigned URLs are reused until shortly before they expire.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+
+        self._backend = storage_backend
+
+    @property
+    def redirects_media(self) -> bool:
+        """Whether media is answered with a redirect to a presigned URL."""
+        return settings.MEDIA_DELIVERY_MODE == MediaDeliveryMode.REDIRECT.value \
+            and self._backend.supports_presigned_urls
+
+    async def save_file(self, file: BinaryIO | bytes | AsyncIterable[bytes], filename: str, content_type: str | None = None):
+        if isinstance(file, bytes):
+            content, size = file, len(file)
+        elif hasattr(file, "read"):
+            content, size = self._iter_binary_io(file), await run_in_threadpool(_remaining_size, file)
+        else:
+            content, size = file, None
+
+        try:
+            await self._backend.put(filename, content, size, content_type)
+        finally:
+            self._invalidate(filename)
+
+    async def save_upload(self, upload: MultipartFileStream, filename: str, expected_sha256: str | None = None):
+        await self.save_file(upload, filename, upload.content_type)
+        if expected_sha256 and expected_sha256.lower() != upload.sha256:
+            await self.delete_file(filename)
+            raise InvalidUploadError("Checksum Mismatch.")
+
+    async def fetch_file(self, filename, byte_range: ByteRange | None = None) -> AsyncIterator[bytes]:
+        chunks, _ = await self.stream_file(filename, byte_range)
+        return chunks
+
+    async def stream_file(self, filename, byte_range: ByteRange | None = None) -> tuple[AsyncIterator[bytes], FileInfo]:
+        """Like `fetch_file`, also returning the object's metadata."""
+        cached = await object_cache.stream(filename, self.CHUNK_SIZE, byte_range)
+        if cached:
+            return cached
+
+        chunks, file_info = await self._backend.get(filename, byte_range)
+        # Whole objects are cached as they stream past; ranges only read the cache.
+        fill = None
+        if not byte_range:
+            fill = object_cache.start_fill(filename, file_info, file_info.size)
+
+        return self._iter_filling(chunks, fill), file_info
+
+    async def fetch_file_content(self, filename, byte_range: ByteRange | None = None) -> tuple[bytes, FileInfo]:
+        cached = await object_cache.read(filename, byte_range)
+        if cached:
+            return cached
+
+        content, file_info = await self._backend.read(filename, byte_range)
+        if not byte_range:
+            await object_cache.put(filename, file_info, content)
+        return content, file_info
+
+    async def get_file_response(self, filename, media_type: str | None, headers: dict[str, str], range_header: str | None = None) -> FileResponse | None:
+        """
+        Serve an object straight from local disk, or None when the backend
+        is remote. FileResponse answers Range and If-Range itself, against
+        the ETag given in `headers`.
+
+        Also None for a multi-range request: Starlette's multipart/byteranges
+        body is one byte longer than the Content-Length it sends, so those go
+        through the caller's streamed path instead.
+        """
+        path = self._backend.get_path(filename)
+        if path is None or (range_header and "," in range_header):
+            return None
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, path)
+        except OSError:
+            raise StorageError()
+
+        return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+    async def get_file_info(self, filename) -> FileInfo:
+        file_info = await self.find_file_info(filename)
+        if not file_info:
+            raise StorageError()
+
+        return file_info
+
+    async def find_file_info(self, filename) -> FileInfo | None:
+        file_info = object_cache.get_info(filename)
+        if file_info:
+            return file_info
+
+        return await self._backend.head(filename)
+
+    async def delete_file(self, filename):
+        try:
+            await self._backend.delete(filename)
+        finally:
+            self._invalidate(filename)
+
+    async def delete_many(self, filenames: Iterable[str | None]):
+        """
+        Delete keys in batches of the backend's DELETE_BATCH_SIZE. Missing keys
+        count as deleted; empty values are skipped.
+        """
+        filenames = list(dict.fromkeys(filename for filename in filenames if filename))
+        batch_size = self._backend.DELETE_BATCH_SIZE
+        for start in range(0, len(filenames), batch_size):
+            batch = filenames[start:start + batch_size]
+            try:
+                await self._backend.delete_many(batch)
+            finally:
+                for filename in batch:
+                    self._invalidate(filename)
+
+    async def get_audio_duration(self, filename, size: int) -> float:
+        """
+        Probe an MP3's duration with ranged reads: mutagen only touches the
+        head (ID3 + first frames) and tail (ID3v1/APE) of the object.
+        """
+        def read_range(start: int, end: int) -> bytes:
+            content, _ = anyio.from_thread.run(
+                self.fetch_file_content, filename, ByteRange(start, end))
+            return content
+
+        return await anyio.to_thread.run_sync(
+            get_audio_duration_from_binaryio, RangedReader(size, read_range))
+
+    async def create_multipart_upload(self, filename, content_type: str | None = None) -> str:
+        return await self._backend.create_multipart_upload(filename, content_type)
+
+    async def upload_part(self, filename, upload_id: str, part_number: int, content: bytes | AsyncIterable[bytes], size: int) -> str:
+        return await self._backend.upload_part(filename, upload_id, part_number, content, size)
+
+    async def complete_multipart_upload(self, filename, upload_id: str, parts: list[tuple[int, str]]):
+        try:
+            await self._backend.complete_multipart_upload(filename, upload_id, parts)
+        finally:
+            self._invalidate(filename)
+
+    async def abort_multipart_upload(self, filename, upload_id: str):
+        await self._backend.abort_multipart_upload(filename, upload_id)
+
+    def get_presigned_url(self, filename) -> str:
+        url = presigned_url_cache.get(filename)
+        if url:
+            return url
+
+        expire_seconds = settings.PRESIGNED_URL_EXPIRE_SECONDS
+        url = self._backend.get_presigned_url(filename, "GET", expire_seconds)
+        presigned_url_cache.set(
+            filename, url, expire_seconds - settings.PRESIGNED_URL_REFRESH_MARGIN_SECONDS)
+        return url
+
+    def create_direct_upload(self, filename, content_type: str) -> DirectUploadPublic:
+        if not self._backend.supports_presigned_urls:
+            raise DirectUploadNotSupportedError()
+
+        # Content-Type is signed, so the client must send exactly this value.
+        headers = {"Content-Type": content_type}
+        expire_seconds = settings.DIRECT_UPLOAD_EXPIRE_SECONDS
+        url = self._backend.get_presigned_url(filename, "PUT", expire_seconds, headers)
+
+        return DirectUploadPublic(
+            key=filename,
+            url=url,
+            headers=headers,
+            expires_at=utc_now() + timedelta(seconds=expire_seconds)
+        )
+
+    async def get_direct_upload_info(self, filename: str, prefix: str) -> FileInfo:
+        """Check that a directly uploaded key was issued under `prefix` and now exists."""
+        name = filename.removeprefix(prefix)
+        if not filename.startswith(prefix) or not name or "/" in name:
+            raise InvalidUploadError("Upload Key Does Not Belong To This Resource.")
+
+        info = await self.find_file_info(filename)
+        if not info or not info.size:
+            raise InvalidUploadError("Uploaded Object Not Found.")
+        return info
+
+    def redirect_to_file(self, filename) -> RedirectResponse:
+        return RedirectResponse(self.get_presigned_url(filename), status_code=settings.MEDIA_REDIRECT_STATUS_CODE)
+
+    def _invalidate(self, filename):
+        # Called once a write or delete has finished, so a read racing it
+        # cannot cache the previous object.
+        presigned_url_cache.delete(filename)
+        object_cache.invalidate(filename)
+
+    async def _iter_filling(self, chunks: AsyncIterator[bytes], fill: ObjectCacheFill | None) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in chunks:
+                if fill:
+                    await fill.write(chunk)
+                yield chunk
+            if fill:
+                await fill.commit()
+                fill = None
+        finally:
+            if fill:
+                await fill.abort()
+            await chunks.aclose()
+
+    async def _iter_binary_io(self, file: BinaryIO) -> AsyncIterator[bytes]:
+        while chunk := await run_in_threadpool(file.read, self.CHUNK_SIZE):
+            yield chunk
+
+
+def _remaining_size(file: BinaryIO) -> int:
+    position = file.tell()
+    size = file.seek(0, 2) - position
+    file.seek(position)
+    return size
+
+
+def get_storage_service():
+    return StorageService()
+
+
+StorageServiceDep = Annotated[StorageService, Depends(get_storage_service)]
@@ -1,16 +1,18 @@
 from datetime import date
 from typing import Annotated
 
-from fastapi import Depends, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, Response
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.core.database import SessionDep
-from src.services.cos_service import CosService, CosServiceDep
-from src.models.episode import Episode
-from src.models.podcast import Podcast
+from src.core.database import AsyncSessionDep, SessionDep, commit_unique
+from src.services.storage_service import StorageService, StorageServiceDep
+from src.services.deletion_service import DeletionService
+from src.services.image_service import ImageService
 from src.models.user import User, UserCreate, UserUpdate
-from src.core.auth import UserDep, hash_password
+from src.models.deletion_job import DeletionJob
+from src.models.upload_session import DirectUploadComplete, DirectUploadCreate, DirectUploadPublic
+from src.core.auth import UserDep, hash_password, principal_cache
 from src.core.constants import UserRole, CommonMessage
 from src.core.exceptions import (
     UserAlreadyExistsError,
@@ -20,31 +22,30 @@ from src.core.exceptions import (
     NoPermissionError
 )
 from src.utils.file_utils import get_unique_filename
+from src.utils.image_utils import ImageFormat
+from src.utils.multipart_utils import MultipartFileStream
+from src.utils.pagination_utils import paginate
+
+
+USER_UNIQUE_ERRORS = {
+    "uq_user_username": UserAlreadyExistsError,
+    "uq_user_nickname": UserNameAlreadyExistsError
+}
 
 
 class UserService:
 
-    def __init__(self, session: Session, cos_service: CosService, user_login: User | None = None):
+    def __init__(self, session: Session, async_session: AsyncSession, storage_service: StorageService, user_login: User | None = None):
 
         self.session = session
+        self.async_session = async_session
         self.user_login = user_login
-        self.cos_service = cos_service
-
-    def create_user(self, user: UserCreate) -> User:
-
-        existing_user = self.session.exec(
-            select(User).where(User.username == user.username)
-        ).first()
-        if existing_user:
-            raise UserAlreadyExistsError()
+        self.storage_service = storage_service
+        self.image_service = ImageService(storage_service)
 
-        same_name_user = self.session.exec(
-            select(User).where(User.nickname == user.nickname)
-        ).first()
-        if same_name_user:
-            raise UserNameAlreadyExistsError()
+    async def create_user(self, user: UserCreate) -> User:
 
-        hashed_password = hash_password(user.password)
+        hashed_password = await hash_password(user.password)
         extra_data = {
             "hashed_password": hashed_password,
             "createtime": date.today().isoformat()
@@ -53,121 +54,138 @@ class UserService:
         new_user = User.model_validate(user, update=extra_data)
 
         self.session.add(new_user)
-        self.session.commit()
+        commit_unique(self.session, USER_UNIQUE_ERRORS)
         self.session.refresh(new_user)
 
         return new_user
 
-    def get_all_users(self, offset: int, limit: int) -> list[User]:
+    async def get_all_users(self, offset: int, limit: int, after: str | None = None) -> list[User]:
 
-        return self.session.exec(
-            select(User).offset(offset).limit(limit)
-        ).all()
+        return (await self.async_session.exec(
+            paginate(select(User).where(User.deleted_at.is_(None)), User.id, offset, limit, after)
+        )).all()
 
-    def get_user_by_id(self, user_id: int) -> User:
+    async def get_user_by_id(self, user_id: int) -> User:
 
-        user = self.session.get(User, user_id)
-        if not user:
+        user = await self.async_session.get(User, user_id)
+        if not user or user.deleted_at:
             raise UserNotFoundError()
 
         return user
 
-    def update_user_by_id(self, user_id: int, user_update: UserUpdate) -> User:
+    async def update_user_by_id(self, user_id: int, user_update: UserUpdate) -> User:
 
         self._check_permission(user_id)
-        user = self.get_user_by_id(user_id)
-
-        same_name_user = self.session.exec(
-            select(User).where(User.nickname == user_update.nickname)
-        ).first()
-        if same_name_user:
-            raise UserNameAlreadyExistsError()
+        user = self._get_user_by_id(user_id)
 
         user_data = user_update.model_dump(exclude_unset=True)
         extra_data = {}
 
         if "password" in user_data:
-            hashed_password = hash_password(user_data["password"])
+            hashed_password = await hash_password(user_data["password"])
             extra_data["hashed_password"] = hashed_password
 
         user.sqlmodel_update(user_data, update=extra_data)
         self.session.add(user)
-        self.session.commit()
+        commit_unique(self.session, USER_UNIQUE_ERRORS)
+        principal_cache.invalidate(user.username)
         self.session.refresh(user)
 
         return user
 
-    def delete_user_by_id(self, user_id: int) -> CommonMessage:
+    async def delete_user_by_id(self, user_id: int) -> DeletionJob:
 
         self._check_permission(user_id)
 
-        user = self.get_user_by_id(user_id)
-        self._delete_existing_avatar(user)
+        user = self._get_user_by_id(user_id)
+        job = DeletionService(self.session, self.async_session, self.storage_service).schedule_user_deletion(
+            user, self.user_login.id)
+        principal_cache.invalidate(user.username)
 
-        for podcast in user.podcasts:
-            self._delete_podcast(podcast)
+        return job
 
-        self.session.delete(user)
-        self.session.commit()
-
-        return CommonMessage(message="Successfully Deleted.")
+    async def get_avatar_by_id(self, user_id: int, size: int | None = None, image_format: ImageFormat | None = None, accept: str | None = None, version: str | None = None, if_none_match: str | None = None, range_header: str | None = None) -> Response:
 
-    def get_avatar_by_id(self, user_id: int) -> StreamingResponse:
-
-        user = self.get_user_by_id(user_id)
+        user = await self.get_user_by_id(user_id)
 
         if not user.avatar_path:
             raise UserAvatarNotFoundError()
 
-        return StreamingResponse(self.cos_service.fetch_file(user.avatar_path))
+        return await self.image_service.get_image(
+            user.avatar_path, user.avatar_sizes, size, image_format, accept, version, if_none_match, range_header)
 
-    def update_avatar_by_id(self, user_id: int, avatar_update: UploadFile) -> CommonMessage:
+    async def update_avatar_by_id(self, user_id: int, avatar_update: MultipartFileStream, content_sha256: str | None = None) -> CommonMessage:
 
         self._check_permission(user_id)
 
-        user = self.get_user_by_id(user_id)
+        user = self._get_user_by_id(user_id)
 
-        self._delete_existing_avatar(user)
+        await avatar_update.open()
 
         avatar_filename = self._get_avatar_filename(
             user.id, avatar_update.filename)
-        self.cos_service.save_file(avatar_update.file, avatar_filename)
+        await self.storage_service.save_upload(avatar_update, avatar_filename, content_sha256)
+        image_sizes = await self.image_service.create_variants(avatar_filename)
+
+        await self._delete_existing_avatar(user)
         user.avatar_path = avatar_filename
+        user.avatar_sizes = image_sizes
 
         self.session.add(user)
         self.session.commit()
 
         return CommonMessage(message="Avatar Changed.")
 
-    def _get_avatar_filename(self, user_id: int, original_filename: str) -> str:
+    async def create_avatar_direct_upload(self, user_id: int, upload_create: DirectUploadCreate) -> DirectUploadPublic:
 
-        return f"users/{user_id}/avatar/{get_unique_filename(original_filename)}"
+        self._check_permission(user_id)
 
-    def _delete_existing_avatar(self, user: User) -> None:
+        user = self._get_user_by_id(user_id)
 
-        if user.avatar_path:
-            self.cos_service.delete_file(user.avatar_path)
+        avatar_filename = self._get_avatar_filename(
+            user.id, upload_create.filename)
+        return self.storage_service.create_direct_upload(avatar_filename, upload_create.content_type)
 
-    def _delete_podcast(self, podcast: Podcast):
+    async def complete_avatar_direct_upload(self, user_id: int, upload_complete: DirectUploadComplete) -> CommonMessage:
 
-        if podcast.itunes_image_path:
-            self.cos_service.delete_file(podcast.itunes_image_path)
-        if podcast.feed_path:
-            self.cos_service.delete_file(podcast.feed_path)
+        self._check_permission(user_id)
+
+        user = self._get_user_by_id(user_id)
+
+        if upload_complete.key != user.avatar_path:
+            await self.storage_service.get_direct_upload_info(
+                upload_complete.key, self._get_avatar_prefix(user.id))
+            image_sizes = await self.image_service.create_variants(upload_complete.key)
+
+            await self._delete_existing_avatar(user)
+            user.avatar_path = upload_complete.key
+            user.avatar_sizes = image_sizes
+
+            self.session.add(user)
+            self.session.commit()
+
+        return CommonMessage(message="Avatar Changed.")
+
+    def _get_user_by_id(self, user_id: int) -> User:
 
-        for episode in podcast.episodes:
-            self._delete_episode(episode)
+        user = self.session.get(User, user_id)
+        if not user or user.deleted_at:
+            raise UserNotFoundError()
+
+        return user
 
-        self.session.delete(podcast)
+    def _get_avatar_prefix(self, user_id: int) -> str:
 
-    def _delete_episode(self, episode: Episode):
+        return f"users/{user_id}/avatar/"
 
-        if episode.itunes_image_path:
-            self.cos_service.delete_file(episode.itunes_image_path)
-        if episode.enclosure_path:
-            self.cos_service.delete_file(episode.enclosure_path)
+    def _get_avatar_filename(self, user_id: int, original_filename: str) -> str:
+
+        return self._get_avatar_prefix(user_id) + get_unique_filename(original_filename)
 
-        self.session.delete(episode)
+    async def _delete_existing_avatar(self, user: User) -> None:
+
+        if user.avatar_path:
+            await self.image_service.delete_image(user.avatar_path, user.avatar_sizes)
 
     def _check_permission(self, user_id: int):
 
@@ -176,12 +194,12 @@ class UserService:
             raise NoPermissionError()
 
 
-def get_user_service(session: SessionDep, cos_service: CosServiceDep):
-    return UserService(session, cos_service)
+def get_user_service(session: SessionDep, async_session: AsyncSessionDep, storage_service: StorageServiceDep):
+    return UserService(session, async_session, storage_service)
 
 
-def get_user_service_with_login(session: SessionDep, cos_service: CosServiceDep, user_login: UserDep):
-    return UserService(session, cos_service, user_login)
+def get_user_service_with_login(session: SessionDep, async_session: AsyncSessionDep, storage_service: StorageServiceDep, user_login: UserDep):
+    return UserService(session, async_session, storage_service, user_login)
 
 
 UserServiceDep = Annotated[UserService, Depends(get_user_service)]
@@ -1,4 +1,7 @@
+import io
 import uuid
+from typing import Callable
+
 from mutagen.mp3 import MP3
 
 
@@ -11,3 +14,59 @@ def get_unique_filename(filename: str) -> str:
 def get_audio_duration_from_binaryio(binary_io):
     audio = MP3(binary_io)
     return audio.info.length
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over a remote object of known size.
+
+    Bytes are fetched lazily in aligned blocks through `read_range(start, end)`
+    (inclusive bounds) and kept, so parsers that only look at the head and
+    tail of a file never download the middle.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, size: int, read_range: Callable[[int, int], bytes]):
+        self._size = size
+        self._read_range = read_range
+        self._position = 0
+        self._blocks: dict[int, bytes] = {}
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(offset, 0)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        end = min(self._position + len(buffer), self._size)
+        written = 0
+        while self._position < end:
+            index, offset = divmod(self._position, self.BLOCK_SIZE)
+            chunk = self._get_block(index)[offset:offset + end - self._position]
+            if not chunk:
+                # The object is shorter than its recorded size.
+                break
+            buffer[written:written + len(chunk)] = chunk
+            written += len(chunk)
+            self._position += len(chunk)
+        return written
+
+    def _get_block(self, index: int) -> bytes:
+        if index not in self._blocks:
+            start = index * self.BLOCK_SIZE
+            end = min(start + self.BLOCK_SIZE, self._size) - 1
+            self._blocks[index] = self._read_range(start, end)
+        return self._blocks[index]
@@ -0,0 +1,63 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Annotated
+
+from fastapi import Query
+
+from src.config.settings import settings
+
+MediaVersionQuery = Annotated[str | None, Query(description="文件版本；与当前文件一致时响应可被永久缓存")]
+
+
+def strong_etag(content: bytes) -> str:
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def get_key_version(key: str) -> str:
+    """Short token naming the upload stored under `key`; keys are unique per upload."""
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def get_media_headers(key: str, version_key: str, version: str | None) -> dict[str, str]:
+    """
+    Validator and cache policy for an object served under a stable URL.
+
+    `key` is the object actually sent and names its strong ETag. A request
+    whose `v` names the current `version_key` can never see different bytes,
+    so it is cached as immutable; otherwise caches must revalidate.
+    """
+    if version and version == get_key_version(version_key):
+        cache_control = f"public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE_SECONDS}, immutable"
+    else:
+        cache_control = f"public, max-age={settings.MEDIA_MAX_AGE_SECONDS}"
+
+    return {"ETag": f'"{get_key_version(key)}"', "Cache-Control": cache_control}
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(etag: str | None, last_modified: str | None, if_none_match: str | None, if_modified_since: str | None) -> bool:
+    """
+    Evaluate `If-None-Match` / `If-Modified-Since` for a GET. As required by
+    RFC 9110, `If-Modified-Since` is ignored whenever `If-None-Match` is sent.
+    """
+    if if_none_match is not None:
+        if not etag:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        opaque_tag = etag.removeprefix("W/")
+        return any(
+            candidate.strip().removeprefix("W/") == opaque_tag
+            for candidate in if_none_match.split(",")
+        )
+
+    if if_modified_since is not None and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
@@ -0,0 +1,75 @@
+import io
+from typing import Annotated, Iterable, Literal
+
+from fastapi import Query
+from PIL import Image, ImageOps
+
+ImageFormat = Literal["webp", "jpeg"]
+
+# format -> (Pillow format, media type, file extension)
+IMAGE_VARIANT_FORMATS: dict[str, tuple[str, str, str]] = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+ImageSizeQuery = Annotated[int | None, Query(gt=0, description="期望的宽度（像素），返回不小于它的最小预生成尺寸")]
+ImageFormatQuery = Annotated[ImageFormat | None, Query(description="省略时按 Accept 头选择")]
+
+
+def format_image_sizes(sizes: Iterable[int]) -> str:
+    return ",".join(str(size) for size in sorted(sizes))
+
+
+def parse_image_sizes(sizes: str | None) -> list[int]:
+    return [int(size) for size in sizes.split(",")] if sizes else []
+
+
+def get_image_variant_key(key: str, size: int, image_format: ImageFormat) -> str:
+    """`.../cover/<name>.png` -> `.../cover/<name>_300.webp`"""
+    return f"{key.rsplit('.', 1)[0]}_{size}.{IMAGE_VARIANT_FORMATS[image_format][2]}"
+
+
+def get_image_keys(key: str, sizes: str | None) -> list[str]:
+    """The original and every variant stored for it."""
+    return [key] + [
+        get_image_variant_key(key, size, image_format)
+        for size in parse_image_sizes(sizes)
+        for image_format in IMAGE_VARIANT_FORMATS
+    ]
+
+
+def render_image_variants(content: bytes, sizes: list[int], quality: int) -> dict[tuple[int, str], bytes]:
+    """
+    Re-encode an image at each size (longest side, aspect kept) in every
+    variant format. Images are never upscaled: sizes beyond the source's
+    longest side collapse into one variant at the source's own size. CPU
+    bound; runs in a worker process, so it must stay picklable and free of
+    app state.
+    """
+    with Image.open(io.BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        # JPEG has no alpha channel: flatten onto white.
+        if image.mode in ("RGBA", "LA", "PA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    longest_side = max(image.size)
+    variants = {}
+    for size in sorted({min(size, longest_side) for size in sizes}):
+        resized = image
+        if size < longest_side:
+            scale = size / longest_side
+            resized = image.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                Image.Resampling.LANCZOS
+            )
+        for image_format, (pillow_format, _, _) in IMAGE_VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pillow_format, quality=quality)
+            variants[(size, image_format)] = buffer.getvalue()
+
+    return variants
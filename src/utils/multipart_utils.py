@@ -0,0 +1,126 @@
+import hashlib
+from collections import deque
+from typing import AsyncIterator
+
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from src.core.exceptions import InvalidUploadError
+
+
+def multipart_file_openapi(field_name: str) -> dict:
+    """`openapi_extra` documenting a body that is read with MultipartFileStream."""
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": [field_name],
+        "properties": {field_name: {"type": "string", "format": "binary"}}
+    }}}}}
+
+
+class MultipartFileStream:
+    """
+    One file field of a `multipart/form-data` request, parsed incrementally
+    from the raw request body.
+
+    Nothing is spooled: `open()` reads just far enough to see the field's
+    headers, then iterating yields the file's bytes as they arrive while the
+    length and SHA-256 are computed on the fly.
+    """
+
+    def __init__(self, request: Request, field_name: str):
+        content_type, params = parse_options_header(
+            request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise InvalidUploadError("Expected a multipart/form-data body.")
+
+        self.field_name = field_name
+        self.filename: str | None = None
+        self.content_type: str | None = None
+        self.size = 0
+
+        self._body = request.stream()
+        self._events: deque[tuple] = deque()
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._sha256 = hashlib.sha256()
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    async def open(self) -> "MultipartFileStream":
+        while True:
+            event = await self._next_event()
+            if event[0] == "eof":
+                raise InvalidUploadError(
+                    f"Missing file field '{self.field_name}'.")
+            # Skip the data of any other field.
+            if event[0] != "headers":
+                continue
+
+            _, options = parse_options_header(
+                event[1].get(b"content-disposition", b""))
+            if options.get(b"name", b"").decode() == self.field_name and b"filename" in options:
+                self.filename = options[b"filename"].decode()
+                self.content_type = event[1].get(
+                    b"content-type", b"application/octet-stream").decode()
+                return self
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while True:
+            event = await self._next_event()
+            if event[0] == "data":
+                self.size += len(event[1])
+                self._sha256.update(event[1])
+                yield event[1]
+            elif event[0] == "end":
+                return
+            else:
+                raise InvalidUploadError("Incomplete multipart body.")
+
+    async def _next_event(self) -> tuple:
+        while not self._events:
+            try:
+                chunk = await anext(self._body)
+            except StopAsyncIteration:
+                return ("eof",)
+            if chunk:
+                try:
+                    self._parser.write(chunk)
+                except MultipartParseError:
+                    raise InvalidUploadError("Malformed multipart body.")
+        return self._events.popleft()
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        self._events.append(("headers", self._headers))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append(("data", bytes(data[start:end])))
+
+    def _on_part_end(self):
+        self._events.append(("end",))
@@ -0,0 +1,63 @@
+import base64
+import binascii
+import json
+from typing import Annotated, Sequence
+
+from fastapi import Query, Request, Response
+from sqlalchemy import and_, or_
+from sqlmodel.sql.expression import Select, SelectOfScalar
+
+from src.config.settings import settings
+from src.core.exceptions import InvalidCursorError
+
+OffsetQuery = Annotated[int, Query(ge=0)]
+LimitQuery = Annotated[int, Query(ge=1, le=settings.PAGINATION_MAX_LIMIT)]
+AfterQuery = Annotated[str | None, Query(description="上一页响应 Link 头中的游标")]
+KeywordQuery = Annotated[str | None, Query(min_length=1, max_length=100, description="在标题和简介中搜索")]
+
+
+def encode_cursor(**keys: int) -> str:
+    payload = json.dumps(keys, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *names: str) -> tuple[int, ...]:
+    try:
+        keys = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = tuple(keys[name] for name in names)
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursorError()
+    if not all(type(value) is int for value in values):
+        raise InvalidCursorError()
+    return values
+
+
+def paginate(statement: SelectOfScalar, id_column, offset: int, limit: int, after: str | None) -> SelectOfScalar:
+    """
+    Page `statement` in a stable `id` order. With a cursor the page starts
+    right after the last row of the previous one (an index range scan, however
+    deep); without one, plain offset paging is kept for old clients.
+    """
+    statement = statement.order_by(id_column).limit(limit)
+    if after is not None:
+        last_id, = decode_cursor(after, "id")
+        return statement.where(id_column > last_id)
+    return statement.offset(offset)
+
+
+def paginate_ranked(statement: Select, rank, id_column, offset: int, limit: int, after: str | None) -> Select:
+    """Like `paginate`, for results ordered by an integer `rank` (best first), then `id`."""
+    statement = statement.order_by(rank.desc(), id_column).limit(limit)
+    if after is not None:
+        last_rank, last_id = decode_cursor(after, "rank", "id")
+        return statement.where(or_(rank < last_rank, and_(rank == last_rank, id_column > last_id)))
+    return statement.offset(offset)
+
+
+def set_next_link(request: Request, response: Response, items: Sequence, limit: int, cursor: str | None = None):
+    """Advertise the next page in a `Link: <...>; rel="next"` header when this one is full."""
+    if len(items) < limit:
+        return
+    next_url = request.url.remove_query_params("offset").include_query_params(
+        after=cursor or encode_cursor(id=items[-1].id))
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
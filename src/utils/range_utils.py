@@ -0,0 +1,101 @@
+from typing import NamedTuple
+
+from src.core.exceptions import RangeNotSatisfiableError
+
+# Ignore pathological Range headers instead of fanning out into many storage reads.
+MAX_RANGES = 16
+
+
+class ByteRange(NamedTuple):
+    start: int
+    end: int
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+    def to_header(self) -> str:
+        return f"bytes={self.start}-{self.end}"
+
+    def content_range(self, size: int) -> str:
+        return f"bytes {self.start}-{self.end}/{size}"
+
+
+def parse_range_header(range_header: str | None, size: int) -> list[ByteRange] | None:
+    """
+    Parse a `Range` request header against a representation of `size` bytes.
+
+    Returns None when the whole representation should be served (no header,
+    unknown unit, syntax error or too many ranges), otherwise the satisfiable
+    ranges sorted and coalesced. Raises RangeNotSatisfiableError when none of
+    the requested ranges overlap the representation.
+    """
+    if not range_header:
+        return None
+
+    unit, _, range_set = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not range_set:
+        return None
+
+    specs = [spec.strip() for spec in range_set.split(",") if spec.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        first, sep, last = spec.partition("-")
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else max(start, size - 1)
+                if start < 0 or end < start:
+                    return None
+            else:
+                suffix_length = int(last)
+                if suffix_length < 0:
+                    return None
+                if suffix_length == 0:
+                    continue
+                start = max(size - suffix_length, 0)
+                end = size - 1
+        except ValueError:
+            return None
+
+        if start >= size:
+            continue
+        ranges.append(ByteRange(start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiableError(size)
+
+    return _coalesce(ranges)
+
+
+def if_range_matches(if_range: str | None, etag: str | None, last_modified: str | None) -> bool:
+    """
+    Evaluate an `If-Range` precondition. Only strong entity tags or an exact
+    `Last-Modified` date validate the range request.
+    """
+    if not if_range:
+        return True
+
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return bool(etag) and not if_range.startswith("W/") \
+            and not etag.startswith("W/") and if_range == etag
+
+    return bool(last_modified) and if_range == last_modified
+
+
+def _coalesce(ranges: list[ByteRange]) -> list[ByteRange]:
+    ranges = sorted(ranges)
+    merged = [ranges[0]]
+    for current in ranges[1:]:
+        previous = merged[-1]
+        if current.start <= previous.end + 1:
+            merged[-1] = ByteRange(previous.start, max(previous.end, current.end))
+        else:
+            merged.append(current)
+    return merged
@@ -0,0 +1,25 @@
+from sqlalchemy import Integer, case, cast, func, or_
+
+
+def escape_like(keyword: str) -> str:
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def keyword_match(title_column, description_column, keyword: str, dialect_name: str):
+    """
+    Build the filter and integer rank for a keyword search over a title and a
+    description.
+
+    Matching is a case-insensitive substring test, which suits Chinese text
+    with no word boundaries; on PostgreSQL the pg_trgm GIN indexes answer it
+    for keywords of three characters or more. Title hits rank first, then
+    titles more similar to the keyword (pg_trgm `similarity`).
+    """
+    pattern = f"%{escape_like(keyword)}%"
+    title_match = title_column.ilike(pattern, escape="\\")
+    where = or_(title_match, description_column.ilike(pattern, escape="\\"))
+
+    rank = case((title_match, 1000), else_=0)
+    if dialect_name == "postgresql":
+        rank = rank + cast(func.similarity(title_column, keyword) * 999, Integer)
+    return where, rank
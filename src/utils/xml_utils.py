@@ -0,0 +1,42 @@
+"""
+Minimal string-level XML emitter.
+
+Output matches `xml.dom.minidom`'s `toxml()` byte for byte (same escaping,
+attribute order and empty-element form) without building a DOM.
+"""
+
+XML_DECLARATION = '<?xml version="1.0" ?>'
+
+
+def escape(data: str) -> str:
+    return data.replace("&", "&amp;").replace("<", "&lt;"). \
+        replace("\"", "&quot;").replace(">", "&gt;")
+
+
+def start_tag(tag: str, attrs: dict[str, str] | None = None) -> str:
+    if not attrs:
+        return f"<{tag}>"
+    return f"<{tag}{_format_attrs(attrs)}>"
+
+
+def end_tag(tag: str) -> str:
+    return f"</{tag}>"
+
+
+def element(tag: str, text: str | None = None, attrs: dict[str, str] | None = None, children: str = "") -> str:
+    """
+    Render one element. `text` is a single text child (an empty string still
+    yields an open/close pair, as with minidom); `children` is pre-rendered
+    markup. Elements with neither are self-closed.
+    """
+    if text is None and not children:
+        return f"<{tag}{_format_attrs(attrs)}/>"
+    if text is not None and not isinstance(text, str):
+        raise TypeError("node contents must be a string")
+    return f"<{tag}{_format_attrs(attrs)}>{escape(text or '')}{children}</{tag}>"
+
+
+def _format_attrs(attrs: dict[str, str] | None) -> str:
+    if not attrs:
+        return ""
+    return "".join(f' {name}="{escape(value)}"' for name, value in attrs.items())
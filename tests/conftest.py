@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+
+# Settings are read once at import time, so the environment is prepared before
+# anything from `src` is imported: a throwaway SQLite database and the local
+# storage backend, so no test needs PostgreSQL or COS.
+_workdir = tempfile.mkdtemp(prefix="yuyi-tests-")
+os.environ["PGDB_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.sqlite')}"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["CONTENTS_DIR"] = os.path.join(_workdir, "contents")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+# The COS client is built when src.core.cos is imported, even if unused.
+os.environ.setdefault("COS_REGION", "ap-guangzhou")
+os.environ.setdefault("COS_BUCKET", "test-1250000000")
+os.environ.setdefault("COS_SECRET_ID", "test")
+os.environ.setdefault("COS_SECRET_KEY", "test")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+PASSWORD = "test-password"
+# One MPEG-1 Layer III frame, 128 kbit/s at 44.1 kHz, carrying silence
+MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client: TestClient) -> dict[str, str]:
+    client.post("/users", json={"username": "tester", "password": PASSWORD, "nickname": "tester"})
+    response = client.post("/token", data={"username": "tester", "password": PASSWORD})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def podcast_id(client: TestClient, auth_headers: dict[str, str]) -> int:
+    response = client.post("/users/me/podcasts", headers=auth_headers, json={
+        "title": "Test Podcast",
+        "description": "A podcast for tests.",
+        "itunes_category": "Arts",
+        "itunes_subcategory": "Books",
+        "copyright": "test"
+    })
+    return response.json()["id"]
+
+
+@pytest.fixture
+def episode_with_audio(client: TestClient, auth_headers: dict[str, str], podcast_id: int) -> tuple[int, bytes]:
+    """An episode whose audio is a few hundred silent frames; returns (id, audio bytes)."""
+    response = client.post(f"/podcasts/{podcast_id}/episodes", headers=auth_headers,
+                           json={"title": f"Episode {os.urandom(4).hex()}", "description": "test"})
+    episode_id = response.json()["id"]
+    audio = MP3_FRAME * 200
+    response = client.put(f"/episodes/{episode_id}/audio", headers=auth_headers,
+                          files={"audio_update": ("episode.mp3", audio, "audio/mpeg")})
+    assert response.status_code == 200, response.text
+    return episode_id, audio
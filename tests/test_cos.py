@@ -0,0 +1,30 @@
+import httpx
+
+from src.core.cos import CosStorage
+
+
+def make_storage() -> CosStorage:
+    # _get_file_info only reads the response; no client is needed.
+    return CosStorage(None, None, "bucket")
+
+
+def test_file_info_of_whole_object():
+    response = httpx.Response(200, headers={"Content-Length": "1000", "ETag": '"abc"', "Content-Type": "audio/mpeg"})
+
+    file_info = make_storage()._get_file_info(response)
+
+    assert file_info.size == 1000
+    assert file_info.etag == '"abc"'
+    assert file_info.content_type == "audio/mpeg"
+
+
+def test_file_info_of_ranged_read_reports_object_size():
+    response = httpx.Response(206, headers={"Content-Length": "10", "Content-Range": "bytes 100-109/1000"})
+
+    assert make_storage()._get_file_info(response).size == 1000
+
+
+def test_file_info_of_ranged_read_with_unknown_total_falls_back_to_length():
+    response = httpx.Response(206, headers={"Content-Length": "10", "Content-Range": "bytes 100-109/*"})
+
+    assert make_storage()._get_file_info(response).size == 10
@@ -0,0 +1,34 @@
+import threading
+
+from src.utils.file_utils import RangedReader
+
+
+def read_in_thread(reader: RangedReader, size: int, timeout: float = 5.0) -> bytearray:
+    """readinto on a daemon thread, so a regression to looping fails instead of hanging."""
+    buffer = bytearray(size)
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("read", reader.readinto(buffer)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "readinto did not return"
+    return buffer[:result["read"]]
+
+
+def test_readinto_stops_when_backend_returns_fewer_bytes_than_recorded():
+    content = bytes(range(256)) * 300
+    # Storage returns 76,800 bytes for an object recorded as 200,000.
+    reader = RangedReader(200_000, lambda start, end: content[start:end + 1])
+
+    assert read_in_thread(reader, 200_000) == content
+    assert reader.tell() == len(content)
+    assert reader.read(10) == b""
+
+
+def test_readinto_reads_across_blocks():
+    content = bytes(range(256)) * 300
+    reader = RangedReader(len(content), lambda start, end: content[start:end + 1])
+
+    reader.seek(RangedReader.BLOCK_SIZE - 5)
+    assert reader.read(10) == content[RangedReader.BLOCK_SIZE - 5:RangedReader.BLOCK_SIZE + 5]
+    reader.seek(-3, 2)
+    assert reader.read() == content[-3:]
@@ -0,0 +1,31 @@
+import io
+
+from PIL import Image
+
+from src.utils.image_utils import render_image_variants
+
+
+def make_png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def rendered_sizes(variants: dict[tuple[int, str], bytes]) -> dict[tuple[int, str], tuple[int, int]]:
+    return {key: Image.open(io.BytesIO(content)).size for key, content in variants.items()}
+
+
+def test_variants_are_not_upscaled():
+    variants = render_image_variants(make_png(64, 32), [64, 300, 1400], 80)
+
+    assert rendered_sizes(variants) == {(64, "webp"): (64, 32), (64, "jpeg"): (64, 32)}
+
+
+def test_larger_sizes_collapse_into_the_source_size():
+    variants = render_image_variants(make_png(500, 250), [64, 300, 1400], 80)
+
+    assert rendered_sizes(variants) == {
+        (64, "webp"): (64, 32), (64, "jpeg"): (64, 32),
+        (300, "webp"): (300, 150), (300, "jpeg"): (300, 150),
+        (500, "webp"): (500, 250), (500, "jpeg"): (500, 250),
+    }
@@ -0,0 +1,37 @@
+def parse_byteranges(content: bytes, boundary: str) -> list[tuple[str, bytes]]:
+    """Split a multipart/byteranges body into (Content-Range, body) pairs."""
+    parts = []
+    delimiter = f"--{boundary}".encode()
+    assert content.endswith(delimiter + b"--\r\n")
+    for part in content.split(delimiter)[1:-1]:
+        head, _, body = part.partition(b"\r\n\r\n")
+        assert body.endswith(b"\r\n")
+        headers = dict(line.split(": ", 1) for line in head.decode().strip().split("\r\n"))
+        parts.append((headers["Content-Range"], body[:-2]))
+    return parts
+
+
+def test_single_range_on_local_backend(client, episode_with_audio):
+    episode_id, audio = episode_with_audio
+
+    response = client.get(f"/episodes/{episode_id}/audio", headers={"Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert response.content == audio[0:10]
+    assert response.headers["Content-Range"] == f"bytes 0-9/{len(audio)}"
+    assert int(response.headers["Content-Length"]) == len(response.content)
+
+
+def test_multi_range_content_length_matches_body(client, episode_with_audio):
+    episode_id, audio = episode_with_audio
+
+    response = client.get(f"/episodes/{episode_id}/audio", headers={"Range": "bytes=0-9,420-429"})
+
+    assert response.status_code == 206
+    media_type, _, boundary = response.headers["Content-Type"].partition("; boundary=")
+    assert media_type == "multipart/byteranges"
+    assert int(response.headers["Content-Length"]) == len(response.content)
+    assert parse_byteranges(response.content, boundary) == [
+        (f"bytes 0-9/{len(audio)}", audio[0:10]),
+        (f"bytes 420-429/{len(audio)}", audio[420:430]),
+    ]